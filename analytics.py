@@ -0,0 +1,133 @@
+import threading
+
+import numpy as np
+
+from catalog import cents_to_decimal
+
+# Participação acumulada no valor do estoque que fecha as classes A e B (o resto é C)
+ABC_LIMITS = (0.80, 0.95)
+ABC_CLASSES = ('A', 'B', 'C')
+
+# Limites de estoque baixo e de excesso (unidades)
+LOW_STOCK = 5
+OVERSTOCK = 300
+
+# Faixas de preço em reais: [0, 100), [100, 200), ... e acima do último limite
+PRICE_BANDS = (100, 200, 400, 800)
+
+
+# Valor de cada linha (preço x estoque) em centavos; estoque negativo não soma valor
+def line_values(table):
+    return table.prices * np.maximum(table.stock, 0)
+
+
+# Classe ABC de cada produto (0 = A, 1 = B, 2 = C), pelo valor em estoque: os produtos mais
+# valiosos que somam até limits[0] do total são A, até limits[1] são B. O produto que
+# cruza o limite entra na classe de cima, e empates com ele também. Ordena só os valores
+# (sem argsort) e classifica cada produto comparando com o menor valor de cada classe
+def abc_classes(table, limits=ABC_LIMITS, values=None):
+    values = line_values(table) if values is None else values
+    classes = np.full(len(values), len(limits), dtype=np.int8)
+    total = int(values.sum())
+    if total <= 0:
+        return classes
+    ranked = np.sort(values)[::-1]
+    before = (np.cumsum(ranked) - ranked) / total
+    cuts = np.searchsorted(before, np.asarray(limits), side='left')
+    for level in range(len(limits) - 1, -1, -1):
+        if cuts[level]:
+            classes[values >= ranked[cuts[level] - 1]] = level
+    return classes
+
+
+# Histograma do estoque: (contagens, limites das faixas)
+def stock_histogram(table, bins=10):
+    if not len(table):
+        return np.zeros(bins, dtype=np.int64), np.linspace(0, 1, bins + 1)
+    return np.histogram(table.stock, bins=bins)
+
+
+# Máscaras de estoque baixo (<= low) e de excesso (>= over)
+def stock_flags(table, low=LOW_STOCK, over=OVERSTOCK):
+    return table.stock <= low, table.stock >= over
+
+
+# Produtos, estoque e valor por faixa de preço
+def price_bands(table, edges=PRICE_BANDS):
+    band = np.searchsorted(np.asarray(edges, dtype=np.int64) * 100, table.prices, side='right')
+    size = len(edges) + 1
+    count = np.bincount(band, minlength=size)
+    stock = np.bincount(band, weights=np.maximum(table.stock, 0), minlength=size)
+    value = np.bincount(band, weights=line_values(table), minlength=size)
+    labels = [f"até R$ {edges[0]}"] + [f"R$ {a}–{b}" for a, b in zip(edges, edges[1:])] + [f"R$ {edges[-1]}+"]
+    return [
+        {'faixa': labels[i], 'produtos': int(count[i]), 'estoque': int(stock[i]),
+         'valor': cents_to_decimal(round(value[i]))}
+        for i in range(size)
+    ]
+
+
+# Índices das até n linhas com menor chave, em ordem (argpartition: sem ordenar o resto)
+def smallest(indices, keys, n):
+    if len(indices) > n:
+        part = np.argpartition(keys, n - 1)[:n]
+        indices, keys = indices[part], keys[part]
+    return indices[np.lexsort((indices, keys))]
+
+
+# Resumo completo do estoque sobre um ProductTable
+def inventory_report(table, low=LOW_STOCK, over=OVERSTOCK, bins=10, abc_limits=ABC_LIMITS,
+                     price_edges=PRICE_BANDS, sample=5):
+    values = line_values(table)
+    total = int(values.sum())
+    classes = abc_classes(table, abc_limits, values)
+    counts, edges = stock_histogram(table, bins)
+    low_mask, over_mask = stock_flags(table, low, over)
+    class_count = np.bincount(classes, minlength=len(ABC_CLASSES))
+    class_value = np.bincount(classes, weights=values, minlength=len(ABC_CLASSES))
+    # Os mais críticos de cada alerta: menor estoque primeiro / maior estoque primeiro
+    low_ids = np.flatnonzero(low_mask)
+    low_ids = smallest(low_ids, table.stock[low_ids], sample)
+    over_ids = np.flatnonzero(over_mask)
+    over_ids = smallest(over_ids, -table.stock[over_ids], sample)
+    return {
+        'produtos': len(table),
+        'estoque_total': table.total_stock(),
+        'valor_total': cents_to_decimal(total),
+        'abc': [
+            {'classe': name, 'produtos': int(class_count[i]), 'valor': cents_to_decimal(round(class_value[i])),
+             'participacao': float(class_value[i] / total) if total else 0.0}
+            for i, name in enumerate(ABC_CLASSES)
+        ],
+        'histograma': {'contagens': counts.tolist(), 'limites': edges.tolist()},
+        'estoque_baixo': {'limite': low, 'produtos': int(low_mask.sum()),
+                          'exemplos': [table[int(i)].to_dict() for i in low_ids]},
+        'excesso': {'limite': over, 'produtos': int(over_mask.sum()),
+                    'exemplos': [table[int(i)].to_dict() for i in over_ids]},
+        'faixas_preco': price_bands(table, price_edges),
+    }
+
+
+# Relatório do catálogo guardado até a próxima mudança: o ProductTable do DatabaseManager
+# só é trocado quando a versão do catálogo muda, então basta comparar o objeto
+class InventoryAnalytics:
+    def __init__(self, db_manager, **options):
+        self.db_manager = db_manager
+        self.options = options
+        self._table = None
+        self._report = None
+        self._lock = threading.Lock()
+
+    # Relatório atual, ou None se o catálogo não pôde ser lido
+    def report(self):
+        table = self.db_manager.get_product_table()
+        if table is None:
+            return None
+        with self._lock:
+            if table is self._table:
+                return self._report
+        report = inventory_report(table, **self.options)
+        with self._lock:
+            self._table = table
+            self._report = report
+        return report
@@ -0,0 +1,205 @@
+import os
+import sqlite3
+from decimal import Decimal
+
+# pymysql só é necessário para o backend MySQL; lojas com um terminal podem rodar só com SQLite
+try:
+    import pymysql
+    import pymysql.cursors
+except ImportError:
+    pymysql = None
+
+# Erros de banco de qualquer backend (para usar em "except ERRORS")
+ERRORS = (sqlite3.Error,) + ((pymysql.Error,) if pymysql else ())
+
+sqlite3.register_adapter(Decimal, str)
+
+
+# Servidor MySQL (padrão da loja)
+class MySQLBackend:
+    dialect = 'mysql'
+    label = 'MySQL'
+
+    def __init__(self, host, user, password, database):
+        if pymysql is None:
+            raise ImportError("O backend MySQL precisa do pacote pymysql (pip install pymysql)")
+        self.host = host
+        self.user = user
+        self.password = password
+        self.database = database
+
+    def _connect(self, database=None):
+        return pymysql.connect(
+            host=self.host,
+            user=self.user,
+            password=self.password,
+            database=database,
+            charset='utf8mb4',
+            cursorclass=pymysql.cursors.DictCursor,
+            # rowcount de UPDATE passa a contar linhas encontradas, não só as alteradas
+            client_flag=pymysql.constants.CLIENT.FOUND_ROWS,
+            autocommit=True
+        )
+
+    # Criar banco se não existir (conexão avulsa, sem banco selecionado)
+    def prepare(self):
+        conn = self._connect()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(f"CREATE DATABASE IF NOT EXISTS {self.database}")
+        finally:
+            conn.close()
+
+    # Abre uma conexão nova (usada pelo pool)
+    def connect(self):
+        return self._connect(self.database)
+
+    def ping(self, conn):
+        conn.ping(reconnect=True)
+
+    # Cursor sem buffer: as linhas vêm do servidor conforme são lidas (como tuplas com tuples=True)
+    def stream_cursor(self, conn, tuples=False):
+        return conn.cursor(pymysql.cursors.SSCursor if tuples else pymysql.cursors.SSDictCursor)
+
+    def is_missing_table(self, error):
+        return bool(error.args) and error.args[0] == 1146
+
+    # Índice (1061) ou coluna (1060) já existe: migração interrompida no meio
+    def is_duplicate_object(self, error):
+        return bool(error.args) and error.args[0] in (1060, 1061)
+
+
+# Banco embutido num arquivo, em modo WAL: sem servidor e sem rede
+class SQLiteBackend:
+    dialect = 'sqlite'
+    label = 'SQLite'
+
+    PRAGMAS = (
+        "PRAGMA journal_mode = WAL",
+        "PRAGMA synchronous = NORMAL",
+        "PRAGMA foreign_keys = ON",
+        "PRAGMA temp_store = MEMORY",
+        "PRAGMA cache_size = -20000",
+        "PRAGMA mmap_size = 268435456",
+    )
+
+    def __init__(self, path='perucas_diferentonas.db', busy_timeout=5.0, cached_statements=256):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self.cached_statements = cached_statements
+
+    def prepare(self):
+        folder = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(folder, exist_ok=True)
+
+    # Cada conexão guarda os comandos já compilados (cached_statements), como prepared statements
+    def connect(self):
+        conn = sqlite3.connect(
+            self.path,
+            timeout=self.busy_timeout,
+            isolation_level=None,
+            check_same_thread=False,
+            cached_statements=self.cached_statements
+        )
+        conn.row_factory = _dict_row
+        for pragma in self.PRAGMAS:
+            conn.execute(pragma)
+        return SQLiteConnection(conn)
+
+    def ping(self, conn):
+        conn.execute("SELECT 1")
+
+    # O cursor do sqlite3 já lê as linhas sob demanda
+    def stream_cursor(self, conn, tuples=False):
+        cursor = conn.cursor()
+        if tuples:
+            cursor.cursor.row_factory = None
+        return cursor
+
+    def is_missing_table(self, error):
+        return 'no such table' in str(error)
+
+    def is_duplicate_object(self, error):
+        return 'already exists' in str(error) or 'duplicate column' in str(error)
+
+
+def _dict_row(cursor, row):
+    return {column[0]: value for column, value in zip(cursor.description, row)}
+
+
+# Marcadores do pymysql (%s) viram os do sqlite3 (?); o texto convertido é reaproveitado
+_translated = {}
+
+
+def _translate(query):
+    sql = _translated.get(query)
+    if sql is None:
+        sql = query.replace('%s', '?')
+        if len(_translated) < 1024:
+            _translated[query] = sql
+    return sql
+
+
+# Conexão sqlite3 com a mesma interface usada do pymysql (begin/commit/rollback/cursor)
+class SQLiteConnection:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def cursor(self, cursorclass=None):
+        return SQLiteCursor(self)
+
+    def execute(self, query, params=()):
+        return self.conn.execute(_translate(query), params)
+
+    # IMMEDIATE reserva a escrita já no início, evitando deadlock entre transações
+    def begin(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+
+    def commit(self):
+        self.conn.commit()
+
+    def rollback(self):
+        self.conn.rollback()
+
+    def close(self):
+        self.conn.close()
+
+
+class SQLiteCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.cursor = connection.conn.cursor()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def execute(self, query, params=()):
+        self.cursor.execute(_translate(query), params)
+        return self.cursor.rowcount
+
+    def executemany(self, query, rows):
+        self.cursor.executemany(_translate(query), rows)
+        return self.cursor.rowcount
+
+    @property
+    def rowcount(self):
+        return self.cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        return self.cursor.lastrowid
+
+    def fetchone(self):
+        return self.cursor.fetchone()
+
+    def fetchall(self):
+        return self.cursor.fetchall()
+
+    def fetchmany(self, size):
+        return self.cursor.fetchmany(size)
+
+    def close(self):
+        self.cursor.close()
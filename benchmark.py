@@ -0,0 +1,280 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+
+from analytics import InventoryAnalytics, inventory_report
+from backends import SQLiteBackend
+from database import DatabaseManager, ProductQuery
+
+WIG_STYLES = ["Lisa", "Cacheada", "Ondulada", "Lace Front", "Chanel", "Black Power", "Franja", "Longa"]
+WIG_COLORS = ["Loira", "Ruiva", "Preta", "Castanha", "Rosa", "Azul", "Platinada", "Lilás"]
+
+
+# Perucas sintéticas para popular o banco
+def synthetic_products(count, seed=42):
+    rng = random.Random(seed)
+    for _ in range(count):
+        name = f"Peruca {rng.choice(WIG_STYLES)} {rng.choice(WIG_COLORS)} {rng.randint(1, 999)}"
+        yield None, name, round(rng.uniform(49.9, 899.9), 2), rng.randint(0, 500)
+
+
+def seed_database(db, count, chunk_size=10000):
+    chunk = []
+    for row in synthetic_products(count):
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            db.bulk_upsert_products(chunk)
+            chunk = []
+    if chunk:
+        db.bulk_upsert_products(chunk)
+
+
+# Estatísticas de latência (ms) de várias execuções
+def latency_summary(samples):
+    samples = sorted(samples)
+    pick = lambda q: samples[min(len(samples) - 1, int(q * len(samples)))] * 1000
+    return {
+        'runs': len(samples),
+        'mean_ms': statistics.mean(samples) * 1000,
+        'p50_ms': pick(0.50),
+        'p95_ms': pick(0.95),
+        'max_ms': samples[-1] * 1000,
+    }
+
+
+def time_calls(func, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return latency_summary(samples)
+
+
+def bench_crud(db, operations):
+    results = {}
+    ids = []
+    start = time.perf_counter()
+    for i in range(operations):
+        ids.append(db.add_product(f"Bench {i}", "", 99.9, i % 50)['id'])
+    results['add_product_ops_s'] = operations / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for i, product_id in enumerate(ids):
+        db.update_product(product_id, f"Bench {i}", "", 109.9, (i * 7) % 50)
+    results['update_product_ops_s'] = operations / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for product_id in ids:
+        db.delete_product(product_id)
+    results['delete_product_ops_s'] = operations / (time.perf_counter() - start)
+    return results
+
+
+def bench_get_products(db, runs):
+    def cold():
+        db.cache.invalidate()
+        db.get_products()
+
+    result = time_calls(cold, runs)
+    db.cache.invalidate()
+    tracemalloc.start()
+    db.get_products()
+    result['peak_memory_mb'] = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+    tracemalloc.stop()
+    return result
+
+
+# Mesmo catálogo em colunas (ProductTable): tempo de carga e memória comparáveis a get_products
+def bench_product_table(db, runs):
+    def cold():
+        db._product_table = (None, None)
+        db.get_product_table()
+
+    result = time_calls(cold, runs)
+    db._product_table = (None, None)
+    tracemalloc.start()
+    table = db.get_product_table()
+    result['peak_memory_mb'] = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+    tracemalloc.stop()
+    result['inventory_value_ms'] = time_calls(table.inventory_value, runs)['mean_ms']
+    return result
+
+
+# Relatório de análises do catálogo: cálculo sobre o ProductTable já carregado e leitura do cache
+def bench_analytics(db, runs):
+    table = db.get_product_table()
+    analytics = InventoryAnalytics(db)
+    analytics.report()
+    return {
+        'inventory_report': time_calls(lambda: inventory_report(table), runs),
+        'cached_report': time_calls(analytics.report, runs),
+    }
+
+
+# Vendas de 1 a 5 itens (checkout) e leitura do ranking de mais vendidos
+def bench_checkout(db, sales):
+    rng = random.Random(7)
+    total = db.count_products()
+    db.execute_query("UPDATE produtos SET estoque = 1000000")
+
+    def sale():
+        items = [(rng.randint(1, total), rng.randint(1, 3)) for _ in range(rng.randint(1, 5))]
+        if not db.checkout(items):
+            raise RuntimeError("venda recusada no benchmark")
+
+    result = {'checkout': time_calls(sale, sales)}
+
+    def top_sellers():
+        db.cache.invalidate()
+        db.get_top_sellers()
+
+    result['top_sellers'] = time_calls(top_sellers, 20)
+    return result
+
+
+def bench_credentials(db, runs):
+    db.add_user("bench@perucas.com", "bench", "senha-bench")
+    return time_calls(lambda: db.check_user_credentials("bench", "senha-bench"), runs)
+
+
+# BackgroundLoader que roda na hora: o tempo medido inclui a busca das páginas
+class ImmediateLoader:
+    def submit(self, key, func, on_done, on_error=None):
+        on_done(func())
+
+    def is_busy(self, key):
+        return False
+
+
+# O que a MainWindow faz ao carregar e rolar a lista e ao desenhar o gráfico, sem Tk: as
+# funções e classes de gui.py que não dependem de widgets, com o gráfico num canvas Agg.
+# Não mede as chamadas ao Treeview (só as linhas visíveis, sem custo que cresça com o catálogo)
+def bench_gui(db, runs, visible_rows=40):
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    from gui import ProductPages, StockChart, fetch_product_list, fetch_stock_chart, format_product_row
+
+    pages = ProductPages(db, ImmediateLoader())
+    fig, ax = plt.subplots(figsize=(6, 5))
+    chart = StockChart(ax, fig.canvas, db.top_n)
+    title = f'Top {db.top_n} Produtos por Estoque'
+
+    def show(top):
+        return [format_product_row(row) for row in pages.rows(top, min(visible_rows, pages.total - top))]
+
+    def load_products():
+        db.cache.invalidate()
+        total, first_page = fetch_product_list(db, ProductQuery(), pages.page_size)
+        data = fetch_stock_chart(db)
+        pages.reset(total, first_page, ProductQuery())
+        show(0)
+        chart.update(data, title=title)
+
+    def plot_sales_data():
+        # Força o redesenho: o gráfico ignora dados idênticos
+        chart.last_hash = None
+        chart.update(db.get_sales_data(), title=title)
+        fig.canvas.draw()
+
+    result = {
+        'load_products': time_calls(load_products, runs),
+        'plot_sales_data': time_calls(plot_sales_data, runs),
+        'scroll_page': time_calls(lambda: show(random.randint(0, max(0, pages.total - visible_rows))), runs),
+    }
+    plt.close(fig)
+    return result
+
+
+def run_size(size, args, workdir):
+    path = os.path.join(workdir, f"bench_{size}.db")
+    db = DatabaseManager(backend=SQLiteBackend(path), cache_ttl=0)
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        db.connect()
+        db.create_tables()
+        start = time.perf_counter()
+        seed_database(db, size)
+        seed_seconds = time.perf_counter() - start
+
+        result = {
+            'rows': size,
+            'seed_s': seed_seconds,
+            'crud': bench_crud(db, args.crud_ops),
+            'get_products': bench_get_products(db, args.runs if size < 1_000_000 else 1),
+            'get_product_table': bench_product_table(db, args.runs if size < 1_000_000 else 1),
+            'analytics': bench_analytics(db, args.runs),
+            'sales': bench_checkout(db, args.crud_ops),
+            'check_user_credentials': bench_credentials(db, args.runs * 10),
+        }
+        if not args.skip_gui:
+            result['gui'] = bench_gui(db, args.runs)
+        result['query_stats'] = db.stats()['queries'][:10]
+        db.disconnect()
+    return result
+
+
+# Diferença percentual entre duas execuções salvas
+def compare(old, new):
+    lines = []
+
+    def walk(prefix, a, b):
+        for key, value in b.items():
+            other = a.get(key) if isinstance(a, dict) else None
+            if isinstance(value, dict):
+                walk(f"{prefix}{key}.", other or {}, value)
+            elif isinstance(value, (int, float)) and isinstance(other, (int, float)) and other:
+                lines.append(f"  {prefix}{key}: {other:.3f} -> {value:.3f} ({(value - other) / other:+.1%})")
+
+    for size, result in new['sizes'].items():
+        if size in old.get('sizes', {}):
+            lines.append(f"{size} linhas:")
+            walk("", old['sizes'][size], result)
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do DatabaseManager e da MainWindow")
+    parser.add_argument('--sizes', default="1000,100000",
+                        help="tamanhos do catálogo separados por vírgula (ex.: 1000,100000,1000000)")
+    parser.add_argument('--runs', type=int, default=20, help="repetições por medição de latência")
+    parser.add_argument('--crud-ops', type=int, default=500, help="operações por tipo no teste de CRUD")
+    parser.add_argument('--skip-gui', action='store_true', help="não mede a MainWindow")
+    parser.add_argument('--output', default=None, help="arquivo JSON de saída")
+    parser.add_argument('--compare', default=None, help="JSON de uma execução anterior para comparar")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(',') if s.strip()]
+    report = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'sqlite': sqlite3.sqlite_version,
+        'sizes': {},
+    }
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in sizes:
+            print(f"⏱️ {size} perucas...")
+            report['sizes'][str(size)] = run_size(size, args, workdir)
+
+    output = args.output or f"benchmark-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Resultados salvos em {output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            print(compare(json.load(f), report))
+
+
+if __name__ == "__main__":
+    main()
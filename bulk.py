@@ -0,0 +1,157 @@
+import csv
+import json
+from decimal import Decimal, InvalidOperation
+
+# Nomes de coluna aceitos nos arquivos de fornecedores
+FIELD_ALIASES = {
+    'id': 'id',
+    'nome': 'nome', 'name': 'nome', 'produto': 'nome',
+    'preco': 'preco', 'preço': 'preco', 'price': 'preco',
+    'estoque': 'estoque', 'stock': 'estoque', 'quantidade': 'estoque',
+}
+
+EXPORT_FIELDS = ['id', 'nome', 'preco', 'estoque']
+
+
+# Regras de um produto válido (as mesmas da janela de cadastro); devolve a mensagem de erro ou None
+def validate_product(name, price, stock):
+    if not name:
+        return "Nome é obrigatório."
+    if price <= 0 or stock < 0:
+        return "Preço deve ser positivo e estoque não pode ser negativo."
+    return None
+
+
+# Estoque inteiro: 3 ou "3" (e 3.0 vindo do JSON); 3.5 é recusado em vez de truncado
+def parse_stock(value):
+    if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+        raise ValueError(value)
+    return int(value)
+
+
+# Converte um registro lido do arquivo em (id, nome, preco, estoque); lança ValueError se inválido
+def parse_product(record):
+    data = {}
+    for key, value in record.items():
+        field = FIELD_ALIASES.get((key or '').strip().lower())
+        if field:
+            data[field] = value.strip() if isinstance(value, str) else value
+
+    name = data.get('nome') or ''
+    try:
+        price = Decimal(str(data.get('preco', '')).replace(',', '.'))
+        stock = parse_stock(data.get('estoque', ''))
+    except (InvalidOperation, ValueError):
+        raise ValueError("Preço e estoque devem ser números válidos.")
+    if not price.is_finite():
+        raise ValueError("Preço e estoque devem ser números válidos.")
+
+    error = validate_product(name, price, stock)
+    if error:
+        raise ValueError(error)
+
+    product_id = data.get('id')
+    product_id = int(product_id) if product_id not in (None, '') else None
+    return product_id, name[:100], price, stock
+
+
+# Lê CSV linha a linha (aceita ';' ou ',' como separador); devolve (linha, registro).
+# A linha 1 é o cabeçalho
+def read_csv(path):
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        sample = f.read(4096)
+        f.seek(0)
+        dialect = csv.Sniffer().sniff(sample, delimiters=';,') if sample else csv.excel
+        for line, record in enumerate(csv.DictReader(f, dialect=dialect), start=2):
+            yield line, record
+
+
+# Lê JSON lines: um objeto por linha; devolve (linha, texto) sem decodificar, para que uma
+# linha inválida seja rejeitada sozinha na importação. Linhas em branco são ignoradas
+def read_jsonl(path):
+    with open(path, encoding='utf-8') as f:
+        for line, text in enumerate(f, start=1):
+            text = text.strip()
+            if text:
+                yield line, text
+
+
+def read_records(path):
+    if path.lower().endswith(('.jsonl', '.json', '.ndjson')):
+        return read_jsonl(path)
+    return read_csv(path)
+
+
+# Resultado de uma importação
+class ImportReport:
+    def __init__(self):
+        self.imported = 0
+        self.rejected = 0
+        self.errors = []
+
+    def add_error(self, line, message):
+        self.rejected += 1
+        self.errors.append((line, message))
+
+    def summary(self, max_errors=10):
+        text = f"{self.imported} produtos importados, {self.rejected} rejeitados."
+        for line, message in self.errors[:max_errors]:
+            text += f"\nLinha {line}: {message}"
+        if len(self.errors) > max_errors:
+            text += f"\n... e mais {len(self.errors) - max_errors} erros."
+        return text
+
+
+# Importa um arquivo em lotes: valida, grava cada lote numa transação e informa o progresso
+def import_products(db_manager, path, chunk_size=1000, progress=None):
+    report = ImportReport()
+    chunk, lines = [], []
+
+    def flush():
+        if db_manager.bulk_upsert_products(chunk):
+            report.imported += len(chunk)
+        else:
+            for line in lines:
+                report.add_error(line, "Falha ao gravar o lote no banco.")
+        chunk.clear()
+        lines.clear()
+        if progress:
+            progress(report.imported, report.rejected)
+
+    for line, record in read_records(path):
+        try:
+            if isinstance(record, str):
+                record = json.loads(record)
+            chunk.append(parse_product(record))
+            lines.append(line)
+        except json.JSONDecodeError as e:
+            report.add_error(line, f"JSON inválido: {e.msg}.")
+        except (ValueError, AttributeError) as e:
+            report.add_error(line, str(e))
+        if len(chunk) >= chunk_size:
+            flush()
+    if chunk:
+        flush()
+    return report
+
+
+# Exporta o catálogo em streaming para CSV ou JSON lines
+def export_products(db_manager, path, progress=None, progress_every=5000):
+    as_jsonl = path.lower().endswith(('.jsonl', '.json', '.ndjson'))
+    count = 0
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = None if as_jsonl else csv.DictWriter(f, fieldnames=EXPORT_FIELDS, extrasaction='ignore')
+        if writer:
+            writer.writeheader()
+        for row in db_manager.iter_products():
+            if writer:
+                writer.writerow(row)
+            else:
+                f.write(json.dumps({k: row[k] for k in EXPORT_FIELDS}, default=str, ensure_ascii=False))
+                f.write('\n')
+            count += 1
+            if progress and count % progress_every == 0:
+                progress(count)
+    if progress:
+        progress(count)
+    return count
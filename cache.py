@@ -0,0 +1,104 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+
+# Tamanho aproximado, em bytes, de um resultado de consulta (lista de dicts, dict ou escalar)
+def estimate_size(value):
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(sys.getsizeof(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_size(v) for v in value)
+    return sys.getsizeof(value)
+
+
+# Cópia de um resultado (lista de linhas, linha ou escalar) para quem o recebe poder alterá-lo
+# sem mexer no que está em cache. Copia as listas e os dicts; os valores das colunas são imutáveis
+def copy_result(value):
+    if isinstance(value, dict):
+        return dict(value)
+    if isinstance(value, list):
+        return [copy_result(v) for v in value]
+    return value
+
+
+# Cache de resultados de consultas com expiração (TTL) e descarte LRU limitado por memória
+class QueryCache:
+    def __init__(self, ttl=30, max_entries=256, max_bytes=32 * 1024 * 1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    # Devolve uma cópia do valor em cache ou chama loader() e guarda o resultado
+    def get_or_load(self, key, loader):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            hit = entry is not None and entry[0] > now
+            if hit:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+                generation = self.invalidations
+        if hit:
+            return copy_result(entry[1])
+
+        value = loader()
+        self.put(key, value, generation)
+        return value
+
+    # Guarda uma cópia do valor; descartado se uma invalidação aconteceu durante a carga.
+    # Com ttl <= 0 nada fica guardado, nem se paga a medição do tamanho
+    def put(self, key, value, generation=None):
+        if self.ttl <= 0:
+            return
+        value = copy_result(value)
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if generation is not None and generation != self.invalidations:
+                return
+            self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, value, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+            }
+
+    # Remove uma entrada (chamado com o lock)
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[2]
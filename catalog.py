@@ -0,0 +1,135 @@
+import sys
+from array import array
+from decimal import Decimal
+
+import numpy as np
+
+# Colunas do catálogo em memória, na ordem em que a consulta 'products.columns' as devolve
+COLUMNS = ('id', 'nome', 'preco', 'estoque')
+
+
+# Centavos (int) para o Decimal de duas casas que o resto do sistema usa em preco
+def cents_to_decimal(cents):
+    return Decimal(int(cents)).scaleb(-2)
+
+
+# Uma linha do ProductTable sem copiar os dados: lê as colunas pelo índice.
+# Aceita row['nome'] e row.get(...) como os dicts do DictCursor, para quem já usa get_products
+class ProductRow:
+    __slots__ = ('table', 'index')
+
+    def __init__(self, table, index):
+        self.table = table
+        self.index = index
+
+    @property
+    def id(self):
+        return int(self.table.ids[self.index])
+
+    @property
+    def nome(self):
+        return self.table.names[self.index]
+
+    @property
+    def preco(self):
+        return cents_to_decimal(self.table.prices[self.index])
+
+    @property
+    def estoque(self):
+        return int(self.table.stock[self.index])
+
+    def __getitem__(self, key):
+        if key not in COLUMNS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in COLUMNS else default
+
+    def keys(self):
+        return COLUMNS
+
+    def to_dict(self):
+        return {key: getattr(self, key) for key in COLUMNS}
+
+    def __repr__(self):
+        return f"ProductRow({self.to_dict()})"
+
+
+# Catálogo em colunas: ids, preços em centavos e estoque em arrays int64, nomes internados.
+# Ocupa uma fração da lista de dicts e as contas sobre o catálogo inteiro viram operações
+# vetorizadas do numpy. Linhas ordenadas por id (como em 'products.columns')
+class ProductTable:
+    def __init__(self, ids, names, prices, stock):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.names = names
+        self.prices = np.asarray(prices, dtype=np.int64)
+        self.stock = np.asarray(stock, dtype=np.int64)
+
+    # Monta as colunas direto das tuplas do cursor, em lotes, sem criar um dict por linha
+    @classmethod
+    def from_cursor(cls, cursor, batch_size=5000):
+        ids, prices, stock = array('q'), array('q'), array('q')
+        names = []
+        intern = sys.intern
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            batch_ids, batch_names, batch_prices, batch_stock = zip(*rows)
+            ids.extend(batch_ids)
+            names.extend([intern(name) if name else '' for name in batch_names])
+            prices.extend(batch_prices)
+            stock.extend(batch_stock)
+        return cls(np.frombuffer(ids, dtype=np.int64), names,
+                   np.frombuffer(prices, dtype=np.int64), np.frombuffer(stock, dtype=np.int64))
+
+    # Tabela a partir de linhas já carregadas (dicts ou ProductRow)
+    @classmethod
+    def from_rows(cls, rows):
+        rows = list(rows)
+        return cls(
+            [row['id'] for row in rows],
+            [sys.intern(row['nome'] or '') for row in rows],
+            [round((row['preco'] or 0) * 100) for row in rows],
+            [row['estoque'] or 0 for row in rows],
+        )
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return ProductRow(self, index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield ProductRow(self, index)
+
+    # Produtos com mais estoque (mesma ordem de 'products.top_stock': estoque desc, id)
+    def top_stock(self, limit=5):
+        if limit < len(self):
+            candidates = np.argpartition(-self.stock, limit - 1)[:limit]
+            # Empates no limite: inclui todos com o menor estoque escolhido para desempatar por id
+            threshold = self.stock[candidates].min()
+            candidates = np.flatnonzero(self.stock >= threshold)
+        else:
+            candidates = np.arange(len(self))
+        order = np.lexsort((self.ids[candidates], -self.stock[candidates]))[:limit]
+        return [ProductRow(self, int(i)) for i in candidates[order]]
+
+    def total_stock(self):
+        return int(self.stock.sum())
+
+    # Valor do estoque (preço x quantidade) somado em centavos, sem erro de arredondamento
+    def inventory_value(self):
+        return cents_to_decimal(int(np.dot(self.prices, self.stock)))
+
+    # Memória aproximada das colunas (os nomes repetidos contam uma vez só)
+    def nbytes(self):
+        unique_names = {id(name): name for name in self.names}
+        return (self.ids.nbytes + self.prices.nbytes + self.stock.nbytes + sys.getsizeof(self.names)
+                + sum(sys.getsizeof(name) for name in unique_names.values()))
@@ -1,180 +1,881 @@
-import pymysql
-from pymysql import Error
+import re
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from backends import ERRORS, MySQLBackend
+from cache import QueryCache
+from instrumentation import QueryStats
+from migrations import migrate
+from passwords import VerifiedSessionCache, dummy_verify, hash_password, verify_password
+from pool import ConnectionPool, PoolTimeout
+from ranking import TopStockIndex
+from statements import StatementRegistry
+
+# Erros tratados pelos métodos do DatabaseManager
+Error = ERRORS
+DB_ERRORS = ERRORS + (PoolTimeout,)
+
+# Tombstone com produto_id 0: produtos mudaram por um comando livre (execute_query, batch) e
+# não se sabe quais linhas; quem acompanha as mudanças (get_changes_since) relê o catálogo
+UNKNOWN_CHANGES = 0
+
+# Comando livre que cita a tabela produtos (produtos_removidos não conta)
+WRITES_PRODUCTS = re.compile(r'\bprodutos\b', re.IGNORECASE)
+
+# Centavos: arredondamento dos preços e totais de venda
+CENT = Decimal('0.01')
+
+# Colunas pelas quais a lista de produtos pode ser ordenada. A interface escolhe pela chave;
+# o texto da coluna nunca vem de fora. No SQLite o nome compara sem maiúsculas (como no MySQL)
+PRODUCT_SORTS = {
+    'mysql': {'id': 'id', 'nome': 'nome', 'preco': 'preco', 'estoque': 'estoque'},
+    'sqlite': {'id': 'id', 'nome': 'nome COLLATE NOCASE', 'preco': 'preco', 'estoque': 'estoque'},
+}
+
+
+# Escapa os curingas do LIKE e devolve o padrão "começa com" (atendido pelo índice em nome)
+def like_prefix(text):
+    return text.replace('!', '!!').replace('%', '!%').replace('_', '!_') + '%'
+
+
+# Busca e ordenação da lista de produtos. Cada linha tem a chave (valor da coluna, id), usada
+# na paginação por chave: a próxima página começa depois da última chave, sem OFFSET
+class ProductQuery:
+    def __init__(self, search='', sort='id', descending=False):
+        if sort not in PRODUCT_SORTS['mysql']:
+            raise ValueError(f"Ordenação inválida: {sort}")
+        self.search = (search or '').strip()
+        self.sort = sort
+        self.descending = bool(descending)
+
+    def key(self, row):
+        return (row[self.sort], row['id'])
+
+    # Formato do SQL gerado (os valores vão nos parâmetros): chave do texto já montado
+    def shape(self, after=None):
+        return (self.sort, self.descending, bool(self.search), after is not None,
+                after is not None and after[0] is None)
+
+    # Mesma regra do WHERE, para decidir na interface se uma linha nova entra na lista
+    def matches(self, row):
+        return not self.search or str(row.get('nome') or '').lower().startswith(self.search.lower())
+
+    # Devolve (WHERE, ORDER BY, parâmetros); after é a chave da última linha já carregada
+    def sql(self, dialect, after=None):
+        column = PRODUCT_SORTS[dialect][self.sort]
+        op = '<' if self.descending else '>'
+        direction = 'DESC' if self.descending else 'ASC'
+        conditions, params = [], []
+        if self.search:
+            conditions.append("nome LIKE %s ESCAPE '!'")
+            params.append(like_prefix(self.search))
+        if after is not None:
+            # NULL (nome, preço ou estoque de cadastros antigos) vem antes de qualquer valor no
+            # MySQL e no SQLite, e "coluna > NULL" nunca é verdade: os NULL têm condição própria
+            if self.sort == 'id':
+                conditions.append(f"id {op} %s")
+                params.append(after[1])
+            elif after[0] is None:
+                rest = "" if self.descending else f" OR {column} IS NOT NULL"
+                conditions.append(f"(({column} IS NULL AND id {op} %s){rest})")
+                params.append(after[1])
+            else:
+                rest = f" OR {column} IS NULL" if self.descending else ""
+                conditions.append(f"({column} {op} %s OR ({column} = %s AND id {op} %s){rest})")
+                params.extend([after[0], after[0], after[1]])
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        if self.sort == 'id':
+            order = f"ORDER BY id {direction}"
+        else:
+            order = f"ORDER BY {column} {direction}, id {direction}"
+        return where, order, params
 
 class DatabaseManager:
-    def __init__(self, host, user, password, database):
+    # Sem backend explícito usa MySQL com host/user/password/database
+    def __init__(self, host=None, user=None, password=None, database=None, pool_size=5, idle_timeout=300,
+                 cache_ttl=30, cache_max_bytes=32 * 1024 * 1024, top_n=5, backend=None,
+                 slow_query_threshold=0.2, session_ttl=300):
         self.host = host
         self.user = user
         self.password = password
         self.database = database
-        self.conn = None
-        self.cursor = None
+        self.backend = backend or MySQLBackend(host, user, password, database)
+        self.pool_size = pool_size
+        self.idle_timeout = idle_timeout
+        self.pool = None
+        self._tx = threading.local()
+        # Cache de leituras; qualquer escrita o invalida
+        self.cache = QueryCache(ttl=cache_ttl, max_bytes=cache_max_bytes)
+        # Ranking de estoque do gráfico, atualizado pelas escritas de produtos
+        self.top_n = top_n
+        self.top_stock = TopStockIndex(n=top_n)
+        # Tempo, linhas e origem de cada consulta; as lentas vão para o log
+        self.query_stats = QueryStats(slow_threshold=slow_query_threshold)
+        # Logins verificados recentemente não pagam o custo do hash de novo
+        self.sessions = VerifiedSessionCache(ttl=session_ttl)
+        # Texto de cada comando montado uma vez para o dialeto, com contagem de execuções
+        self.statements = StatementRegistry(self.backend.dialect)
+        # Último catálogo em colunas carregado e a versão do catálogo em que foi lido
+        self._product_table = (None, None)
+        self._product_table_lock = threading.Lock()
 
     def connect(self):
         try:
-            # Configurações para conexão com banco de dados
-            self.conn = pymysql.connect(
-                host=self.host,
-                user=self.user,
-                password=self.password,
-                charset='utf8mb4',
-                cursorclass=pymysql.cursors.DictCursor
+            self.backend.prepare()
+
+            # Conexões do dia a dia saem do pool, uma por chamada/thread
+            self.pool = ConnectionPool(
+                self.backend.connect,
+                max_size=self.pool_size,
+                idle_timeout=self.idle_timeout,
+                ping=self.backend.ping
             )
+            with self.pool.connection():
+                pass
             
-            self.cursor = self.conn.cursor()
-            
-            # Criar banco se não existir
-            self.cursor.execute(f"CREATE DATABASE IF NOT EXISTS {self.database}")
-            self.cursor.execute(f"USE {self.database}")
-            
-            print("✅ Conectado ao MySQL e banco verificado!")
+            print(f"✅ Conectado ao {self.backend.label} e banco verificado!")
             return True
             
-        except Error as e:
+        except (*Error, OSError) as e:
             print(f"❌ Erro na conexão: {e}")
             return False
 
     # Disconecta do Banco de Dados
     def disconnect(self):
-        if self.cursor:
-            self.cursor.close()
-        if self.conn:
-            self.conn.close()
+        if self.pool:
+            self.pool.close()
+
+    # Cursor de uma conexão do pool, seguro para uso em qualquer thread
+    @contextmanager
+    def _cursor(self, cursorclass=None):
+        with self.pool.connection() as conn:
+            with conn.cursor(cursorclass) as cursor:
+                yield cursor
+
+    # Estatísticas do pool de conexões
+    def pool_stats(self):
+        return self.pool.stats() if self.pool else {}
+
+    # Acertos/erros do cache de consultas
+    def cache_stats(self):
+        return self.cache.stats()
+
+    # Métricas de consultas (por comando), do pool e do cache
+    def stats(self):
+        return {
+            'queries': self.query_stats.stats(),
+            'pool': self.pool_stats(),
+            'cache': self.cache_stats(),
+            'statements': self.statements.counts(),
+        }
+
+    # Indica se a thread atual está dentro de transaction()
+    def in_transaction(self):
+        return getattr(self._tx, 'depth', 0) > 0
+
+    # Agrupa as escritas do bloco num único commit; desfaz tudo se houver erro.
+    # Blocos aninhados viram SAVEPOINTs (ou se juntam à transação externa com savepoint=False)
+    @contextmanager
+    def transaction(self, savepoint=True):
+        with self.pool.connection() as conn:
+            depth = getattr(self._tx, 'depth', 0)
+            name = f"sp_{depth}"
+            if depth == 0:
+                conn.begin()
+                self._tx.catalog_version = None
+                self._tx.ranking_changed = False
+            elif savepoint:
+                with conn.cursor() as cursor:
+                    cursor.execute(f"SAVEPOINT {name}")
+
+            self._tx.depth = depth + 1
+            try:
+                yield conn
+            except BaseException:
+                self._tx.depth = depth
+                # A soma na versão do catálogo pode ter sido desfeita junto
+                self._tx.catalog_version = None
+                if depth == 0:
+                    conn.rollback()
+                    self.cache.invalidate()
+                    self.top_stock.invalidate()
+                elif savepoint:
+                    with conn.cursor() as cursor:
+                        cursor.execute(f"ROLLBACK TO SAVEPOINT {name}")
+                raise
+            self._tx.depth = depth
+            if depth == 0:
+                conn.commit()
+                self.cache.invalidate()
+                if self._tx.ranking_changed:
+                    self.top_stock.invalidate()
+            elif savepoint:
+                with conn.cursor() as cursor:
+                    cursor.execute(f"RELEASE SAVEPOINT {name}")
+
+    # Enfileira escritas e as envia juntas, numa transação, ao sair do bloco
+    @contextmanager
+    def batch(self, savepoint=True):
+        batch = StatementBatch(self)
+        yield batch
+        batch.flush(savepoint=savepoint)
+
+    # Soma 1 à versão do catálogo (uma vez por transação) e devolve o novo valor, que marca as
+    # linhas alteradas. Só dentro de transaction(): a linha do contador fica travada até o commit,
+    # então as versões seguem a ordem dos commits
+    def _catalog_version(self):
+        version = getattr(self._tx, 'catalog_version', None)
+        if version is None:
+            self.execute_write(self.statements.sql('catalog.bump'))
+            version = self._fetch(self.statements.sql('catalog.version'), one=True)['versao']
+            self._tx.catalog_version = version
+        return version
+
+    # Registra produtos apagados para quem acompanha só as mudanças (get_changes_since)
+    def _mark_removed(self, product_ids):
+        version = self._catalog_version()
+        self.execute_many(self.statements.sql('products.tombstone'),
+                          [(product_id, version) for product_id in product_ids], ranking_changed=False)
+
+    # Escrita que o ranking de estoque não acompanha: descarta o ranking agora e, dentro de
+    # transaction(), de novo no commit (outra thread pode tê-lo recarregado sem ver a escrita)
+    def _ranking_changed(self):
+        self.top_stock.invalidate()
+        if self.in_transaction():
+            self._tx.ranking_changed = True
+
+    # Comando livre que pode ter mudado produtos: soma a versão do catálogo e grava o tombstone
+    # UNKNOWN_CHANGES (só dentro de transaction())
+    def _mark_unknown_changes(self, queries):
+        if any(WRITES_PRODUCTS.search(query) for query in queries):
+            self._mark_removed([UNKNOWN_CHANGES])
 
     # Executa INSERT, UPDATE e DELETE
     def execute_query(self, query, params=None):
         try:
-            self.cursor.execute(query, params or ())
-            self.conn.commit()
-            return True
-        except Error as e:
+            with self.transaction():
+                self.execute_write(query, params)
+                self._mark_unknown_changes([query])
+        except DB_ERRORS as e:
+            if self.in_transaction():
+                raise
             print(f"❌ Erro ao executar query: {e}")
             return False
+        finally:
+            # Comando arbitrário: o ranking de estoque não sabe o que mudou
+            self._ranking_changed()
+        return True
+
+    # Executa uma escrita e devolve (linhas afetadas, último id inserido), ou None em erro.
+    # Dentro de transaction() o commit fica para o fim do bloco e o erro é propagado
+    def execute_write(self, query, params=None):
+        try:
+            with self._cursor() as cursor:
+                start = time.perf_counter()
+                cursor.execute(query, params or ())
+                if not self.in_transaction():
+                    cursor.connection.commit()
+                self.query_stats.record(query, time.perf_counter() - start, cursor.rowcount)
+                self.cache.invalidate()
+                return cursor.rowcount, cursor.lastrowid
+        except DB_ERRORS as e:
+            if self.in_transaction():
+                raise
+            print(f"❌ Erro ao executar query: {e}")
+            return None
+
+    # Executa o mesmo comando para várias linhas de parâmetros. Sem dizer o contrário
+    # (ranking_changed=False), assume que o ranking de estoque pode ter mudado
+    def execute_many(self, query, rows, ranking_changed=True):
+        try:
+            with self._cursor() as cursor:
+                start = time.perf_counter()
+                cursor.executemany(query, rows)
+                if not self.in_transaction():
+                    cursor.connection.commit()
+                self.query_stats.record(query, time.perf_counter() - start, cursor.rowcount)
+                self.cache.invalidate()
+                if ranking_changed:
+                    self._ranking_changed()
+                return cursor.rowcount
+        except DB_ERRORS as e:
+            if self.in_transaction():
+                raise
+            print(f"❌ Erro ao executar query: {e}")
+            return None
+
+    # Executa uma leitura sem tratar erros
+    def _fetch(self, query, params=None, one=False):
+        with self._cursor() as cursor:
+            start = time.perf_counter()
+            cursor.execute(query, params or ())
+            result = cursor.fetchone() if one else cursor.fetchall()
+            rows = (result is not None) if one else len(result)
+            self.query_stats.record(query, time.perf_counter() - start, rows)
+            return result
+
+    # Leitura através do cache (fora de transações, que precisam ver as próprias escritas)
+    def _cached_fetch(self, query, params, one):
+        if self.in_transaction():
+            return self._fetch(query, params, one)
+        key = (one, query, tuple(params) if params else ())
+        return self.cache.get_or_load(key, lambda: self._fetch(query, params, one))
 
     # Busca dados
-    def fetch_all(self, query, params=None):
+    def fetch_all(self, query, params=None, cached=False):
         try:
-            self.cursor.execute(query, params or ())
-            return self.cursor.fetchall()
-        except Error as e:
+            if cached:
+                return self._cached_fetch(query, params, one=False)
+            return self._fetch(query, params)
+        except DB_ERRORS as e:
+            if self.in_transaction():
+                raise
             print(f"❌ Erro ao buscar dados: {e}")
             return []
 
     # Busca um dado único
-    def fetch_one(self, query, params=None):
+    def fetch_one(self, query, params=None, cached=False):
         try:
-            self.cursor.execute(query, params or ())
-            return self.cursor.fetchone()
-        except Error as e:
+            if cached:
+                return self._cached_fetch(query, params, one=True)
+            return self._fetch(query, params, one=True)
+        except DB_ERRORS as e:
+            if self.in_transaction():
+                raise
             print(f"❌ Erro ao buscar dado único: {e}")
             return None
         
-    # Cria as tabelas necessárias se não existirem
+    # Cria/atualiza o esquema pelas migrações versionadas (sem DDL se já estiver em dia)
     def create_tables(self):
         try:
-            self.cursor.execute("""
-                CREATE TABLE IF NOT EXISTS usuarios (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    nome VARCHAR(100),
-                    email VARCHAR(100),
-                    senha VARCHAR(255)
-                )
-            """)
-            
-            self.cursor.execute("""
-                CREATE TABLE IF NOT EXISTS produtos (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    nome VARCHAR(100),
-                    preco DECIMAL(10,2),
-                    estoque INT
-                )
-            """)
-            
-            self.conn.commit()
+            migrate(self)
             print("✅ Tabelas criadas/verificadas com sucesso!")
             return True
             
-        except Error as e:
+        except DB_ERRORS as e:
             print(f"❌ Erro ao criar tabelas: {e}")
             return False
     
-    # Verifica se o usuário e senha são válidos"
+    # Verifica se o usuário e senha são válidos (busca pelo nome indexado e confere o hash).
+    # Lento de propósito: na interface, chamar fora da thread do Tk
     def check_user_credentials(self, username, password):
         try:
-            query = "SELECT * FROM usuarios WHERE nome = %s AND senha = %s"
-            self.cursor.execute(query, (username, password))
-            user = self.cursor.fetchone()
-            return user is not None
-        except Error as e:
+            if self.sessions.check(username, password):
+                return True
+            user = self._fetch(self.statements.sql('users.credentials'), (username,), one=True)
+            if user is None:
+                dummy_verify(password)
+                return False
+            ok, rehash = verify_password(password, user['senha'])
+            if not ok:
+                return False
+            # Senha antiga em texto puro (ou com custo desatualizado): regrava com o hash atual
+            if rehash:
+                self.execute_write(
+                    self.statements.sql('users.rehash'),
+                    (hash_password(password), user['id'], user['senha'])
+                )
+            self.sessions.add(username, password)
+            return True
+        except DB_ERRORS as e:
             print(f"❌ Erro ao verificar credenciais: {e}")
             return False
 
-    # Cadastra um novo usuário
+    # Cadastra um novo usuário (a senha é gravada só como hash)
     def add_user(self, email, username, password):
         try:
-            query = "INSERT INTO usuarios (email, nome, senha) VALUES (%s, %s, %s)"
-            self.cursor.execute(query, (email, username, password))
-            self.conn.commit()
+            query = self.statements.sql('users.insert')
+            if self.execute_write(query, (email, username, hash_password(password))) is None:
+                return False
             print(f"✅ Usuário {username} criado com sucesso!")
             return True
-        except Error as e:
+        except DB_ERRORS as e:
+            if self.in_transaction():
+                raise
             print(f"❌ Erro ao adicionar usuário: {e}")
             return False
 
-    # Busca produtos
+    # Busca produtos (materializa o catálogo inteiro; para listas grandes use iter_products)
     def get_products(self):
         try:
-            query = "SELECT * FROM produtos ORDER BY id"
-            return self.fetch_all(query)
+            return self.fetch_all(self.statements.sql('products.all'), cached=True)
         except Error as e:
             print(f"❌ Erro ao buscar produtos: {e}")
             return []
 
-    # Adiciona produtos
+    # Percorre o catálogo em lotes com cursor de leitura sob demanda (memória constante)
+    def iter_products(self, batch_size=1000):
+        # Conexão dedicada: o resultado sem buffer ocupa a conexão até o fim da leitura
+        conn = self.pool.acquire()
+        finished = False
+        try:
+            query = self.statements.sql('products.all')
+            cursor = self.backend.stream_cursor(conn)
+            start = time.perf_counter()
+            cursor.execute(query)
+            self.query_stats.record(query, time.perf_counter() - start)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from rows
+            cursor.close()
+            finished = True
+        except Error as e:
+            print(f"❌ Erro ao percorrer produtos: {e}")
+        finally:
+            # Leitura interrompida: descartar a conexão sai mais barato que drenar o resto
+            self.pool.release(conn, discard=not finished)
+
+    # Catálogo inteiro em colunas (ProductTable), lido direto do cursor em tuplas.
+    # Reaproveitado enquanto a versão do catálogo não mudar; None em caso de erro
+    def get_product_table(self, batch_size=5000):
+        try:
+            version = self._fetch(self.statements.sql('catalog.version'), one=True)
+            version = version['versao'] if version else 0
+            with self._product_table_lock:
+                cached_version, table = self._product_table
+                if table is not None and cached_version == version and not self.in_transaction():
+                    return table
+            table = self._load_product_table(batch_size)
+            with self._product_table_lock:
+                if not self.in_transaction():
+                    self._product_table = (version, table)
+            return table
+        except DB_ERRORS as e:
+            if self.in_transaction():
+                raise
+            print(f"❌ Erro ao carregar catálogo: {e}")
+            return None
+
+    # Lê o catálogo inteiro de uma vez (não é gerador: a conexão fica livre ao final)
+    def _load_product_table(self, batch_size):
+        # Importado só aqui: abrir o programa não carrega o numpy
+        from catalog import ProductTable
+        with self.pool.connection() as conn:
+            query = self.statements.sql('products.columns')
+            cursor = self.backend.stream_cursor(conn, tuples=True)
+            try:
+                start = time.perf_counter()
+                cursor.execute(query)
+                table = ProductTable.from_cursor(cursor, batch_size)
+                self.query_stats.record(query, time.perf_counter() - start, len(table))
+                return table
+            finally:
+                cursor.close()
+
+    # Busca uma página de produtos a partir de um id (paginação por chave)
+    def get_products_page(self, after_id=0, limit=100):
+        return self.query_products(after=(after_id, after_id) if after_id else None, limit=limit)
+
+    # Página da lista com busca e ordenação feitas no banco; after é a chave da última linha
+    # da página anterior (ProductQuery.key)
+    def query_products(self, query=None, after=None, limit=100):
+        query = query or ProductQuery()
+        where, order, params = query.sql(self.backend.dialect, after)
+        try:
+            sql = self.statements.variant('products.page', query.shape(after),
+                                          lambda: f"SELECT * FROM produtos {where} {order} LIMIT %s")
+            return self.fetch_all(sql, (*params, limit), cached=True)
+        except Error as e:
+            print(f"❌ Erro ao buscar página de produtos: {e}")
+            return []
+
+    # Conta os produtos cadastrados (ou os que atendem à busca)
+    def count_products(self, query=None):
+        query = query or ProductQuery()
+        where, _, params = query.sql(self.backend.dialect)
+        sql = self.statements.variant('products.count', bool(query.search),
+                                      lambda: f"SELECT COUNT(*) AS total FROM produtos {where}")
+        row = self.fetch_one(sql, params, cached=True)
+        return row['total'] if row else 0
+
+    # Chave do produto offset posições depois da chave after (ou do começo da lista), para saltos
+    # da barra de rolagem. Só as colunas da chave: o OFFSET percorre o índice, sem ler as linhas
+    def get_product_key_at(self, offset, query=None, after=None):
+        query = query or ProductQuery()
+        where, order, params = query.sql(self.backend.dialect, after)
+        columns = 'id' if query.sort == 'id' else f"{query.sort}, id"
+        sql = self.statements.variant('products.key_at', query.shape(after),
+                                      lambda: f"SELECT {columns} FROM produtos {where} {order} LIMIT 1 OFFSET %s")
+        row = self.fetch_one(sql, (*params, offset), cached=True)
+        return query.key(row) if row else None
+
+    # Busca um produto pelo id
+    def get_product(self, product_id):
+        return self.fetch_one(self.statements.sql('products.get'), (product_id,), cached=True)
+
+    # Adiciona produtos e devolve a linha criada (ou False). O estoque inicial entra no histórico
     def add_product(self, name, description, price, stock):
         try:
-            query = "INSERT INTO produtos (nome, preco, estoque) VALUES (%s, %s, %s)"
-            result = self.execute_query(query, (name, price, stock))
-            if result:
-                print(f"✅ Produto {name} adicionado com sucesso!")
-            return result
+            with self.transaction():
+                result = self.execute_write(self.statements.sql('products.insert'),
+                                            (name, price, stock, self._catalog_version()))
+                if result is None:
+                    return False
+                self.record_movements([(result[1], stock, 'cadastro')], apply=False)
+            print(f"✅ Produto {name} adicionado com sucesso!")
+            row = {'id': result[1], 'nome': name, 'preco': price, 'estoque': stock}
+            self.top_stock.upsert(row)
+            return row
         except Error as e:
+            if self.in_transaction():
+                raise
             print(f"❌ Erro ao adicionar produto: {e}")
             return False
 
-    # Atualiza produtos
+    # Atualiza produtos e devolve os novos valores (False se o id não existir).
+    # O estoque informado é absoluto: vira um movimento com a diferença para o valor atual
     def update_product(self, product_id, name, description, price, stock):
         try:
-            query = """
-                UPDATE produtos 
-                SET nome = %s, preco = %s, estoque = %s 
-                WHERE id = %s
-            """
-            result = self.execute_query(query, (name, price, stock, product_id))
-            if result:
-                print(f"✅ Produto ID {product_id} atualizado com sucesso!")
-            return result
+            with self.transaction():
+                current = self._fetch(self.statements.sql('products.lock_stock'), (product_id,), one=True)
+                if current is None:
+                    return False
+                self.execute_write(self.statements.sql('products.update_details'),
+                                   (name, price, self._catalog_version(), product_id))
+                self.record_movements([(product_id, stock - (current['estoque'] or 0), 'ajuste')])
+            print(f"✅ Produto ID {product_id} atualizado com sucesso!")
+            row = {'id': product_id, 'nome': name, 'preco': price, 'estoque': stock}
+            self.top_stock.upsert(row)
+            return row
+        except ValueError as e:
+            if self.in_transaction():
+                raise
+            print(f"❌ Produto ID {product_id} não pôde ser atualizado: {e}")
+            return False
         except Error as e:
+            if self.in_transaction():
+                raise
             print(f"❌ Erro ao atualizar produto: {e}")
             return False
 
-    # Deleta produtos
+    # Deleta produtos e devolve o id removido (False se o id não existir)
     def delete_product(self, product_id):
         try:
-            query = "DELETE FROM produtos WHERE id = %s"
-            result = self.execute_query(query, (product_id,))
-            if result:
-                print(f"✅ Produto ID {product_id} deletado com sucesso!")
-            return result
+            with self.transaction():
+                current = self._fetch(self.statements.sql('products.lock_stock'), (product_id,), one=True)
+                if current is None:
+                    return False
+                self.execute_write(self.statements.sql('products.delete'), (product_id,))
+                self._mark_removed([product_id])
+                self.record_movements([(product_id, -(current['estoque'] or 0), 'exclusao')], apply=False)
+            print(f"✅ Produto ID {product_id} deletado com sucesso!")
+            self.top_stock.remove(product_id)
+            return {'id': product_id}
+        except ValueError as e:
+            if self.in_transaction():
+                raise
+            print(f"❌ Produto ID {product_id} não pôde ser deletado: {e}")
+            return False
         except Error as e:
+            if self.in_transaction():
+                raise
             print(f"❌ Erro ao deletar produto: {e}")
             return False
 
-    # Busca dados para o grafico
-    def get_sales_data(self):
+    # Entrada (delta > 0) ou saída (delta < 0) de estoque sem ler o valor atual.
+    # Devolve a linha atualizada, ou False se o produto não existe ou o estoque não basta
+    def adjust_stock(self, product_id, delta, reason='ajuste'):
+        rows = self.record_movements([(product_id, delta, reason)])
+        if not rows:
+            return False
+        return rows.get(product_id, False)
+
+    # Registra um lote de movimentos (produto, delta, motivo) numa transação: grava o histórico,
+    # aplica os deltas em produtos (com apply) e soma nos resumos por produto e por dia.
+    # Relatórios e gráfico leem só os resumos. Devolve {id: linha atualizada} (vazio sem apply)
+    # ou False se algum produto não existe ou ficaria com estoque negativo.
+    # savepoint=False junta o lote à transação de quem chamou, sem SAVEPOINT
+    def record_movements(self, movements, apply=True, savepoint=True):
+        movements = [(product_id, int(delta), reason) for product_id, delta, reason in movements if delta]
+        if not movements:
+            return {}
+        now = datetime.now()
+        stamp = now.strftime('%Y-%m-%d %H:%M:%S')
+        day = now.date().isoformat()
+
+        # Um delta líquido por produto: uma linha de UPDATE e uma de cada resumo por produto
+        totals = {}
+        for product_id, delta, _ in movements:
+            total = totals.setdefault(product_id, [0, 0, 0])
+            total[0 if delta > 0 else 1] += abs(delta)
+            total[2] += 1
+
         try:
-            query = "SELECT nome, estoque FROM produtos ORDER BY estoque DESC LIMIT 5"
-            return self.fetch_all(query)
-        except Error as e:
+            with self.transaction(savepoint=savepoint):
+                if apply:
+                    changes = {product_id: inflow - outflow
+                               for product_id, (inflow, outflow, _) in totals.items() if inflow != outflow}
+                    if changes and self._add_stock(changes) < len(changes):
+                        raise ValueError("produto inexistente ou estoque insuficiente")
+                self.execute_many(self.statements.sql('movements.insert'),
+                                  [(product_id, delta, reason, stamp) for product_id, delta, reason in movements],
+                                  ranking_changed=False)
+                self.execute_many(self.statements.sql('movements.product_totals'),
+                                  [(product_id, inflow, outflow, count, stamp)
+                                   for product_id, (inflow, outflow, count) in totals.items()],
+                                  ranking_changed=False)
+                self.execute_many(self.statements.sql('movements.daily_totals'),
+                                  [(day, product_id, inflow, outflow, count)
+                                   for product_id, (inflow, outflow, count) in totals.items()],
+                                  ranking_changed=False)
+                rows = self._products_by_ids(list(totals)) if apply else []
+        except ValueError as e:
+            if self.in_transaction():
+                raise
+            print(f"❌ Movimento de estoque recusado: {e}")
+            return False
+        except DB_ERRORS as e:
+            if self.in_transaction():
+                raise
+            print(f"❌ Erro ao registrar movimentos de estoque: {e}")
+            return False
+
+        # Lotes grandes mexem em muito do ranking: mais barato recalcular na próxima leitura
+        if apply and len(rows) > self.top_stock.capacity:
+            self.top_stock.invalidate()
+        else:
+            for row in rows:
+                self.top_stock.upsert(row)
+        return {row['id']: row for row in rows}
+
+    # Soma os deltas ({id: delta}) com um único UPDATE por bloco de produtos (CASE pelo id),
+    # sem deixar estoque negativo. Não mexe em versao (que protege nome/preço): deltas de
+    # estoque se somam e não geram conflito com edições feitas em outro terminal. Devolve quantas linhas mudaram: menos que o pedido quer dizer
+    # produto inexistente ou estoque insuficiente
+    def _add_stock(self, deltas):
+        version = self._catalog_version()
+        items = list(deltas.items())
+        changed = 0
+        for start in range(0, len(items), 200):
+            chunk = items[start:start + 200]
+
+            def build():
+                case = "CASE id " + " ".join(["WHEN %s THEN %s"] * len(chunk)) + " END"
+                return f"""
+                    UPDATE produtos SET estoque = COALESCE(estoque, 0) + {case}, alterado_em_versao = %s
+                    WHERE id IN ({', '.join(['%s'] * len(chunk))}) AND COALESCE(estoque, 0) + {case} >= 0
+                """
+
+            sql = self.statements.variant('products.add_stock', len(chunk), build)
+            cases = [value for product_id, delta in chunk for value in (product_id, delta)]
+            params = cases + [version] + [product_id for product_id, _ in chunk] + cases
+            changed += self.execute_write(sql, params)[0]
+        return changed
+
+    # Linhas atuais de vários produtos numa única consulta (sem cache: usada logo após escritas)
+    def _products_by_ids(self, product_ids):
+        rows = []
+        for start in range(0, len(product_ids), 500):
+            chunk = product_ids[start:start + 500]
+            sql = self.statements.variant(
+                'products.by_ids', len(chunk),
+                lambda: f"SELECT * FROM produtos WHERE id IN ({', '.join(['%s'] * len(chunk))})"
+            )
+            rows.extend(self._fetch(sql, chunk))
+        return rows
+
+    # Totais de entradas/saídas de um produto (resumo mantido a cada movimento)
+    def get_movement_summary(self, product_id):
+        return self.fetch_one(self.statements.sql('movements.product_summary'), (product_id,), cached=True)
+
+    # Entradas/saídas de todo o catálogo por dia, a partir do resumo diário
+    def get_daily_movements(self, days=30):
+        since = (date.today() - timedelta(days=days - 1)).isoformat()
+        return self.fetch_all(self.statements.sql('movements.daily_summary'), (since,), cached=True)
+
+    # Saídas por produto nos últimos dias (velocidade de venda), lidas do resumo diário
+    def get_stock_outflow(self, product_ids, days=30):
+        if not product_ids:
+            return {}
+        since = (date.today() - timedelta(days=days - 1)).isoformat()
+        sql = self.statements.variant(
+            'movements.outflow', len(product_ids),
+            lambda: f"""
+                SELECT produto_id, SUM(saidas) AS saidas FROM estoque_resumo_diario
+                WHERE dia >= %s AND produto_id IN ({', '.join(['%s'] * len(product_ids))})
+                GROUP BY produto_id
+            """
+        )
+        rows = self.fetch_all(sql, (since, *product_ids), cached=True)
+        return {row['produto_id']: int(row['saidas'] or 0) for row in rows}
+
+    # Insere/atualiza vários produtos num único comando e numa única transação. O estoque vem
+    # absoluto: a diferença para o anterior entra no histórico e nos resumos, como movimento
+    # 'importacao'. Os produtos novos (sem id) são achados pela versão do catálogo da transação
+    def bulk_upsert_products(self, rows):
+        query = self.statements.sql('products.upsert')
+        try:
+            with self.transaction():
+                version = self._catalog_version()
+                stamped = self.statements.sql('catalog.stamped')
+                before = {row['id']: row['estoque'] for row in self._fetch(stamped, (version,))}
+                before.update((row['id'], row['estoque'])
+                              for row in self._products_by_ids([row[0] for row in rows if row[0] is not None]))
+                self.execute_many(query, [(*row, version) for row in rows])
+                self.record_movements([(row['id'], (row['estoque'] or 0) - (before.get(row['id']) or 0), 'importacao')
+                                       for row in self._fetch(stamped, (version,))],
+                                      apply=False, savepoint=False)
+            return True
+        except DB_ERRORS as e:
+            if self.in_transaction():
+                raise
+            print(f"❌ Erro ao importar produtos: {e}")
+            return False
+
+    # Versão atual do catálogo: uma consulta mínima, sem cache (precisa ver outros terminais)
+    def get_catalog_version(self):
+        try:
+            row = self._fetch(self.statements.sql('catalog.version'), one=True)
+            return row['versao'] if row else 0
+        except DB_ERRORS as e:
+            print(f"❌ Erro ao buscar versão do catálogo: {e}")
+            return None
+
+    # Mudanças desde uma versão: None se nada mudou; senão (nova versão, linhas alteradas,
+    # ids removidos). Mudanças que chegarem durante a leitura podem vir de novo na próxima vez.
+    # Linhas demais (> limit) ou mudanças sem linhas conhecidas (UNKNOWN_CHANGES) vêm como
+    # (nova versão, None, None): recarregue tudo.
+    # Mudanças de outros terminais também atualizam o cache e o ranking deste processo
+    def get_changes_since(self, version, limit=500):
+        current = self.get_catalog_version()
+        if current is None or current == version:
+            return None
+        try:
+            rows = self._fetch(self.statements.sql('catalog.changed'), (version, limit + 1))
+            removed = self._fetch(self.statements.sql('catalog.removed'), (version, limit + 1))
+        except DB_ERRORS as e:
+            print(f"❌ Erro ao buscar mudanças do catálogo: {e}")
+            return None
+        self.cache.invalidate()
+        if len(rows) > limit or len(removed) > limit or any(r['produto_id'] == UNKNOWN_CHANGES for r in removed):
+            self.top_stock.invalidate()
+            return current, None, None
+        # Removido e recriado depois (importação com id): vale a linha
+        alive = {row['id'] for row in rows}
+        removed_ids = [r['produto_id'] for r in removed if r['produto_id'] not in alive]
+        for product_id in removed_ids:
+            self.top_stock.remove(product_id)
+        for row in rows:
+            self.top_stock.upsert(row)
+        return current, rows, removed_ids
+
+    # Busca dados para o grafico: servido pelo ranking em memória, que só consulta o banco
+    # na primeira carga ou depois de uma mudança que ele não consegue acompanhar
+    def get_sales_data(self, limit=None):
+        limit = limit or self.top_n
+        try:
+            rows = self.top_stock.top(limit)
+            if rows is not None:
+                return rows
+            self.top_stock.reserve(limit)
+            generation = self.top_stock.generation()
+            rows = self._fetch(self.statements.sql('products.top_stock'), (self.top_stock.capacity,))
+            self.top_stock.seed(rows, generation)
+            return rows[:limit]
+        except DB_ERRORS as e:
             print(f"❌ Erro ao buscar dados de vendas: {e}")
             return []
+
+    # Registra uma venda de vários itens ([(id do produto, quantidade), ...]) numa transação:
+    # baixa o estoque (recusa tudo se algum item não tiver estoque), grava o histórico de
+    # movimentos, a venda, os itens com o preço atual e o resumo diário de vendas.
+    # O número de comandos não depende de quantos itens a venda tem.
+    # sold_at: hora da venda, quando ela é registrada depois (venda feita sem conexão numa réplica).
+    # Devolve {'id', 'total', 'itens', 'produtos': {id: linha atual}} ou False
+    def checkout(self, items, user_id=None, sold_at=None):
+        quantities = {}
+        for product_id, quantity in items:
+            quantities[product_id] = quantities.get(product_id, 0) + int(quantity)
+        if not quantities or any(quantity <= 0 for quantity in quantities.values()):
+            print("❌ Venda recusada: informe ao menos um item com quantidade positiva")
+            return False
+        now = sold_at or datetime.now()
+        day = now.date().isoformat()
+
+        try:
+            with self.transaction():
+                rows = self.record_movements([(product_id, -quantity, 'venda')
+                                              for product_id, quantity in quantities.items()], savepoint=False)
+                lines = [(product_id, quantity, Decimal(str(rows[product_id]['preco'] or 0)).quantize(CENT))
+                         for product_id, quantity in quantities.items()]
+                total = sum((price * quantity for _, quantity, price in lines), Decimal('0.00'))
+                _, sale_id = self.execute_write(self.statements.sql('sales.insert'),
+                                                (now.strftime('%Y-%m-%d %H:%M:%S'), total,
+                                                 sum(quantities.values()), user_id))
+                self.execute_many(self.statements.sql('sales.insert_items'),
+                                  [(sale_id, product_id, quantity, price) for product_id, quantity, price in lines],
+                                  ranking_changed=False)
+                self.execute_many(self.statements.sql('sales.daily_totals'),
+                                  [(day, product_id, quantity, price * quantity)
+                                   for product_id, quantity, price in lines],
+                                  ranking_changed=False)
+        except ValueError as e:
+            if self.in_transaction():
+                raise
+            print(f"❌ Venda recusada: {e}")
+            return False
+        except DB_ERRORS as e:
+            if self.in_transaction():
+                raise
+            print(f"❌ Erro ao registrar venda: {e}")
+            return False
+        return {
+            'id': sale_id,
+            'total': total,
+            'itens': [{'produto_id': product_id, 'quantidade': quantity, 'preco_unitario': price}
+                      for product_id, quantity, price in lines],
+            'produtos': rows,
+        }
+
+    # Venda com os itens, ou None
+    def get_sale(self, sale_id):
+        sale = self.fetch_one(self.statements.sql('sales.get'), (sale_id,))
+        if sale:
+            sale['itens'] = self.fetch_all(self.statements.sql('sales.items'), (sale_id,))
+        return sale
+
+    # Produtos mais vendidos nos últimos dias (quantidade e receita), lidos do resumo diário
+    def get_top_sellers(self, days=30, limit=None):
+        since = (date.today() - timedelta(days=days - 1)).isoformat()
+        rows = self.fetch_all(self.statements.sql('sales.top_sellers'), (since, limit or self.top_n), cached=True)
+        return [{**row, 'nome': row['nome'] or f"#{row['id']} (removido)", 'vendidos': int(row['vendidos'] or 0)}
+                for row in rows]
+
+
+# Fila de escritas enviada de uma vez: comandos iguais e consecutivos viram um executemany
+class StatementBatch:
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+        self.statements = []
+
+    def execute(self, query, params=None):
+        self.statements.append((query, params or ()))
+
+    def __len__(self):
+        return len(self.statements)
+
+    def flush(self, savepoint=True):
+        if not self.statements:
+            return
+        groups = []
+        for query, params in self.statements:
+            if groups and groups[-1][0] == query:
+                groups[-1][1].append(params)
+            else:
+                groups.append((query, [params]))
+        self.statements = []
+
+        with self.db_manager.transaction(savepoint=savepoint):
+            for query, rows in groups:
+                if len(rows) == 1:
+                    self.db_manager.execute_write(query, rows[0])
+                else:
+                    self.db_manager.execute_many(query, rows)
+            # Comandos quaisquer: quem acompanha as mudanças relê o catálogo e o ranking de
+            # estoque é recarregado depois do commit
+            self.db_manager._mark_unknown_changes([query for query, _ in groups])
+            self.db_manager._ranking_changed()
@@ -1,9 +1,13 @@
+import queue
 import tkinter as tk
-from tkinter import messagebox, simpledialog, ttk
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import numpy as np
-from logger import log_error
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from tkinter import filedialog, messagebox, simpledialog, ttk
+from bulk import export_products, import_products, validate_product
+from database import ProductQuery
+from instrumentation import format_report
+from logger import log_error, timed
+from ranking import stock_of
 
 # Configurações de cores e estilos
 COLORS = {
@@ -121,12 +125,588 @@ class StyledEntry(tk.Entry):
         value = self.get()
         return value if value != self.placeholder else ""
 
+# Executa consultas em threads de trabalho e devolve os resultados ao Tk
+class BackgroundLoader:
+    def __init__(self, widget, max_workers=2, poll_ms=50):
+        self.widget = widget
+        self.poll_ms = poll_ms
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='loader')
+        self.results = queue.Queue()
+        self.calls = queue.Queue()
+        self.generations = {}
+        self.futures = {}
+        self.pending = 0
+        self.closed = False
+        self._poll_id = None
+
+    # Agenda func() em segundo plano; uma nova chamada com a mesma chave invalida a anterior
+    def submit(self, key, func, on_done, on_error=None):
+        self.cancel(key)
+        generation = self.generations[key]
+        future = self.executor.submit(func)
+        self.futures[key] = future
+        self.pending += 1
+        future.add_done_callback(
+            lambda f: self.results.put((key, generation, f, on_done, on_error))
+        )
+        self._schedule()
+        return generation
+
+    # Pede, de uma thread de trabalho, que callback(*args) rode no loop do Tk
+    def post(self, callback, *args):
+        self.calls.put((callback, args))
+
+    # Descarta o resultado de uma carga em andamento (e a cancela se ainda não começou)
+    def cancel(self, key):
+        self.generations[key] = self.generations.get(key, 0) + 1
+        future = self.futures.pop(key, None)
+        if future is not None:
+            future.cancel()
+
+    # Ocupado até o resultado ser entregue ao Tk (não só até a thread terminar)
+    def is_busy(self, key):
+        return key in self.futures
+
+    def shutdown(self):
+        self.closed = True
+        if self._poll_id is not None:
+            try:
+                self.widget.after_cancel(self._poll_id)
+            except tk.TclError:
+                pass
+            self._poll_id = None
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def _schedule(self):
+        if self._poll_id is None and not self.closed:
+            self._poll_id = self.widget.after(self.poll_ms, self._poll)
+
+    # Roda no loop do Tk: entrega somente resultados da geração mais recente
+    def _poll(self):
+        self._poll_id = None
+        while True:
+            try:
+                callback, args = self.calls.get_nowait()
+            except queue.Empty:
+                break
+            callback(*args)
+        while True:
+            try:
+                key, generation, future, on_done, on_error = self.results.get_nowait()
+            except queue.Empty:
+                break
+            self.pending -= 1
+            if self.closed or future.cancelled() or generation != self.generations.get(key):
+                continue
+            self.futures.pop(key, None)
+            error = future.exception()
+            if error is None:
+                on_done(future.result())
+            elif on_error:
+                on_error(error)
+            else:
+                log_error(f"Erro em carga em segundo plano ({key}): {error}")
+        if self.pending > 0:
+            self._schedule()
+
+# Valores de uma linha de produto como aparecem na lista
+def format_product_row(row):
+    price = f"R$ {row['preco']:.2f}" if row['preco'] is not None else ''
+    return (row['id'], row['nome'], price, row['estoque'])
+
+
+# Total e primeira página da lista para a busca/ordenação query
+def fetch_product_list(db_manager, query, page_size):
+    total = db_manager.count_products(query)
+    return total, db_manager.query_products(query, None, page_size)
+
+
+# Top N por estoque com as saídas dos últimos 30 dias (lidas do resumo diário)
+def fetch_stock_chart(db_manager):
+    rows = db_manager.get_sales_data()
+    outflow = db_manager.get_stock_outflow([row['id'] for row in rows])
+    return [{**row, 'saidas': outflow.get(row['id'], 0)} for row in rows]
+
+
+# Páginas da lista de produtos, sem widgets: cache LRU das páginas, chaves (coluna, id) da
+# paginação por chave e busca em segundo plano (pelo loader) das páginas que faltam.
+# on_loaded() é chamado no loop do Tk quando uma página chega
+class ProductPages:
+    # Linha mostrada enquanto a página dela é buscada
+    LOADING_ROW = {'id': '', 'nome': 'Carregando...', 'preco': None, 'estoque': ''}
+
+    def __init__(self, db_manager, loader, on_loaded=None, page_size=100, cache_pages=5):
+        self.db_manager = db_manager
+        self.loader = loader
+        self.on_loaded = on_loaded
+        self.page_size = page_size
+        self.cache_pages = cache_pages
+
+        self.query = ProductQuery()
+        self.total = 0
+        self.pages = OrderedDict()
+        self.keys = {0: None}
+        # Páginas em busca (chave do loader -> página) e geração das páginas em cache:
+        # uma busca que cruzou com reset() ou com uma invalidação é descartada
+        self.loading = {}
+        self.generation = 0
+
+    # Recomeça com um novo total, a primeira página (se já buscada) e, opcionalmente, nova busca/ordem
+    def reset(self, total, first_page=None, query=None):
+        if query is not None:
+            self.query = query
+        self.total = total
+        self.pages.clear()
+        self.keys = {0: None}
+        self._discard_loading()
+        if first_page is not None:
+            self._store(0, first_page)
+
+    # Substitui uma linha já em cache pelos novos valores, sem consultar o banco. Devolve None se
+    # a linha não está em cache, senão se algo mudou. Se a alteração muda a posição da linha
+    # (ou a tira da busca), as páginas são refeitas
+    def patch(self, row):
+        for rows in self.pages.values():
+            for i, cached in enumerate(rows):
+                if cached['id'] == row['id']:
+                    updated = {**cached, **row}
+                    if self.query.key(updated) != self.query.key(cached) or not self.query.matches(updated):
+                        self.invalidate_from(None)
+                        return True
+                    if updated == cached:
+                        return False
+                    rows[i] = updated
+                    return True
+        return None
+
+    # Descarta as páginas a partir da que contém o id. Na ordem por id crescente sabemos em que
+    # página o id cai; nas outras ordens (ou sem id), recomeça
+    def invalidate_from(self, product_id):
+        if product_id is not None and self.query.sort == 'id' and not self.query.descending:
+            first = max(k for k, key in self.keys.items() if key is None or key[1] < product_id)
+        else:
+            first = 0
+        for index in [k for k in self.pages if k >= first]:
+            del self.pages[index]
+        for index in [k for k in self.keys if k > first]:
+            del self.keys[index]
+        self._discard_loading()
+
+    # count linhas a partir da posição start; as de páginas ainda em busca vêm como LOADING_ROW
+    def rows(self, start, count):
+        rows = []
+        while count > 0:
+            index, offset = divmod(start, self.page_size)
+            page = self.page(index)
+            if page is None:
+                chunk = [self.LOADING_ROW] * min(count, self.page_size - offset)
+            else:
+                chunk = page[offset:offset + count]
+            if not chunk:
+                break
+            rows.extend(chunk)
+            start += len(chunk)
+            count -= len(chunk)
+        return rows
+
+    # Página do cache (LRU), ou None enquanto ela é buscada em segundo plano
+    def page(self, index):
+        if index in self.pages:
+            self.pages.move_to_end(index)
+            return self.pages[index]
+        self._request(index)
+        return None
+
+    # Busca a página a partir da chave conhecida mais próxima antes dela: num salto da barra de
+    # rolagem, o OFFSET só percorre as linhas entre as duas. As chaves do loader se repetem a
+    # cada 3 páginas, então rolar sem parar cancela as buscas que ficaram para trás
+    def _request(self, index):
+        key = f"page-{index % 3}"
+        if self.loading.get(key) == index and self.loader.is_busy(key):
+            return
+        known = max(k for k in self.keys if k <= index)
+        after, skip = self.keys[known], (index - known) * self.page_size
+        db_manager, query, page_size, generation = self.db_manager, self.query, self.page_size, self.generation
+
+        def load():
+            start = after
+            if skip:
+                start = db_manager.get_product_key_at(skip - 1, query, after)
+                if start is None:
+                    return start, []
+            return start, db_manager.query_products(query, start, page_size)
+
+        def done(result):
+            self.loading.pop(key, None)
+            if generation != self.generation:
+                return
+            start, rows = result
+            if rows:
+                self.keys[index] = start
+            self._store(index, rows)
+            if self.on_loaded is not None:
+                self.on_loaded()
+
+        def failed(error):
+            self.loading.pop(key, None)
+            log_error(f"Erro ao buscar página de produtos: {error}")
+
+        self.loading[key] = index
+        self.loader.submit(key, load, done, failed)
+
+    def _discard_loading(self):
+        self.generation += 1
+        self.loading.clear()
+
+    def _store(self, index, rows):
+        self.pages[index] = rows
+        self.pages.move_to_end(index)
+        if rows:
+            self.keys[index + 1] = self.query.key(rows[-1])
+        while len(self.pages) > self.cache_pages:
+            self.pages.popitem(last=False)
+
+
+# Lista de produtos virtualizada: só as linhas visíveis existem no Treeview
+class VirtualProductList(tk.Frame):
+    COLUMNS = (
+        ('id', 'ID', 70, 'e'),
+        ('nome', 'Nome', 280, 'w'),
+        ('preco', 'Preço', 110, 'e'),
+        ('estoque', 'Estoque', 90, 'e'),
+    )
+    ROW_HEIGHT = 22
+    HEADER_HEIGHT = 28
+
+    # on_sort(coluna) é chamado ao clicar num cabeçalho; quem chama busca e aplica a nova ordem.
+    # As páginas fora do cache são buscadas pelo loader (BackgroundLoader), fora da thread do Tk
+    def __init__(self, parent, db_manager, loader, page_size=100, cache_pages=5, on_sort=None, **kwargs):
+        super().__init__(parent, bg=COLORS['surface'], **kwargs)
+        self.pages = ProductPages(db_manager, loader, self.render, page_size, cache_pages)
+        self.on_sort = on_sort
+
+        self.top = 0
+        self.visible = 1
+        self.items = []
+
+        style = ttk.Style(self)
+        style.configure('Products.Treeview', rowheight=self.ROW_HEIGHT, font=FONTS['small'],
+                        background=COLORS['background'], fieldbackground=COLORS['background'],
+                        foreground=COLORS['text_primary'])
+        style.configure('Products.Treeview.Heading', font=FONTS['button'])
+
+        self.tree = ttk.Treeview(
+            self,
+            columns=[c[0] for c in self.COLUMNS],
+            show='headings',
+            selectmode='browse',
+            style='Products.Treeview'
+        )
+        for key, title, width, anchor in self.COLUMNS:
+            self.tree.heading(key, text=title, anchor=anchor, command=lambda k=key: self._on_heading(k))
+            self.tree.column(key, width=width, anchor=anchor, stretch=(key == 'nome'))
+        self._update_headings()
+
+        self.scrollbar = tk.Scrollbar(self, orient='vertical', command=self._on_scroll)
+        self.tree.pack(side='left', expand=True, fill='both')
+        self.scrollbar.pack(side='right', fill='y')
+
+        self.tree.bind('<Configure>', self._on_resize)
+        self.tree.bind('<MouseWheel>', self._on_wheel)
+        self.tree.bind('<Button-4>', lambda e: self.scroll_to(self.top - 3))
+        self.tree.bind('<Button-5>', lambda e: self.scroll_to(self.top + 3))
+
+    @property
+    def query(self):
+        return self.pages.query
+
+    @property
+    def total(self):
+        return self.pages.total
+
+    @property
+    def page_size(self):
+        return self.pages.page_size
+
+    # Recomeça a lista com um novo total e (opcionalmente) a primeira página já buscada.
+    # Com uma nova busca/ordenação (query), volta ao topo
+    def reset(self, total, first_page=None, query=None):
+        self.pages.reset(total, first_page, query)
+        if query is not None:
+            self.top = 0
+            self._update_headings()
+        self._clamp()
+        self.render()
+
+    # Substitui uma linha já em cache pelos novos valores, sem consultar o banco (False se a
+    # linha não está em cache)
+    def patch_row(self, row):
+        changed = self.pages.patch(row)
+        if changed is None:
+            return False
+        if changed:
+            self._clamp()
+            self.render()
+        return True
+
+    # Linha inserida/removida: só as páginas a partir da que a contém são descartadas
+    def insert_row(self, row):
+        if not self.query.matches(row):
+            return
+        self.pages.total += 1
+        self._invalidate_from(row['id'])
+
+    def remove_row(self, product_id):
+        self.pages.total = max(0, self.pages.total - 1)
+        self._invalidate_from(product_id)
+
+    def _invalidate_from(self, product_id):
+        self.pages.invalidate_from(product_id)
+        self._clamp()
+        self.render()
+
+    def _clamp(self):
+        self.top = max(0, min(self.top, self.total - self.visible))
+
+    # Cabeçalho clicado: mesma coluna inverte a ordem, outra coluna ordena crescente
+    def _on_heading(self, column):
+        if self.on_sort is not None:
+            self.on_sort(column)
+
+    def _update_headings(self):
+        arrow = ' ▼' if self.query.descending else ' ▲'
+        for key, title, width, anchor in self.COLUMNS:
+            self.tree.heading(key, text=title + (arrow if key == self.query.sort else ''))
+
+    def scroll_to(self, top):
+        top = max(0, min(top, self.total - self.visible))
+        if top != self.top:
+            self.top = top
+            self.render()
+
+    # Atualiza os itens existentes no lugar; cria/remove só a diferença de tamanho
+    def render(self):
+        if self.total == 0:
+            message = "Nenhum produto encontrado." if self.query.search else "Nenhum produto cadastrado."
+            rows = [{'id': '', 'nome': message, 'preco': None, 'estoque': ''}]
+        else:
+            rows = self.pages.rows(self.top, min(self.visible, self.total - self.top))
+
+        while len(self.items) < len(rows):
+            self.items.append(self.tree.insert('', tk.END))
+        while len(self.items) > len(rows):
+            self.tree.delete(self.items.pop())
+
+        for item, row in zip(self.items, rows):
+            self.tree.item(item, values=format_product_row(row))
+
+        if self.total:
+            self.scrollbar.set(self.top / self.total, min(1.0, (self.top + self.visible) / self.total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def _on_scroll(self, action, amount, unit=None):
+        if action == 'moveto':
+            self.scroll_to(int(float(amount) * self.total))
+        elif unit == 'pages':
+            self.scroll_to(self.top + int(amount) * self.visible)
+        else:
+            self.scroll_to(self.top + int(amount))
+
+    def _on_wheel(self, event):
+        self.scroll_to(self.top - int(event.delta / 120) * 3)
+
+    def _on_resize(self, event):
+        visible = max(1, (event.height - self.HEADER_HEIGHT) // self.ROW_HEIGHT)
+        if visible != self.visible:
+            self.visible = visible
+            self._clamp()
+            self.render()
+
+# Gráfico de barras persistente: os artistas são criados uma vez e só atualizados.
+# Mudanças que mantêm eixos e rótulos são desenhadas por blitting; dados iguais não redesenham
+class StockChart:
+    PALETTE = [COLORS['primary'], COLORS['accent'], COLORS['secondary'],
+               COLORS['success'], COLORS['warning']]
+
+    def __init__(self, ax, canvas, size=5, value_key='estoque', xlabel='Quantidade em Estoque'):
+        self.ax = ax
+        self.canvas = canvas
+        self.value_key = value_key
+        self.bars = []
+        self.values = []
+        self.background = None
+        self.last_hash = None
+        self.last_labels = None
+        self.last_title = None
+
+        ax.set_facecolor(COLORS['background'])
+        ax.set_xlabel(xlabel, fontsize=10, color=COLORS['text_primary'])
+        ax.tick_params(colors=COLORS['text_secondary'], labelsize=9)
+        ax.spines['top'].set_visible(False)
+        ax.spines['right'].set_visible(False)
+        ax.spines['left'].set_color(COLORS['text_secondary'])
+        ax.spines['bottom'].set_color(COLORS['text_secondary'])
+        ax.grid(True, axis='x', alpha=0.3, color=COLORS['text_secondary'])
+        ax.set_axisbelow(True)
+
+        self.title = ax.set_title('', fontsize=12, fontweight='bold',
+                                  color=COLORS['text_primary'], pad=20)
+        self.empty_text = ax.text(0.5, 0.5, "📊\n\nSem dados para exibir",
+                                  ha='center', va='center', transform=ax.transAxes,
+                                  fontsize=12, color=COLORS['text_secondary'], visible=False)
+        self._ensure_bars(size)
+        canvas.mpl_connect('draw_event', self._on_draw)
+
+    # Cria barras/rótulos extras só se o gráfico precisar mostrar mais itens
+    def _ensure_bars(self, size):
+        for i in range(len(self.bars), size):
+            bar = self.ax.barh(i, 0, color=self.PALETTE[i % len(self.PALETTE)], alpha=0.8)[0]
+            bar.set_animated(True)
+            value = self.ax.text(0, i, '', va='center', fontsize=9,
+                                 color=COLORS['text_primary'], animated=True)
+            self.bars.append(bar)
+            self.values.append(value)
+
+    # Devolve False quando os dados são os mesmos da última vez (nada é redesenhado)
+    def update(self, data, title=''):
+        data = data or []
+        names = [d['nome'][:15] + "..." if len(d['nome']) > 15 else d['nome'] for d in data]
+        stock = [d[self.value_key] for d in data]
+        outflow = [d.get('saidas') for d in data]
+        data_hash = hash((title, tuple(names), tuple(stock), tuple(outflow)))
+        if data_hash == self.last_hash:
+            return False
+        self.last_hash = data_hash
+        self._ensure_bars(len(data))
+
+        top = max(stock) if stock else 0
+        for i, (bar, value) in enumerate(zip(self.bars, self.values)):
+            visible = i < len(data)
+            bar.set_visible(visible)
+            value.set_visible(visible)
+            if visible:
+                bar.set_width(stock[i])
+                value.set_x(stock[i] + top * 0.01)
+                # Saídas recentes ao lado do estoque, quando informadas
+                value.set_text(f"{stock[i]}  (↓{outflow[i]} em 30 dias)" if outflow[i] else str(stock[i]))
+
+        # Rótulos, título ou escala mudaram: redesenho completo; senão só as barras
+        xmax = top * (1.45 if any(outflow) else 1.15) if top > 0 else 1
+        layout_changed = (names != self.last_labels or title != self.last_title
+                          or self.ax.get_xlim()[1] < top * 1.05 or self.ax.get_xlim()[1] > xmax * 1.5)
+        if layout_changed:
+            self.last_labels = names
+            self.last_title = title
+            self.title.set_text(title if data else '')
+            self.empty_text.set_visible(not data)
+            self.ax.xaxis.set_visible(bool(data))
+            self.ax.yaxis.set_visible(bool(data))
+            self.ax.set_yticks(range(len(names)))
+            self.ax.set_yticklabels(names)
+            self.ax.set_ylim(-0.6, max(len(names), 1) - 0.4)
+            self.ax.set_xlim(0, xmax)
+            self.canvas.draw_idle()
+        else:
+            self._blit()
+        return True
+
+    # Depois de cada redesenho completo guarda o fundo e pinta as partes animadas
+    def _on_draw(self, event):
+        self.background = self.canvas.copy_from_bbox(self.ax.bbox)
+        self._draw_animated()
+
+    def _draw_animated(self):
+        for artist in self.bars + self.values:
+            if artist.get_visible():
+                self.ax.draw_artist(artist)
+
+    def _blit(self):
+        if self.background is None:
+            self.canvas.draw_idle()
+            return
+        self.canvas.restore_region(self.background)
+        self._draw_animated()
+        self.canvas.blit(self.ax.bbox)
+
+# Abas de análise do catálogo inteiro (curva ABC, distribuição do estoque, faixas de preço).
+# Redesenha só quando recebe um relatório novo (o InventoryAnalytics devolve o mesmo objeto
+# enquanto o catálogo não muda)
+class AnalyticsCharts:
+    TABS = (('abc', "Curva ABC"), ('stock', "Distribuição"), ('prices', "Faixas de preço"))
+
+    def __init__(self, notebook):
+        import matplotlib.pyplot as plt
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        self.report = None
+        self.frames = {}
+        self.axes = {}
+        self.canvases = {}
+        for key, label in self.TABS:
+            frame = tk.Frame(notebook, bg=COLORS['surface'])
+            notebook.add(frame, text=label)
+            fig, ax = plt.subplots(figsize=(6, 5))
+            fig.patch.set_facecolor(COLORS['surface'])
+            canvas = FigureCanvasTkAgg(fig, master=frame)
+            canvas.get_tk_widget().pack(fill='both', expand=True)
+            self.frames[key] = frame
+            self.axes[key] = ax
+            self.canvases[key] = canvas
+
+    def _reset(self, ax, title):
+        ax.clear()
+        ax.set_facecolor(COLORS['background'])
+        ax.tick_params(colors=COLORS['text_secondary'], labelsize=9)
+        ax.spines['top'].set_visible(False)
+        ax.spines['right'].set_visible(False)
+        ax.set_title(title, fontsize=11, fontweight='bold', color=COLORS['text_primary'], pad=15)
+
+    def update(self, report):
+        if report is None or report is self.report:
+            return False
+        self.report = report
+
+        ax = self.axes['abc']
+        self._reset(ax, f"Valor em estoque: R$ {report['valor_total']:,.2f}")
+        classes = report['abc']
+        ax.bar([c['classe'] for c in classes], [c['participacao'] * 100 for c in classes],
+               color=[COLORS['primary'], COLORS['accent'], COLORS['secondary']], alpha=0.8)
+        for i, c in enumerate(classes):
+            ax.text(i, c['participacao'] * 100 + 1, f"{c['produtos']} produtos", ha='center', fontsize=9,
+                    color=COLORS['text_primary'])
+        ax.set_ylabel('% do valor em estoque', fontsize=10, color=COLORS['text_primary'])
+        ax.set_ylim(0, 110)
+
+        ax = self.axes['stock']
+        low, over = report['estoque_baixo'], report['excesso']
+        self._reset(ax, f"{low['produtos']} com estoque baixo (≤{low['limite']}) · "
+                        f"{over['produtos']} em excesso (≥{over['limite']})")
+        edges = report['histograma']['limites']
+        ax.bar(edges[:-1], report['histograma']['contagens'], width=[b - a for a, b in zip(edges, edges[1:])],
+               align='edge', color=COLORS['primary'], alpha=0.8, edgecolor=COLORS['surface'])
+        ax.set_xlabel('Quantidade em Estoque', fontsize=10, color=COLORS['text_primary'])
+        ax.set_ylabel('Produtos', fontsize=10, color=COLORS['text_primary'])
+
+        ax = self.axes['prices']
+        self._reset(ax, "Valor em estoque por faixa de preço")
+        bands = report['faixas_preco']
+        ax.barh(range(len(bands)), [float(b['valor']) for b in bands], color=COLORS['accent'], alpha=0.8)
+        ax.set_yticks(range(len(bands)))
+        ax.set_yticklabels([f"{b['faixa']}\n{b['produtos']} produtos" for b in bands])
+        ax.set_xlabel('Valor (R$)', fontsize=10, color=COLORS['text_primary'])
+
+        for canvas in self.canvases.values():
+            canvas.figure.tight_layout()
+            canvas.draw_idle()
+        return True
+
 #Janela de Login
 class LoginWindow(tk.Toplevel):
     def __init__(self, master, db_manager, on_login_success):
         super().__init__(master)
         self.db_manager = db_manager
         self.on_login_success = on_login_success
+        self.loader = BackgroundLoader(self, max_workers=1)
         self.title("Login - Perucas Diferentonas")
         self.geometry("1000x600")
         self.resizable(False, False)
@@ -197,11 +777,34 @@ class LoginWindow(tk.Toplevel):
         button_frame = tk.Frame(card_inner, bg=COLORS['surface'])
         button_frame.pack(fill='x')
         
-        login_btn = StyledButton(button_frame, "Entrar", self.attempt_login, style='primary')
-        login_btn.pack(fill='x', pady=(0, 10))
+        self.login_btn = StyledButton(button_frame, "Entrar", self.attempt_login, style='primary')
+        self.login_btn.pack(fill='x', pady=(0, 10))
+        
+        self.signup_btn = StyledButton(button_frame, "Criar Conta", self.open_signup, style='secondary')
+        self.signup_btn.pack(fill='x')
         
-        signup_btn = StyledButton(button_frame, "Criar Conta", self.open_signup, style='secondary')
-        signup_btn.pack(fill='x')
+        self.status_label = tk.Label(
+            card_inner,
+            text="",
+            font=FONTS['small'],
+            bg=COLORS['surface'],
+            fg=COLORS['text_secondary']
+        )
+        self.status_label.pack(pady=(10, 0))
+
+    # Enquanto o banco conecta em segundo plano, o formulário aparece mas não envia
+    def set_connecting(self, connecting):
+        self.set_busy(connecting, "⏳ Conectando ao banco de dados...")
+
+    def set_busy(self, busy, message=""):
+        state = tk.DISABLED if busy else tk.NORMAL
+        self.login_btn.config(state=state)
+        self.signup_btn.config(state=state)
+        self.status_label.config(text=message if busy else "")
+
+    def destroy(self):
+        self.loader.shutdown()
+        super().destroy()
 
     # Valida credenciais do usuário
     def attempt_login(self):
@@ -212,18 +815,26 @@ class LoginWindow(tk.Toplevel):
             messagebox.showerror("Erro", "Preencha usuário e senha.")
             return
 
-        try:
-            if self.db_manager.check_user_credentials(username, password):
+        # O hash da senha é caro de propósito: roda fora da thread do Tk
+        def done(valid):
+            self.set_busy(False)
+            if valid:
                 messagebox.showinfo("Sucesso", "Login realizado com sucesso!")
                 self.destroy()
                 self.on_login_success()
             else:
                 messagebox.showerror("Erro de Login", "Usuário ou senha inválidos.")
                 log_error(f"Tentativa de login falhou: {username}")
-        except Exception as e:
+
+        def failed(e):
+            self.set_busy(False)
             messagebox.showerror("Erro", f"Não foi possível verificar o login: {e}")
             log_error(f"Erro ao verificar login: {e}")
 
+        self.set_busy(True, "⏳ Verificando...")
+        self.loader.submit('login', lambda: self.db_manager.check_user_credentials(username, password),
+                           done, failed)
+
     # Abre janela de cadastro
     def open_signup(self):
         SignUpWindow(self.master, self.db_manager)
@@ -233,6 +844,7 @@ class SignUpWindow(tk.Toplevel):
     def __init__(self, master, db_manager):
         super().__init__(master)
         self.db_manager = db_manager
+        self.loader = BackgroundLoader(self, max_workers=1)
         self.title("Criar Conta - Perucas Diferentonas")
         self.geometry("1000x600")
         self.resizable(False, False)
@@ -301,8 +913,8 @@ class SignUpWindow(tk.Toplevel):
         self.password_entry = StyledEntry(card_inner, show="*", placeholder="Crie uma senha")
         self.password_entry.pack(fill='x', pady=(0, 20), ipady=8)
         
-        create_btn = StyledButton(card_inner, "Criar Conta", self.attempt_create, style='success')
-        create_btn.pack(fill='x')
+        self.create_btn = StyledButton(card_inner, "Criar Conta", self.attempt_create, style='success')
+        self.create_btn.pack(fill='x')
 
     # Cria um novo usuário
     def attempt_create(self):
@@ -313,25 +925,59 @@ class SignUpWindow(tk.Toplevel):
         if not email or not username or not password:
             messagebox.showerror("Erro", "Preencha todos os campos.")
             return
-        try:
-            self.db_manager.add_user(email, username, password)
-            messagebox.showinfo("Sucesso", "Conta criada com sucesso!")
-            self.destroy()
-        except Exception as e:
+        def done(created):
+            self.create_btn.config(state=tk.NORMAL)
+            if created:
+                messagebox.showinfo("Sucesso", "Conta criada com sucesso!")
+                self.destroy()
+            else:
+                messagebox.showerror("Erro", "Não foi possível criar a conta. O usuário já existe?")
+
+        def failed(e):
+            self.create_btn.config(state=tk.NORMAL)
             messagebox.showerror("Erro", f"Não foi possível criar a conta: {e}")
             log_error(f"Erro ao criar conta: {e}")
 
+        # Gerar o hash da senha leva alguns milissegundos: fora da thread do Tk
+        self.create_btn.config(state=tk.DISABLED)
+        self.loader.submit('signup', lambda: self.db_manager.add_user(email, username, password),
+                           done, failed)
+
+    def destroy(self):
+        self.loader.shutdown()
+        super().destroy()
+
 #Janela principal
 class MainWindow(tk.Toplevel):
+    POLL_MS = 3000
+
     def __init__(self, master, db_manager):
         super().__init__(master)
         self.db_manager = db_manager
+        self.loader = BackgroundLoader(self)
+        # Criado com a primeira aba de análise aberta (analytics carrega o numpy)
+        self.analytics = None
+        self.chart_data = None
+        self.catalog_version = None
+        self._search_job = None
+        self._sync_job = None
         self.title("Perucas Diferentonas - Gerenciamento de Produtos")
         self.geometry("1400x900")
         self.configure(bg=COLORS['background'])
         self.center_window()
         self.create_widgets()
         self.load_products()
+        # Mudanças de outros terminais: uma consulta mínima a cada poucos segundos
+        self._poll_job = self.after(self.POLL_MS, self._poll_changes)
+        if hasattr(self.db_manager, 'sync_status'):
+            self._poll_sync()
+
+    def destroy(self):
+        for job in (self._search_job, self._sync_job, self._poll_job):
+            if job is not None:
+                self.after_cancel(job)
+        self.loader.shutdown()
+        super().destroy()
 
     # Configura janela principal
     def center_window(self):
@@ -368,6 +1014,16 @@ class MainWindow(tk.Toplevel):
         )
         subtitle_label.pack(side='left', padx=(10, 0))
         
+        # Situação da réplica local (só no modo --replica)
+        self.sync_label = tk.Label(
+            header_content,
+            text="",
+            font=FONTS['small'],
+            bg=COLORS['primary'],
+            fg='white'
+        )
+        self.sync_label.pack(side='right')
+        
         main_container = tk.Frame(self, bg=COLORS['background'])
         main_container.pack(expand=True, fill='both', padx=30, pady=20)
         
@@ -393,7 +1049,12 @@ class MainWindow(tk.Toplevel):
         StyledButton(buttons_frame, "➕ Adicionar", self.add_product, style='success').pack(side='left', padx=(0, 10))
         StyledButton(buttons_frame, "✏️ Atualizar", self.update_product, style='primary').pack(side='left', padx=(0, 10))
         StyledButton(buttons_frame, "🗑️ Deletar", self.delete_product, style='danger').pack(side='left', padx=(0, 10))
-        StyledButton(buttons_frame, "🔄 Recarregar", self.load_products, style='secondary').pack(side='left')
+        StyledButton(buttons_frame, "📦 Movimentar", self.move_stock, style='primary').pack(side='left', padx=(0, 10))
+        StyledButton(buttons_frame, "💰 Vender", self.sell, style='success').pack(side='left', padx=(0, 10))
+        StyledButton(buttons_frame, "🔄 Recarregar", self.load_products, style='secondary').pack(side='left', padx=(0, 10))
+        StyledButton(buttons_frame, "📥 Importar", self.import_products, style='secondary').pack(side='left', padx=(0, 10))
+        StyledButton(buttons_frame, "📤 Exportar", self.export_products, style='secondary').pack(side='left', padx=(0, 10))
+        StyledButton(buttons_frame, "📈 Estatísticas", self.show_stats, style='secondary').pack(side='left')
         
         # Container de conteúdo lista e gráfico
         content_frame = tk.Frame(main_container, bg=COLORS['background'])
@@ -412,30 +1073,24 @@ class MainWindow(tk.Toplevel):
             font=FONTS['subtitle'],
             bg=COLORS['surface'],
             fg=COLORS['text_primary']
-        ).pack(anchor='w')
+        ).pack(side='left')
         
-        text_container = tk.Frame(list_frame, bg=COLORS['surface'])
-        text_container.pack(expand=True, fill='both', padx=20, pady=(0, 20))
+        # Busca por nome: espera uma pausa na digitação antes de consultar o banco
+        self.search_entry = StyledEntry(list_header, placeholder="🔍 Buscar por nome...", width=28)
+        self.search_entry.pack(side='left', padx=(20, 0))
+        self.search_entry.bind('<KeyRelease>', self._on_search_key)
         
-        self.product_list_text = tk.Text(
-            text_container,
+        self.status_label = tk.Label(
+            list_header,
+            text="",
             font=FONTS['small'],
-            bg=COLORS['background'],
-            fg=COLORS['text_primary'],
-            relief='solid',
-            bd=1,
-            wrap='none',
-            state=tk.DISABLED
+            bg=COLORS['surface'],
+            fg=COLORS['text_secondary']
         )
+        self.status_label.pack(side='right')
         
-        scrollbar_y = tk.Scrollbar(text_container, orient='vertical', command=self.product_list_text.yview)
-        scrollbar_x = tk.Scrollbar(text_container, orient='horizontal', command=self.product_list_text.xview)
-        
-        self.product_list_text.configure(yscrollcommand=scrollbar_y.set, xscrollcommand=scrollbar_x.set)
-        
-        self.product_list_text.pack(side='left', expand=True, fill='both')
-        scrollbar_y.pack(side='right', fill='y')
-        scrollbar_x.pack(side='bottom', fill='x')
+        self.product_list = VirtualProductList(list_frame, self.db_manager, self.loader, on_sort=self.sort_by)
+        self.product_list.pack(expand=True, fill='both', padx=20, pady=(0, 20))
         
         # Gráfico
         chart_frame = tk.Frame(content_frame, bg=COLORS['surface'], relief='solid', bd=1, width=500)
@@ -453,136 +1108,448 @@ class MainWindow(tk.Toplevel):
             fg=COLORS['text_primary']
         ).pack(anchor='w')
         
-        self.chart_container = tk.Frame(chart_frame, bg=COLORS['surface'])
-        self.chart_container.pack(expand=True, fill='both', padx=20, pady=(0, 20))
+        # Abas: o ranking de estoque e as análises do catálogo inteiro (calculadas quando a aba abre)
+        self.chart_tabs = ttk.Notebook(chart_frame)
+        self.chart_tabs.pack(expand=True, fill='both', padx=20, pady=(0, 20))
+        self.chart_container = tk.Frame(self.chart_tabs, bg=COLORS['surface'])
+        self.chart_tabs.add(self.chart_container, text="Top estoque")
         
-        # Configura biblioteca com tema personalizado
+        # Configura biblioteca com tema personalizado (importada só aqui: o login abre sem carregar o matplotlib)
+        import matplotlib.pyplot as plt
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
         plt.style.use('default')
         self.fig, self.ax = plt.subplots(figsize=(6, 5))
         self.fig.patch.set_facecolor(COLORS['surface'])
         self.canvas = FigureCanvasTkAgg(self.fig, master=self.chart_container)
         self.canvas.get_tk_widget().pack(fill='both', expand=True)
-        
-        self.plot_sales_data()
+        self.chart = StockChart(self.ax, self.canvas, self.db_manager.top_n)
+        
+        # Mais vendidos dos últimos 30 dias (resumo diário de vendas)
+        self.sellers_container = tk.Frame(self.chart_tabs, bg=COLORS['surface'])
+        self.chart_tabs.add(self.sellers_container, text="Mais vendidos")
+        sellers_fig, sellers_ax = plt.subplots(figsize=(6, 5))
+        sellers_fig.patch.set_facecolor(COLORS['surface'])
+        sellers_canvas = FigureCanvasTkAgg(sellers_fig, master=self.sellers_container)
+        sellers_canvas.get_tk_widget().pack(fill='both', expand=True)
+        self.sellers_chart = StockChart(sellers_ax, sellers_canvas, self.db_manager.top_n,
+                                        value_key='vendidos', xlabel='Unidades Vendidas')
+        
+        self.analytics_charts = AnalyticsCharts(self.chart_tabs)
+        self.chart_tabs.bind('<<NotebookTabChanged>>', lambda event: self.refresh_tabs())
 
-    # Carrega produtos
-    def load_products(self):
-        self.product_list_text.config(state=tk.NORMAL)
-        self.product_list_text.delete(1.0, tk.END)
-        
-        header = f"{'ID':<5} {'Nome':<25} {'Preço':<12} {'Estoque':<10}\n"
-        separator = "─" * 60 + "\n"
-        
-        self.product_list_text.insert(tk.END, header)
-        self.product_list_text.insert(tk.END, separator)
-        
-        #dados
-        products = self.db_manager.get_products()
-        if products:
-            for p in products:
-                name = p['nome'][:23] + "..." if len(p['nome']) > 23 else p['nome']
-                
-                line = f"{p['id']:<5} {name:<25} R$ {p['preco']:<8.2f} {p['estoque']:<10}\n"
-                self.product_list_text.insert(tk.END, line)
+    # Carrega produtos e gráfico em segundo plano, numa única ida ao banco
+    def load_products(self, query=None):
+        query = query or self.product_list.query
+        self.set_loading(True)
+        self.loader.cancel('chart')
+        self.loader.cancel('list')
+        self.loader.submit('refresh', lambda: self._fetch_dashboard(query), self._apply_dashboard,
+                           self._on_load_error)
+
+    # Roda na thread de trabalho: nada de Tk aqui
+    def _fetch_dashboard(self, query=None):
+        query = query or self.product_list.query
+        with timed("MainWindow: consultas da atualização"):
+            # Lida antes dos dados: o que mudar durante a leitura aparece na próxima verificação
+            version = self.db_manager.get_catalog_version()
+            total, first_page = self._fetch_list(query)
+            return query, total, first_page, self._fetch_chart(), version
+
+    def _fetch_chart(self):
+        return fetch_stock_chart(self.db_manager)
+
+    def _fetch_list(self, query):
+        return fetch_product_list(self.db_manager, query, self.product_list.page_size)
+
+    def _apply_dashboard(self, result):
+        query, total, first_page, sales_data, version = result
+        self.catalog_version = version
+        with timed("MainWindow: desenho da lista e do gráfico"):
+            self.product_list.reset(total, first_page, query)
+            self.plot_sales_data(sales_data)
+        self.set_loading(False)
+        self.refresh_tabs()
+
+    # Compara a versão do catálogo; se mudou, traz só as linhas alteradas desde a última vista
+    def _poll_changes(self):
+        self._poll_job = self.after(self.POLL_MS, self._poll_changes)
+        if self.catalog_version is None or self.loader.is_busy('refresh') or self.loader.is_busy('poll'):
+            return
+        version = self.catalog_version
+        self.loader.submit('poll', lambda: self.db_manager.get_changes_since(version), self._apply_changes,
+                           lambda e: log_error(f"Erro ao verificar mudanças do catálogo: {e}"))
+
+    def _apply_changes(self, result):
+        if result is None:
+            return
+        version, rows, removed = result
+        if rows is None:
+            # Mudanças demais: sai mais barato recarregar
+            self.load_products()
+            return
+        self.catalog_version = version
+        missing = [row for row in rows if not self.product_list.patch_row(row)]
+        if removed or missing:
+            # Linha nova ou fora das páginas em cache: recarrega contagem e páginas, sem sair do lugar
+            query = self.product_list.query
+
+            def done(result):
+                if self.product_list.query is query:
+                    self.product_list.reset(*result)
+
+            self.loader.submit('poll_list', lambda: self._fetch_list(query), done, self._on_load_error)
+        for row in rows:
+            self.refresh_chart_if_needed(row)
+        for product_id in removed:
+            self.refresh_chart_if_needed({'id': product_id}, deleted=True)
+        self.refresh_tabs()
+
+    # Busca/ordenação nova: só a contagem e a primeira página que atendem a ela vêm do banco
+    def refresh_list(self, query=None):
+        query = query or self.product_list.query
+        if self.loader.is_busy('refresh'):
+            # A atualização em andamento traria a busca antiga: refaz com a nova
+            self.load_products(query)
+            return
+        self.set_loading(True)
+
+        def done(result):
+            self.product_list.reset(*result, query=query)
+            self.set_loading(False)
+
+        self.loader.submit('list', lambda: self._fetch_list(query), done, self._on_load_error)
+
+    def _on_search_key(self, event):
+        if self._search_job is not None:
+            self.after_cancel(self._search_job)
+        self._search_job = self.after(300, self.apply_search)
+
+    def apply_search(self):
+        self._search_job = None
+        current = self.product_list.query
+        search = self.search_entry.get_value().strip()
+        if search != current.search:
+            self.refresh_list(ProductQuery(search, current.sort, current.descending))
+
+    # Clique no cabeçalho da lista: a mesma coluna inverte a ordem
+    def sort_by(self, column):
+        current = self.product_list.query
+        descending = not current.descending if column == current.sort else False
+        self.refresh_list(ProductQuery(current.search, column, descending))
+
+    def _on_load_error(self, error):
+        self.set_loading(False)
+        log_error(f"Erro ao carregar produtos: {error}")
+        messagebox.showerror("Erro", f"Não foi possível carregar os produtos: {error}")
+
+    # Réplica local: mostra a fila pendente (o que a sincronização grava chega por _poll_changes).
+    # A contagem da fila é uma consulta: roda na thread de trabalho, nunca na do Tk
+    def _poll_sync(self):
+        self._sync_job = self.after(2000, self._poll_sync)
+        if not self.loader.is_busy('sync'):
+            self.loader.submit('sync', self.db_manager.sync_status, self._show_sync_status,
+                               lambda e: log_error(f"Erro ao ler situação da réplica: {e}"))
+
+    def _show_sync_status(self, status):
+        if not status['online']:
+            text = f"🔴 Sem conexão com o servidor — {status['pending']} alterações pendentes"
+        elif status['pending']:
+            text = f"🟡 Sincronizando {status['pending']} alterações..."
         else:
-            self.product_list_text.insert(tk.END, "\n" + " " * 20 + "Nenhum produto cadastrado.\n")
-        
-        self.product_list_text.config(state=tk.DISABLED)
-        self.plot_sales_data()
+            text = "🟢 Sincronizado"
+        self.sync_label.config(text=text)
+
+    # Indica carregamento em andamento
+    def set_loading(self, loading):
+        self.set_status("⏳ Carregando..." if loading else "")
+        self.config(cursor='watch' if loading else '')
+
+    def set_status(self, text):
+        self.status_label.config(text=text)
+
+    # Importa produtos de CSV/JSON lines em segundo plano
+    def import_products(self):
+        path = filedialog.askopenfilename(
+            parent=self,
+            title="Importar Produtos",
+            filetypes=[("CSV", "*.csv"), ("JSON lines", "*.jsonl"), ("Todos os arquivos", "*.*")]
+        )
+        if not path:
+            return
+        if self.loader.is_busy('bulk'):
+            messagebox.showwarning("Aguarde", "Já existe uma importação/exportação em andamento.")
+            return
+
+        def progress(imported, rejected):
+            self.loader.post(self.set_status, f"📥 {imported} importados, {rejected} rejeitados...")
+
+        def done(report):
+            self.set_status("")
+            if report.errors:
+                log_error(f"Importação de {path}: {report.summary(max_errors=len(report.errors))}")
+            messagebox.showinfo("Importação concluída", report.summary())
+            self.load_products()
+
+        self.set_status("📥 Importando...")
+        self.loader.submit('bulk', lambda: import_products(self.db_manager, path, progress=progress),
+                           done, self._on_bulk_error)
+
+    # Exporta o catálogo em segundo plano
+    def export_products(self):
+        path = filedialog.asksaveasfilename(
+            parent=self,
+            title="Exportar Produtos",
+            defaultextension=".csv",
+            filetypes=[("CSV", "*.csv"), ("JSON lines", "*.jsonl")]
+        )
+        if not path:
+            return
+        if self.loader.is_busy('bulk'):
+            messagebox.showwarning("Aguarde", "Já existe uma importação/exportação em andamento.")
+            return
+
+        def progress(count):
+            self.loader.post(self.set_status, f"📤 {count} exportados...")
+
+        def done(count):
+            self.set_status("")
+            messagebox.showinfo("Exportação concluída", f"{count} produtos exportados para {path}.")
+
+        self.set_status("📤 Exportando...")
+        self.loader.submit('bulk', lambda: export_products(self.db_manager, path, progress=progress),
+                           done, self._on_bulk_error)
+
+    # Mostra as consultas mais caras da sessão e o uso do pool/cache. As métricas são lidas na
+    # thread de trabalho: na réplica incluem a contagem da fila
+    def show_stats(self):
+        if not self.loader.is_busy('stats'):
+            self.loader.submit('stats', self.db_manager.stats, self._show_stats,
+                               lambda e: log_error(f"Erro ao ler estatísticas do banco: {e}"))
+
+    def _show_stats(self, stats):
+        pool, cache = stats['pool'], stats['cache']
+        summary = (
+            f"Pool: {pool.get('in_use', 0)}/{pool.get('size', 0)} em uso, "
+            f"{pool.get('waits', 0)} esperas ({pool.get('wait_time', 0) * 1000:.0f} ms)\n"
+            f"Cache: {cache['hits']} acertos, {cache['misses']} falhas ({cache['hit_rate']:.0%})\n"
+            f"Comandos: {', '.join(f'{name} {count}x' for name, count in list(stats['statements'].items())[:4])}\n\n"
+        )
+        messagebox.showinfo("Estatísticas do Banco", summary + format_report(stats['queries']), parent=self)
+
+    def _on_bulk_error(self, error):
+        self.set_status("")
+        log_error(f"Erro na importação/exportação: {error}")
+        messagebox.showerror("Erro", f"Não foi possível concluir a operação: {error}")
+
+    # Uma escrita de produto por vez: avisa se a anterior ainda está sendo gravada
+    def _write_pending(self):
+        if self.loader.is_busy('write'):
+            messagebox.showwarning("Aguarde", "A alteração anterior ainda está sendo gravada.")
+            return True
+        return False
+
+    # Grava em segundo plano (as transações de produto têm vários comandos e, na réplica, podem
+    # esperar a rede): on_done(resultado) roda no loop do Tk
+    def _submit_write(self, func, on_done, log_text, error_text):
+        self.set_status("💾 Gravando...")
+
+        def done(result):
+            self.set_status("")
+            on_done(result)
+
+        def failed(error):
+            self.set_status("")
+            log_error(f"{log_text}: {error}")
+            messagebox.showerror("Erro", f"{error_text}: {error}")
+
+        self.loader.submit('write', func, done, failed)
 
     # Adiciona produto
     def add_product(self):
+        if self._write_pending():
+            return
         dialog = ProductDialog(self, "Adicionar Produto")
-        if dialog.result:
-            try:
-                self.db_manager.add_product(
-                    dialog.result['name'],
-                    dialog.result['description'],
-                    dialog.result['price'],
-                    dialog.result['stock']
-                )
-                messagebox.showinfo("Sucesso", "Produto adicionado com sucesso!")
-                self.load_products()
-            except Exception as e:
-                log_error(f"Erro ao adicionar produto: {e}")
-                messagebox.showerror("Erro", f"Não foi possível adicionar: {e}")
+        if not dialog.result:
+            return
+        data = dialog.result
+
+        def done(row):
+            if not row:
+                messagebox.showerror("Erro", "Não foi possível adicionar o produto.")
+                return
+            messagebox.showinfo("Sucesso", "Produto adicionado com sucesso!")
+            self.product_list.insert_row(row)
+            self.refresh_chart_if_needed(row)
+
+        self._submit_write(
+            lambda: self.db_manager.add_product(data['name'], data['description'], data['price'], data['stock']),
+            done, "Erro ao adicionar produto", "Não foi possível adicionar"
+        )
 
     # Atualiza produto
     def update_product(self):
+        if self._write_pending():
+            return
         product_id = simpledialog.askinteger("Atualizar Produto", "ID do Produto:")
         if product_id is None:
             return
             
         dialog = ProductDialog(self, "Atualizar Produto")
-        if dialog.result:
-            try:
-                self.db_manager.update_product(
-                    product_id,
-                    dialog.result['name'],
-                    dialog.result['description'],
-                    dialog.result['price'],
-                    dialog.result['stock']
-                )
-                messagebox.showinfo("Sucesso", "Produto atualizado com sucesso!")
-                self.load_products()
-            except Exception as e:
-                log_error(f"Erro ao atualizar produto {product_id}: {e}")
-                messagebox.showerror("Erro", f"Não foi possível atualizar: {e}")
+        if not dialog.result:
+            return
+        data = dialog.result
+
+        def done(row):
+            if not row:
+                messagebox.showerror("Erro", f"Produto ID {product_id} não encontrado ou estoque recusado.")
+                return
+            messagebox.showinfo("Sucesso", "Produto atualizado com sucesso!")
+            self.product_list.patch_row(row)
+            self.refresh_chart_if_needed(row)
+
+        self._submit_write(
+            lambda: self.db_manager.update_product(product_id, data['name'], data['description'],
+                                                   data['price'], data['stock']),
+            done, f"Erro ao atualizar produto {product_id}", "Não foi possível atualizar"
+        )
 
     # Remove produto
     def delete_product(self):
+        if self._write_pending():
+            return
         product_id = simpledialog.askinteger("Deletar Produto", "ID do Produto:")
         if product_id is None:
             return
-        if messagebox.askyesno("Confirmar Exclusão", f"Deletar produto ID {product_id}?"):
-            try:
-                self.db_manager.delete_product(product_id)
-                messagebox.showinfo("Sucesso", "Produto deletado com sucesso!")
-                self.load_products()
-            except Exception as e:
-                log_error(f"Erro ao deletar produto {product_id}: {e}")
-                messagebox.showerror("Erro", f"Não foi possível deletar: {e}")
-
-    # Gera gráfico e personaliza
-    def plot_sales_data(self):
-        self.ax.clear()
-        data = self.db_manager.get_sales_data()
-        
-        if data:
-            names = [d['nome'][:15] + "..." if len(d['nome']) > 15 else d['nome'] for d in data]
-            stock = [d['estoque'] for d in data]  
-            
-            colors = [COLORS['primary'], COLORS['accent'], COLORS['secondary'], 
-                    COLORS['success'], COLORS['warning']][:len(names)]
-            
-            bars = self.ax.barh(names, stock, color=colors, alpha=0.8)
-            
-            self.ax.set_xlabel('Quantidade em Estoque', fontsize=10, color=COLORS['text_primary'])
-            self.ax.set_title('Top 5 Produtos por Estoque', fontsize=12, fontweight='bold', 
-                            color=COLORS['text_primary'], pad=20)
-            
-            for i, (bar, value) in enumerate(zip(bars, stock)):
-                self.ax.text(value + max(stock) * 0.01, bar.get_y() + bar.get_height()/2, 
-                        str(value), va='center', fontsize=9, color=COLORS['text_primary'])
-            
-            self.ax.tick_params(colors=COLORS['text_secondary'], labelsize=9)
-            self.ax.spines['top'].set_visible(False)
-            self.ax.spines['right'].set_visible(False)
-            self.ax.spines['left'].set_color(COLORS['text_secondary'])
-            self.ax.spines['bottom'].set_color(COLORS['text_secondary'])
-            
-            self.ax.grid(True, axis='x', alpha=0.3, color=COLORS['text_secondary'])
-            
+        if not messagebox.askyesno("Confirmar Exclusão", f"Deletar produto ID {product_id}?"):
+            return
+
+        def done(row):
+            if not row:
+                messagebox.showerror("Erro", f"Produto ID {product_id} não encontrado.")
+                return
+            messagebox.showinfo("Sucesso", "Produto deletado com sucesso!")
+            if self.product_list.query.search:
+                # Com busca ativa não sabemos se o id estava na lista: recarrega a contagem
+                self.refresh_list()
+            else:
+                self.product_list.remove_row(product_id)
+            self.refresh_chart_if_needed(row, deleted=True)
+
+        self._submit_write(lambda: self.db_manager.delete_product(product_id), done,
+                           f"Erro ao deletar produto {product_id}", "Não foi possível deletar")
+
+    # Entrada ou saída de estoque: aplicada como delta no banco, sem ler o valor atual
+    def move_stock(self):
+        if self._write_pending():
+            return
+        product_id = simpledialog.askinteger("Movimentar Estoque", "ID do Produto:", parent=self)
+        if product_id is None:
+            return
+        delta = simpledialog.askinteger(
+            "Movimentar Estoque", "Quantidade (positiva para entrada, negativa para saída):", parent=self
+        )
+        if not delta:
+            return
+        reason = simpledialog.askstring("Movimentar Estoque", "Motivo:", parent=self,
+                                        initialvalue="entrada" if delta > 0 else "venda")
+        if reason is None:
+            return
+        reason = reason.strip()[:50] or "ajuste"
+
+        def done(row):
+            if not row:
+                messagebox.showerror(
+                    "Erro", f"Produto ID {product_id} não encontrado ou sem estoque suficiente."
+                )
+                return
+            self.product_list.patch_row(row)
+            self.refresh_chart_if_needed(row)
+
+        self._submit_write(lambda: self.db_manager.adjust_stock(product_id, delta, reason), done,
+                           f"Erro ao movimentar estoque do produto {product_id}",
+                           "Não foi possível movimentar o estoque")
+
+    # Venda de um ou mais itens ("id x quantidade", separados por vírgula), registrada de uma vez
+    def sell(self):
+        text = simpledialog.askstring("Registrar Venda", "Itens (ID x quantidade, separados por vírgula):",
+                                      parent=self, initialvalue="")
+        if not text:
+            return
+        try:
+            items = []
+            for part in text.split(','):
+                if part.strip():
+                    product_id, _, quantity = part.lower().partition('x')
+                    items.append((int(product_id), int(quantity or 1)))
+        except ValueError:
+            messagebox.showerror("Erro", "Use o formato: 12 x 2, 40 x 1")
+            return
+        if self.loader.is_busy('sale'):
+            messagebox.showwarning("Aguarde", "A venda anterior ainda está sendo registrada.")
+            return
+
+        # Na réplica a venda vai direto ao servidor: nada de esperar a rede na thread do Tk
+        def done(sale):
+            self.set_status("")
+            if not sale:
+                messagebox.showerror("Erro", "Venda recusada: produto inexistente ou sem estoque suficiente.")
+                return
+            for row in sale['produtos'].values():
+                self.product_list.patch_row(row)
+                self.refresh_chart_if_needed(row)
+            self.refresh_top_sellers()
+            self.set_status(f"💰 Venda {sale['id']} registrada: R$ {sale['total']:.2f}")
+
+        def failed(error):
+            self.set_status("")
+            log_error(f"Erro ao registrar venda: {error}")
+            messagebox.showerror("Erro", f"Não foi possível registrar a venda: {error}")
+
+        self.set_status("💰 Registrando venda...")
+        self.loader.submit('sale', lambda: self.db_manager.checkout(items), done, failed)
+
+    # Atualiza o gráfico só quando a alteração pode mexer no top N
+    def refresh_chart_if_needed(self, row, deleted=False):
+        top = self.chart_data or []
+        if any(d['id'] == row['id'] for d in top):
+            changed = True
+        elif deleted:
+            changed = False
         else:
-            self.ax.text(0.5, 0.5, "📊\n\nSem dados para exibir", 
-                        ha='center', va='center', transform=self.ax.transAxes,
-                        fontsize=12, color=COLORS['text_secondary'])
-            self.ax.set_xticks([])
-            self.ax.set_yticks([])
-        
-        self.ax.set_facecolor(COLORS['background'])
-        self.fig.patch.set_facecolor(COLORS['surface'])
-        self.canvas.draw_idle()
+            changed = len(top) < self.db_manager.top_n or stock_of(row) >= min(stock_of(d) for d in top)
+        if changed:
+            self.loader.submit('chart', self._fetch_chart, self.plot_sales_data)
+
+    # Abas fora do ranking de estoque: só a que está aberta é atualizada
+    def refresh_tabs(self):
+        self.refresh_top_sellers()
+        self.refresh_analytics()
+
+    # Mais vendidos: consulta só o resumo diário de vendas, e só com a aba aberta
+    def refresh_top_sellers(self):
+        if self.chart_tabs.select() != str(self.sellers_container):
+            return
+        self.loader.submit('sellers', self.db_manager.get_top_sellers,
+                           lambda data: self.sellers_chart.update(
+                               data, title=f'Top {self.db_manager.top_n} Mais Vendidos (30 dias)'),
+                           lambda e: log_error(f"Erro ao buscar mais vendidos: {e}"))
+
+    # Análises do catálogo: só com uma aba de análise aberta; o relatório fica em cache até
+    # a próxima mudança do catálogo, então trocar de aba não recalcula nada
+    def refresh_analytics(self):
+        if self.chart_tabs.select() not in {str(frame) for frame in self.analytics_charts.frames.values()}:
+            return
+        if self.analytics is None:
+            # Importado só aqui: o login e a janela principal abrem sem carregar o numpy
+            from analytics import InventoryAnalytics
+            self.analytics = InventoryAnalytics(self.db_manager)
+        self.loader.submit('analytics', self.analytics.report, self.analytics_charts.update,
+                           lambda e: log_error(f"Erro ao calcular análises do estoque: {e}"))
+
+    # Atualiza o gráfico (o StockChart só redesenha o que mudou)
+    def plot_sales_data(self, data):
+        self.chart_data = data
+        self.chart.update(data, title=f'Top {self.db_manager.top_n} Produtos por Estoque')
 
 # Classe para janela adicionar produtos
 class ProductDialog:
@@ -658,12 +1625,9 @@ class ProductDialog:
             price = float(self.entries['price'].get_value().strip())
             stock = int(self.entries['stock'].get_value().strip())
             
-            if not name:
-                messagebox.showerror("Erro", "Nome é obrigatório.")
-                return
-            
-            if price <= 0 or stock < 0:
-                messagebox.showerror("Erro", "Preço deve ser positivo e estoque não pode ser negativo.")
+            error = validate_product(name, price, stock)
+            if error:
+                messagebox.showerror("Erro", error)
                 return
             
             self.result = {
@@ -0,0 +1,138 @@
+import logging
+import math
+import os
+import sys
+import threading
+
+# Histograma em escala logarítmica: 8 faixas por potência de 2, de 1 µs até ~70 min
+BUCKETS_PER_OCTAVE = 8
+MIN_SECONDS = 1e-6
+BUCKET_COUNT = 32 * BUCKETS_PER_OCTAVE
+
+# Módulos da própria camada de banco: o "local da chamada" é o primeiro frame fora deles
+INTERNAL_FILES = {'database.py', 'instrumentation.py', 'backends.py', 'pool.py', 'cache.py',
+                  'ranking.py', 'statements.py', 'replica.py', 'contextlib.py'}
+
+slow_logger = logging.getLogger('perucas.database')
+
+
+def bucket_index(seconds):
+    if seconds <= MIN_SECONDS:
+        return 0
+    index = int(math.log2(seconds / MIN_SECONDS) * BUCKETS_PER_OCTAVE) + 1
+    return min(index, BUCKET_COUNT - 1)
+
+
+def bucket_upper_bound(index):
+    return MIN_SECONDS * 2 ** (index / BUCKETS_PER_OCTAVE)
+
+
+# Arquivo:linha (função) de quem chamou o DatabaseManager
+def call_site():
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = os.path.basename(frame.f_code.co_filename)
+        if filename not in INTERNAL_FILES:
+            return f"{filename}:{frame.f_lineno} ({frame.f_code.co_name})"
+        frame = frame.f_back
+    return "?"
+
+
+# Métricas acumuladas de um comando SQL
+class StatementStats:
+    __slots__ = ('count', 'total', 'max', 'rows', 'slow', 'buckets', 'callers')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+        self.slow = 0
+        self.buckets = [0] * BUCKET_COUNT
+        self.callers = {}
+
+    def percentile(self, fraction):
+        target = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if seen >= target and count:
+                return min(bucket_upper_bound(index), self.max)
+        return self.max
+
+
+# Coleta tempo, linhas e local da chamada de cada consulta; barata o bastante para ficar ligada
+class QueryStats:
+    def __init__(self, slow_threshold=0.2, enabled=True, tag_callers=True):
+        self.slow_threshold = slow_threshold
+        self.enabled = enabled
+        self.tag_callers = tag_callers
+        self._statements = {}
+        self._lock = threading.Lock()
+
+    def record(self, query, elapsed, rows=0):
+        if not self.enabled:
+            return
+        caller = call_site() if self.tag_callers else None
+        with self._lock:
+            stats = self._statements.get(query)
+            if stats is None:
+                stats = self._statements[query] = StatementStats()
+            stats.count += 1
+            stats.total += elapsed
+            stats.rows += rows if rows and rows > 0 else 0
+            if elapsed > stats.max:
+                stats.max = elapsed
+            stats.buckets[bucket_index(elapsed)] += 1
+            if caller:
+                stats.callers[caller] = stats.callers.get(caller, 0) + 1
+            slow = elapsed >= self.slow_threshold
+            if slow:
+                stats.slow += 1
+        if slow:
+            slow_logger.warning(
+                f"Consulta lenta ({elapsed * 1000:.1f} ms, {rows} linhas) em {caller}: {normalize(query)}"
+            )
+
+    # Resumo por comando, do maior tempo total para o menor
+    def stats(self):
+        with self._lock:
+            items = list(self._statements.items())
+            result = []
+            for query, s in items:
+                result.append({
+                    'query': normalize(query),
+                    'count': s.count,
+                    'total_ms': s.total * 1000,
+                    'mean_ms': s.total / s.count * 1000,
+                    'p50_ms': s.percentile(0.50) * 1000,
+                    'p95_ms': s.percentile(0.95) * 1000,
+                    'p99_ms': s.percentile(0.99) * 1000,
+                    'max_ms': s.max * 1000,
+                    'rows': s.rows,
+                    'slow': s.slow,
+                    'callers': sorted(s.callers.items(), key=lambda c: c[1], reverse=True)[:5],
+                })
+        return sorted(result, key=lambda r: r['total_ms'], reverse=True)
+
+    def reset(self):
+        with self._lock:
+            self._statements.clear()
+
+
+def normalize(query):
+    return " ".join(query.split())
+
+
+# Texto curto para mostrar na interface ou no terminal
+def format_report(stats, limit=10):
+    if not stats:
+        return "Nenhuma consulta registrada."
+    lines = []
+    for item in stats[:limit]:
+        query = item['query'] if len(item['query']) <= 70 else item['query'][:67] + "..."
+        lines.append(
+            f"{item['count']}x  p50 {item['p50_ms']:.2f} ms  p95 {item['p95_ms']:.2f} ms  "
+            f"p99 {item['p99_ms']:.2f} ms  total {item['total_ms']:.0f} ms\n    {query}"
+        )
+    return "\n".join(lines)
@@ -1,17 +1,107 @@
-
+import atexit
+import json
 import logging
+import logging.handlers
+import os
+import queue
+import time
+from contextlib import contextmanager
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+_listener = None
+
+
+# Uma linha JSON por registro, para ferramentas de análise de log
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record, DATE_FORMAT),
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'message': record.getMessage(),
+        }
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+# Níveis por módulo vindos da variável PERUCAS_LOG_LEVELS ("perucas.timing=INFO,perucas.database=DEBUG").
+# Um nível desconhecido é ignorado com aviso: erro de digitação na variável não impede a abertura
+def levels_from_env(value=None):
+    value = os.environ.get('PERUCAS_LOG_LEVELS', '') if value is None else value
+    levels = {}
+    for item in value.split(','):
+        if '=' in item:
+            name, level = item.split('=', 1)
+            level = level.strip().upper()
+            if not isinstance(logging.getLevelName(level), int):
+                print(f"❌ Nível de log inválido em PERUCAS_LOG_LEVELS ignorado: {item.strip()}")
+                continue
+            levels[name.strip()] = level
+    return levels
+
+
+# Configura o log: quem chama só enfileira o registro; uma thread separada grava no arquivo,
+# com rotação por tamanho (max_bytes) ou por tempo (when='midnight', 'H', ...)
+def setup_logger(filename='error.log', level=logging.ERROR, max_bytes=5 * 1024 * 1024, backup_count=5,
+                 when=None, json_lines=False, levels=None):
+    global _listener
+    if _listener is not None:
+        return
 
-def setup_logger():
-    logging.basicConfig(
-        filename='error.log',
-        level=logging.ERROR,
-        format='%(asctime)s - %(levelname)s - %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
-    )
+    if when:
+        handler = logging.handlers.TimedRotatingFileHandler(
+            filename, when=when, backupCount=backup_count, encoding='utf-8', delay=True
+        )
+    else:
+        handler = logging.handlers.RotatingFileHandler(
+            filename, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8', delay=True
+        )
+    handler.setFormatter(JsonFormatter() if json_lines else logging.Formatter(LOG_FORMAT, DATE_FORMAT))
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.handlers = [logging.handlers.QueueHandler(log_queue)]
+    root.setLevel(level)
+
+    # Avisos do próprio sistema (ex.: consultas lentas) também vão para o arquivo
+    logging.getLogger('perucas').setLevel(logging.WARNING)
+    for name, module_level in {**levels_from_env(), **(levels or {})}.items():
+        logging.getLogger(name).setLevel(module_level)
+
+    _listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logger)
+
+# Grava o que ainda estiver na fila e para a thread do log
+def shutdown_logger():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
 
 def log_error(message):
     logging.error(message)
 
+def get_logger(module):
+    return logging.getLogger(f'perucas.{module}')
+
+# Registra a duração de um bloco em INFO no logger perucas.timing (custo zero se desligado)
+@contextmanager
+def timed(name):
+    logger = logging.getLogger('perucas.timing')
+    if not logger.isEnabledFor(logging.INFO):
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        logger.info(f"{name}: {(time.perf_counter() - start) * 1000:.1f} ms")
+
 if __name__ == "__main__":
     setup_logger()
     try:
@@ -19,4 +109,3 @@ if __name__ == "__main__":
     except ZeroDivisionError as e:
         log_error(f"Erro de divisão por zero: {e}")
     print("Verifique o arquivo error.log para o registro do erro.")
-
@@ -1,43 +1,82 @@
+from startup import StartupTimer
+import sys
+import threading
 import tkinter as tk
 from tkinter import messagebox
+from backends import SQLiteBackend
 from database import DatabaseManager
 from gui import LoginWindow, MainWindow
-from logger import setup_logger
+from logger import log_error, setup_logger
+from replica import ReplicaDatabaseManager
+
+timer = StartupTimer()
+timer.mark("imports")
 
 #Aplicação principal (gerencia janelas e banco de dados)
 class Application(tk.Tk):
-    def __init__(self):
+    def __init__(self, startup_report=False, sqlite_path=None, replica_path=None):
         super().__init__()
         self.withdraw()
         setup_logger()
+        self.startup_report = startup_report
+        self.db_result = None
+        timer.mark("Tk iniciado")
 
         try:
-            # Configuração do banco
+            # Configuração do banco (SQLite embutido para lojas de um terminal só)
             self.db_manager = DatabaseManager(
                 host="localhost",
                 user="root",           
                 password="",
-                database="perucas_diferentonas"
+                database="perucas_diferentonas",
+                backend=SQLiteBackend(sqlite_path) if sqlite_path else None
             )
+            # Réplica local: lê e grava num SQLite e sincroniza com o MySQL quando ele estiver no ar
+            if replica_path:
+                self.db_manager = ReplicaDatabaseManager(self.db_manager, path=replica_path)
 
-            # Mostra um erro se não for possível conectar ao banco  
-            if not self.db_manager.connect():
-                messagebox.showerror("Erro", "Não foi possível conectar ao MySQL.")
-                self.destroy()
-                return
-
-            # Cria tabelas se não existirem
-            if not self.db_manager.create_tables():
-                messagebox.showerror("Erro", "Erro ao criar tabelas.")
-                self.destroy()
-                return
-
+            # O login aparece já; a conexão e a verificação do esquema correm em segundo plano
             self.show_login_window()
+            self.login_window.set_connecting(True)
+            timer.mark("login exibido")
+            threading.Thread(target=self.connect_database, daemon=True).start()
+            self.after(50, self.check_database)
 
         except Exception as e:
             messagebox.showerror("Erro", f"Erro inesperado: {str(e)}")
             self.destroy()
 
+    # Roda fora da thread do Tk: só guarda o resultado
+    def connect_database(self):
+        try:
+            # Mostra um erro se não for possível conectar ao banco  
+            if not self.db_manager.connect():
+                self.db_result = f"Não foi possível conectar ao {self.db_manager.backend.label}."
+            # Cria tabelas se não existirem (sem DDL se o esquema já estiver em dia)
+            elif not self.db_manager.create_tables():
+                self.db_result = "Erro ao criar tabelas."
+            else:
+                if isinstance(self.db_manager, ReplicaDatabaseManager):
+                    self.db_manager.start_sync()
+                self.db_result = True
+        except Exception as e:
+            log_error(f"Erro ao conectar ao banco: {e}")
+            self.db_result = f"Erro inesperado: {str(e)}"
+
+    def check_database(self):
+        if self.db_result is None:
+            self.after(50, self.check_database)
+            return
+        if self.db_result is not True:
+            messagebox.showerror("Erro", self.db_result)
+            self.destroy()
+            return
+        timer.mark("banco pronto")
+        if self.startup_report:
+            print(timer.report())
+        if self.login_window.winfo_exists():
+            self.login_window.set_connecting(False)
+
     # Abre janela de login
     def show_login_window(self):
         self.login_window = LoginWindow(self, self.db_manager, self.on_login_success)
@@ -59,6 +98,22 @@ class Application(tk.Tk):
             self.db_manager.disconnect()
             self.destroy()
 
+# Valor de uma opção "--nome valor" da linha de comando
+def get_option(name, default=None):
+    if name not in sys.argv:
+        return None
+    index = sys.argv.index(name)
+    if index + 1 < len(sys.argv) and not sys.argv[index + 1].startswith('--'):
+        return sys.argv[index + 1]
+    return default
+
 if __name__ == "__main__":
-    app = Application()
+    # --startup-report mostra o tempo de cada fase; para os imports use "python startup.py"
+    # --sqlite [arquivo] usa o banco embutido em vez do servidor MySQL
+    # --replica [arquivo] trabalha numa cópia local e sincroniza com o MySQL em segundo plano
+    app = Application(
+        startup_report="--startup-report" in sys.argv,
+        sqlite_path=get_option("--sqlite", "perucas_diferentonas.db"),
+        replica_path=get_option("--replica", "perucas_replica.db")
+    )
     app.mainloop()
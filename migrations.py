@@ -0,0 +1,268 @@
+from backends import ERRORS
+
+# Migrações do esquema, em ordem. Cada uma roda uma única vez por banco.
+# Um comando pode ser texto (igual em todos os backends) ou um dict por dialeto
+# (dialeto ausente no dict: o comando não se aplica a ele)
+MIGRATIONS = [
+    (1, "Tabelas usuarios e produtos", [
+        {
+            'mysql': """
+                CREATE TABLE IF NOT EXISTS usuarios (
+                    id INT AUTO_INCREMENT PRIMARY KEY,
+                    nome VARCHAR(100),
+                    email VARCHAR(100),
+                    senha VARCHAR(255)
+                )
+            """,
+            'sqlite': """
+                CREATE TABLE IF NOT EXISTS usuarios (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    nome VARCHAR(100),
+                    email VARCHAR(100),
+                    senha VARCHAR(255)
+                )
+            """,
+        },
+        {
+            'mysql': """
+                CREATE TABLE IF NOT EXISTS produtos (
+                    id INT AUTO_INCREMENT PRIMARY KEY,
+                    nome VARCHAR(100),
+                    preco DECIMAL(10,2),
+                    estoque INT
+                )
+            """,
+            'sqlite': """
+                CREATE TABLE IF NOT EXISTS produtos (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    nome VARCHAR(100),
+                    preco DECIMAL(10,2),
+                    estoque INT
+                )
+            """,
+        },
+    ]),
+    (2, "Índices para login e para o ranking de estoque", [
+        # Bancos antigos podem ter nomes de usuário repetidos: o mais antigo fica com o nome e os
+        # outros passam a entrar como "nome#id" (ninguém perde a conta), senão o índice único falha
+        {
+            'mysql': """
+                UPDATE usuarios u
+                JOIN (SELECT nome, MIN(id) AS primeiro FROM usuarios GROUP BY nome HAVING COUNT(*) > 1) d
+                    ON u.nome = d.nome AND u.id <> d.primeiro
+                SET u.nome = CONCAT(LEFT(u.nome, 88), '#', u.id)
+            """,
+            'sqlite': """
+                UPDATE usuarios SET nome = substr(nome, 1, 88) || '#' || id
+                WHERE nome IN (SELECT nome FROM usuarios GROUP BY nome HAVING COUNT(*) > 1)
+                    AND id NOT IN (SELECT MIN(id) FROM usuarios GROUP BY nome)
+            """,
+        },
+        "CREATE UNIQUE INDEX idx_usuarios_nome ON usuarios (nome)",
+        "CREATE INDEX idx_produtos_estoque ON produtos (estoque)",
+    ]),
+    (3, "Índice para busca e ordenação por nome", [
+        {
+            'mysql': "CREATE INDEX idx_produtos_nome ON produtos (nome)",
+            # A busca compara sem maiúsculas: o índice precisa da mesma colação para servir o LIKE
+            'sqlite': "CREATE INDEX idx_produtos_nome ON produtos (nome COLLATE NOCASE)",
+        },
+    ]),
+    (4, "Histórico de movimentos de estoque e resumos por produto e por dia", [
+        {
+            'mysql': """
+                CREATE TABLE IF NOT EXISTS movimentos_estoque (
+                    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+                    produto_id INT NOT NULL,
+                    delta INT NOT NULL,
+                    motivo VARCHAR(50),
+                    criado_em DATETIME NOT NULL,
+                    INDEX idx_movimentos_produto (produto_id, id)
+                )
+            """,
+            'sqlite': """
+                CREATE TABLE IF NOT EXISTS movimentos_estoque (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    produto_id INT NOT NULL,
+                    delta INT NOT NULL,
+                    motivo VARCHAR(50),
+                    criado_em DATETIME NOT NULL
+                )
+            """,
+        },
+        # No MySQL o índice já vai no CREATE TABLE
+        {'sqlite': "CREATE INDEX IF NOT EXISTS idx_movimentos_produto ON movimentos_estoque (produto_id, id)"},
+        """
+            CREATE TABLE IF NOT EXISTS estoque_resumo_produto (
+                produto_id INT PRIMARY KEY,
+                entradas INT NOT NULL DEFAULT 0,
+                saidas INT NOT NULL DEFAULT 0,
+                movimentos INT NOT NULL DEFAULT 0,
+                ultimo_movimento DATETIME
+            )
+        """,
+        """
+            CREATE TABLE IF NOT EXISTS estoque_resumo_diario (
+                dia DATE NOT NULL,
+                produto_id INT NOT NULL,
+                entradas INT NOT NULL DEFAULT 0,
+                saidas INT NOT NULL DEFAULT 0,
+                movimentos INT NOT NULL DEFAULT 0,
+                PRIMARY KEY (dia, produto_id)
+            )
+        """,
+    ]),
+    (5, "Versão por linha de produto e controle de réplicas", [
+        # Cada escrita em produtos soma 1: a réplica local detecta conflitos comparando versões
+        "ALTER TABLE produtos ADD COLUMN versao INT NOT NULL DEFAULT 1",
+        # Último item da fila de cada réplica já aplicado no servidor (reenvio sem duplicar)
+        """
+            CREATE TABLE IF NOT EXISTS replica_aplicados (
+                origem VARCHAR(36) PRIMARY KEY,
+                ultimo_id BIGINT NOT NULL
+            )
+        """,
+    ]),
+    (6, "Versão do catálogo para detectar mudanças de outros terminais", [
+        # Contador único, somado a cada transação que mexe em produtos
+        "CREATE TABLE IF NOT EXISTS catalogo_versao (id INT PRIMARY KEY, versao BIGINT NOT NULL)",
+        {
+            'mysql': "INSERT IGNORE INTO catalogo_versao (id, versao) VALUES (1, 0)",
+            'sqlite': "INSERT OR IGNORE INTO catalogo_versao (id, versao) VALUES (1, 0)",
+        },
+        # Versão do catálogo em que a linha mudou por último
+        "ALTER TABLE produtos ADD COLUMN alterado_em_versao BIGINT NOT NULL DEFAULT 0",
+        "CREATE INDEX idx_produtos_alterado ON produtos (alterado_em_versao)",
+        # Produtos apagados e em que versão, para quem só busca as mudanças
+        """
+            CREATE TABLE IF NOT EXISTS produtos_removidos (
+                produto_id INT PRIMARY KEY,
+                versao BIGINT NOT NULL
+            )
+        """,
+        "CREATE INDEX idx_removidos_versao ON produtos_removidos (versao)",
+    ]),
+    (7, "Vendas, itens vendidos e resumo diário de vendas por produto", [
+        {
+            'mysql': """
+                CREATE TABLE IF NOT EXISTS vendas (
+                    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+                    criada_em DATETIME NOT NULL,
+                    total DECIMAL(12,2) NOT NULL,
+                    itens INT NOT NULL,
+                    usuario_id INT,
+                    INDEX idx_vendas_data (criada_em)
+                )
+            """,
+            'sqlite': """
+                CREATE TABLE IF NOT EXISTS vendas (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    criada_em DATETIME NOT NULL,
+                    total DECIMAL(12,2) NOT NULL,
+                    itens INT NOT NULL,
+                    usuario_id INT
+                )
+            """,
+        },
+        {'sqlite': "CREATE INDEX IF NOT EXISTS idx_vendas_data ON vendas (criada_em)"},
+        # Uma linha por produto da venda, com o preço cobrado no momento
+        """
+            CREATE TABLE IF NOT EXISTS itens_venda (
+                venda_id BIGINT NOT NULL,
+                produto_id INT NOT NULL,
+                quantidade INT NOT NULL,
+                preco_unitario DECIMAL(10,2) NOT NULL,
+                PRIMARY KEY (venda_id, produto_id)
+            )
+        """,
+        "CREATE INDEX idx_itens_venda_produto ON itens_venda (produto_id)",
+        # Somado a cada venda: o ranking de mais vendidos lê só este resumo, nunca o histórico
+        """
+            CREATE TABLE IF NOT EXISTS vendas_resumo_diario (
+                dia DATE NOT NULL,
+                produto_id INT NOT NULL,
+                quantidade INT NOT NULL DEFAULT 0,
+                receita DECIMAL(14,2) NOT NULL DEFAULT 0,
+                vendas INT NOT NULL DEFAULT 0,
+                PRIMARY KEY (dia, produto_id)
+            )
+        """,
+    ]),
+    (8, "Ids definitivos dos produtos criados nas réplicas", [
+        # Gravado na mesma transação do envio: se a réplica cair antes de trocar o id provisório,
+        # o próximo envio encontra o id definitivo aqui
+        """
+            CREATE TABLE IF NOT EXISTS replica_ids (
+                origem VARCHAR(36) NOT NULL,
+                id_provisorio INT NOT NULL,
+                id_definitivo INT NOT NULL,
+                PRIMARY KEY (origem, id_provisorio)
+            )
+        """,
+    ]),
+]
+
+SCHEMA_TABLE = "schema_version"
+
+CREATE_SCHEMA_TABLE = f"""
+    CREATE TABLE IF NOT EXISTS {SCHEMA_TABLE} (
+        versao INT PRIMARY KEY,
+        descricao VARCHAR(200),
+        aplicada_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+RECORD_VERSION = {
+    'mysql': f"INSERT IGNORE INTO {SCHEMA_TABLE} (versao, descricao) VALUES (%s, %s)",
+    'sqlite': f"INSERT OR IGNORE INTO {SCHEMA_TABLE} (versao, descricao) VALUES (%s, %s)",
+}
+
+
+def latest_version():
+    return MIGRATIONS[-1][0] if MIGRATIONS else 0
+
+
+# Texto do comando para o dialeto do backend (None se não se aplica a ele)
+def statement_for(statement, dialect):
+    return statement.get(dialect) if isinstance(statement, dict) else statement
+
+
+# Versão aplicada no banco (0 se a tabela de controle ainda não existe)
+def current_version(cursor, backend):
+    try:
+        cursor.execute(f"SELECT MAX(versao) AS versao FROM {SCHEMA_TABLE}")
+    except ERRORS as e:
+        if backend.is_missing_table(e):
+            return 0
+        raise
+    row = cursor.fetchone()
+    return (row and row['versao']) or 0
+
+
+# Aplica as migrações pendentes; com o esquema em dia, faz só um SELECT
+def migrate(db_manager):
+    backend = db_manager.backend
+    with db_manager._cursor() as cursor:
+        version = current_version(cursor, backend)
+        if version >= latest_version():
+            return version
+
+        cursor.execute(CREATE_SCHEMA_TABLE)
+
+        for number, description, statements in MIGRATIONS:
+            if number <= version:
+                continue
+            for statement in statements:
+                sql = statement_for(statement, backend.dialect)
+                if sql is None:
+                    continue
+                try:
+                    cursor.execute(sql)
+                except ERRORS as e:
+                    # Migração interrompida no meio: o índice/coluna já existe
+                    if not backend.is_duplicate_object(e):
+                        raise
+            cursor.execute(RECORD_VERSION[backend.dialect], (number, description))
+            print(f"✅ Migração {number} aplicada: {description}")
+            version = number
+        return version
@@ -0,0 +1,98 @@
+import base64
+import hashlib
+import hmac
+import os
+import threading
+import time
+
+SCHEME = 'scrypt'
+
+# Custo padrão do scrypt (n=2^14, r=8: ~16 MB e algumas dezenas de ms por verificação)
+DEFAULT_COST = {'n': 2 ** 14, 'r': 8, 'p': 1}
+
+
+def _b64(data):
+    return base64.b64encode(data).decode('ascii')
+
+
+# Gera "scrypt$n$r$p$sal$hash" para guardar em usuarios.senha
+def hash_password(password, n=None, r=None, p=None):
+    n = n or DEFAULT_COST['n']
+    r = r or DEFAULT_COST['r']
+    p = p or DEFAULT_COST['p']
+    salt = os.urandom(16)
+    digest = hashlib.scrypt(password.encode('utf-8'), salt=salt, n=n, r=r, p=p,
+                            maxmem=256 * n * r + 1024 * 1024, dklen=32)
+    return f"{SCHEME}${n}${r}${p}${_b64(salt)}${_b64(digest)}"
+
+
+def is_hashed(stored):
+    return isinstance(stored, str) and stored.startswith(SCHEME + '$')
+
+
+# Devolve (senha confere, precisa regravar): senhas antigas em texto puro ou com custo
+# menor que o atual conferem, mas devem ser regravadas com o hash atual
+def verify_password(password, stored):
+    if not stored:
+        return False, False
+    if not is_hashed(stored):
+        ok = hmac.compare_digest(password.encode('utf-8'), stored.encode('utf-8'))
+        return ok, ok
+    try:
+        _, n, r, p, salt, expected = stored.split('$')
+        n, r, p = int(n), int(r), int(p)
+        digest = hashlib.scrypt(password.encode('utf-8'), salt=base64.b64decode(salt), n=n, r=r, p=p,
+                                maxmem=256 * n * r + 1024 * 1024, dklen=32)
+    except (ValueError, TypeError):
+        return False, False
+    ok = hmac.compare_digest(digest, base64.b64decode(expected))
+    outdated = (n, r, p) != (DEFAULT_COST['n'], DEFAULT_COST['r'], DEFAULT_COST['p'])
+    return ok, ok and outdated
+
+
+# Hash de referência para que usuário inexistente leve o mesmo tempo que senha errada
+_dummy_hash = None
+
+
+def dummy_verify(password):
+    global _dummy_hash
+    if _dummy_hash is None:
+        _dummy_hash = hash_password('senha-inexistente')
+    verify_password(password, _dummy_hash)
+
+
+# Logins já verificados há pouco: evita pagar o scrypt de novo a cada re-autenticação.
+# Guarda só um HMAC de (usuário, senha) com uma chave aleatória do processo, nunca a senha
+class VerifiedSessionCache:
+    def __init__(self, ttl=300, max_entries=256):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._key = os.urandom(32)
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def _token(self, username, password):
+        message = username.encode('utf-8') + b'\0' + password.encode('utf-8')
+        return hmac.new(self._key, message, hashlib.sha256).digest()
+
+    def check(self, username, password):
+        token = self._token(username, password)
+        with self._lock:
+            expires = self._entries.get(username)
+            if expires and expires[0] > time.monotonic() and hmac.compare_digest(expires[1], token):
+                return True
+            return False
+
+    def add(self, username, password):
+        token = self._token(username, password)
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                now = time.monotonic()
+                self._entries = {u: e for u, e in self._entries.items() if e[0] > now}
+                if len(self._entries) >= self.max_entries:
+                    self._entries.pop(next(iter(self._entries)))
+            self._entries[username] = (time.monotonic() + self.ttl, token)
+
+    def discard(self, username):
+        with self._lock:
+            self._entries.pop(username, None)
@@ -0,0 +1,181 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+# Erro lançado quando não há conexão livre dentro do tempo de espera
+class PoolTimeout(Exception):
+    pass
+
+
+# Pool limitado de conexões compartilhado entre threads
+class ConnectionPool:
+    def __init__(self, factory, max_size=5, idle_timeout=300, ping_interval=30, timeout=10,
+                 ping=None):
+        self.factory = factory
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.ping_interval = ping_interval
+        self.timeout = timeout
+        self.ping = ping or (lambda conn: conn.ping(reconnect=True))
+
+        self._idle = deque()
+        self._size = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._local = threading.local()
+
+        self.checkouts = 0
+        self.waits = 0
+        self.wait_time = 0.0
+        self.created = 0
+        self.evicted = 0
+        self.reconnects = 0
+
+    # Entrega uma conexão por thread; chamadas aninhadas reaproveitam a mesma
+    @contextmanager
+    def connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            self._local.depth += 1
+            try:
+                yield conn
+            finally:
+                self._local.depth -= 1
+            return
+
+        conn = self.acquire()
+        self._local.conn = conn
+        self._local.depth = 1
+        discard = False
+        try:
+            yield conn
+        except BaseException:
+            # Conexão que caiu durante o uso é descartada em vez de voltar ao pool
+            discard = not self._alive(conn)
+            raise
+        finally:
+            self._local.conn = None
+            self._local.depth = 0
+            self.release(conn, discard=discard)
+
+    # Conexão presa à thread atual (None fora de um bloco connection())
+    def current(self):
+        return getattr(self._local, 'conn', None)
+
+    # Retira uma conexão do pool, esperando se todas estiverem em uso
+    def acquire(self, timeout=None):
+        timeout = self.timeout if timeout is None else timeout
+        with self._cond:
+            if self._closed:
+                raise PoolTimeout("Pool de conexões fechado")
+            self._evict_idle()
+
+            started = None
+            while not self._idle and self._size >= self.max_size:
+                if started is None:
+                    started = time.perf_counter()
+                    self.waits += 1
+                remaining = timeout - (time.perf_counter() - started)
+                if remaining <= 0 or not self._cond.wait(remaining):
+                    if not self._idle and self._size >= self.max_size:
+                        self.wait_time += time.perf_counter() - started
+                        raise PoolTimeout(f"Nenhuma conexão livre após {timeout}s")
+            if started is not None:
+                self.wait_time += time.perf_counter() - started
+
+            self.checkouts += 1
+            if self._idle:
+                conn, last_used = self._idle.pop()
+            else:
+                conn, last_used = None, None
+                self._size += 1
+
+        if conn is None:
+            return self._create()
+        return self._check(conn, last_used)
+
+    # Devolve a conexão ao pool
+    def release(self, conn, discard=False):
+        with self._cond:
+            if discard or self._closed:
+                self._size -= 1
+                self._close_quietly(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    # Fecha todas as conexões ociosas e impede novas retiradas
+    def close(self):
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                conn, _ = self._idle.popleft()
+                self._size -= 1
+                self._close_quietly(conn)
+            self._cond.notify_all()
+
+    # Estatísticas de uso do pool
+    def stats(self):
+        with self._cond:
+            return {
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._size - len(self._idle),
+                'max_size': self.max_size,
+                'checkouts': self.checkouts,
+                'waits': self.waits,
+                'wait_time': self.wait_time,
+                'created': self.created,
+                'evicted': self.evicted,
+                'reconnects': self.reconnects,
+            }
+
+    def _create(self):
+        try:
+            conn = self.factory()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self.created += 1
+        return conn
+
+    # Verifica a saúde de conexões paradas há mais de ping_interval
+    def _check(self, conn, last_used):
+        if time.monotonic() - last_used < self.ping_interval:
+            return conn
+        try:
+            self.ping(conn)
+            return conn
+        except Exception:
+            self._close_quietly(conn)
+            with self._cond:
+                self.reconnects += 1
+            return self._create()
+
+    def _alive(self, conn):
+        try:
+            self.ping(conn)
+            return True
+        except Exception:
+            return False
+
+    # Remove conexões ociosas há mais de idle_timeout (chamado com o lock)
+    def _evict_idle(self):
+        now = time.monotonic()
+        while self._idle and now - self._idle[0][1] > self.idle_timeout:
+            conn, _ = self._idle.popleft()
+            self._size -= 1
+            self.evicted += 1
+            self._close_quietly(conn)
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
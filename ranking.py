@@ -0,0 +1,102 @@
+import bisect
+import threading
+import time
+
+
+# Estoque de uma linha; produtos antigos podem ter estoque NULL, que conta como 0
+def stock_of(row):
+    return row['estoque'] or 0
+
+
+# Ranking dos produtos com mais estoque, mantido em memória a cada escrita.
+# Guarda os K = n + folga maiores estoques; todo produto fora do ranking tem
+# estoque menor ou igual ao menor do ranking, então o top n pode ser servido sem consulta
+class TopStockIndex:
+    def __init__(self, n=5, slack=20, max_age=60):
+        self.n = n
+        self.slack = slack
+        self.max_age = max_age
+
+        self._rows = {}
+        self._order = []
+        self._complete = False
+        self._seeded_at = None
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    @property
+    def capacity(self):
+        return self.n + self.slack
+
+    # Linhas do ranking (até limit), ou None se for preciso recarregar do banco
+    def top(self, limit=None):
+        limit = limit or self.n
+        with self._lock:
+            if self._seeded_at is None or time.monotonic() - self._seeded_at > self.max_age:
+                return None
+            if not self._complete and len(self._order) < limit:
+                return None
+            return [self._rows[product_id] for _, product_id in self._order[:limit]]
+
+    # Passa a guardar pelo menos n linhas (o gráfico pediu mais que o tamanho atual)
+    def reserve(self, n):
+        with self._lock:
+            if n > self.n:
+                self.n = n
+
+    # Geração atual; seed() ignora cargas que cruzaram com uma escrita
+    def generation(self):
+        with self._lock:
+            return self._generation
+
+    # Carrega o ranking a partir de "ORDER BY estoque DESC LIMIT capacity"
+    def seed(self, rows, generation=None):
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._rows = {}
+            self._order = []
+            for row in rows:
+                self._insert(row)
+            self._complete = len(rows) < self.capacity
+            self._seeded_at = time.monotonic()
+
+    # Produto criado ou alterado
+    def upsert(self, row):
+        with self._lock:
+            self._generation += 1
+            if self._seeded_at is None:
+                return
+            self._remove(row['id'])
+            floor = -self._order[-1][0] if self._order else None
+            if self._complete or (floor is not None and stock_of(row) >= floor):
+                self._insert(row)
+                if len(self._order) > self.capacity:
+                    self._remove(self._order[-1][1])
+                    self._complete = False
+            elif not self._order:
+                self._seeded_at = None
+
+    # Produto removido
+    def remove(self, product_id):
+        with self._lock:
+            self._generation += 1
+            if self._seeded_at is not None:
+                self._remove(product_id)
+
+    # Mudança desconhecida (importação, transação desfeita...): recarrega na próxima leitura
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._seeded_at = None
+
+    def _insert(self, row):
+        entry = {'id': row['id'], 'nome': row['nome'], 'estoque': stock_of(row)}
+        self._rows[row['id']] = entry
+        bisect.insort(self._order, (-entry['estoque'], row['id']))
+
+    def _remove(self, product_id):
+        entry = self._rows.pop(product_id, None)
+        if entry is not None:
+            index = bisect.bisect_left(self._order, (-entry['estoque'], product_id))
+            del self._order[index]
@@ -0,0 +1,486 @@
+import json
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from backends import SQLiteBackend
+from database import DB_ERRORS, DatabaseManager
+from logger import get_logger
+
+logger = get_logger('replica')
+
+# Tabelas que só existem na réplica local: a fila de saída e dados da própria réplica
+LOCAL_TABLES = [
+    """
+        CREATE TABLE IF NOT EXISTS replica_saida (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            operacao VARCHAR(10) NOT NULL,
+            produto_id INT NOT NULL,
+            versao_base INT,
+            dados TEXT NOT NULL,
+            criado_em DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """,
+    """
+        CREATE TABLE IF NOT EXISTS replica_meta (
+            chave VARCHAR(50) PRIMARY KEY,
+            valor TEXT
+        )
+    """,
+]
+
+# Tabelas que citam produtos.id: um produto criado offline (id negativo provisório)
+# ganha o id definitivo do servidor em todas elas
+PRODUCT_REFERENCES = [
+    ('produtos', 'id'),
+    ('replica_saida', 'produto_id'),
+    ('movimentos_estoque', 'produto_id'),
+    ('estoque_resumo_produto', 'produto_id'),
+    ('estoque_resumo_diario', 'produto_id'),
+    ('itens_venda', 'produto_id'),
+    ('vendas_resumo_diario', 'produto_id'),
+]
+
+
+# Réplica local do catálogo num SQLite: todas as leituras são locais e as escritas de produtos
+# entram numa fila durável (replica_saida) na mesma transação. Uma thread envia a fila ao
+# servidor em lotes e traz de volta as mudanças feitas por outros terminais.
+# Conflitos são detectados pela versão da linha; em conflito, vale o servidor.
+# Movimentos de estoque são deltas e não conflitam (só são recusados se o estoque não bastar)
+class ReplicaDatabaseManager(DatabaseManager):
+    def __init__(self, remote, path='perucas_replica.db', push_interval=2.0, pull_interval=60.0,
+                 batch_size=100, **kwargs):
+        super().__init__(backend=SQLiteBackend(path), **kwargs)
+        self.remote = remote
+        self.push_interval = push_interval
+        self.pull_interval = pull_interval
+        self.batch_size = batch_size
+        self.origin = None
+        self.online = False
+        self.last_sync = None
+        self.last_error = None
+        self.conflicts = 0
+        self.remote_changes = 0
+        self._remote_ready = False
+        self._thread = None
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._pull_requested = threading.Event()
+
+    # Cria o esquema local (as mesmas migrações do servidor) e as tabelas da réplica
+    def create_tables(self):
+        if not super().create_tables():
+            return False
+        try:
+            with self._cursor() as cursor:
+                for statement in LOCAL_TABLES:
+                    cursor.execute(statement)
+            row = self._fetch(self.statements.sql('replica.meta_get'), ('origem',), one=True)
+            if row:
+                self.origin = row['valor']
+            else:
+                self.origin = str(uuid.uuid4())
+                self.execute_write(self.statements.sql('replica.meta_set'), ('origem', self.origin))
+            return True
+        except DB_ERRORS as e:
+            print(f"❌ Erro ao preparar a réplica local: {e}")
+            return False
+
+    # Inicia a sincronização em segundo plano (o servidor pode estar fora do ar)
+    def start_sync(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='replica-sync', daemon=True)
+            self._thread.start()
+
+    def disconnect(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self.remote.disconnect()
+        super().disconnect()
+
+    # Pede um envio imediato (depois de uma escrita) ou uma leitura completa do servidor
+    def request_sync(self, pull=False):
+        if pull:
+            self._pull_requested.set()
+        self._wake.set()
+
+    def sync_status(self):
+        pending = self.fetch_one(self.statements.sql('replica.pending_count'))
+        return {
+            'online': self.online,
+            'pending': pending['total'] if pending else 0,
+            'last_sync': self.last_sync,
+            'last_error': self.last_error,
+            'conflicts': self.conflicts,
+            'remote_changes': self.remote_changes,
+        }
+
+    def stats(self):
+        stats = super().stats()
+        stats['replica'] = self.sync_status()
+        return stats
+
+    # Escritas locais: a linha muda já, e a operação vai para a fila na mesma transação
+
+    def _enqueue(self, operation, product_id, base_version, data):
+        self.execute_write(self.statements.sql('replica.enqueue'),
+                           (operation, product_id, base_version, json.dumps(data, default=str)))
+
+    # Produto novo recebe um id negativo provisório até o servidor devolver o definitivo.
+    # Os ids provisórios saem de um contador que só desce: um id de produto apagado offline
+    # nunca é reusado (senão o histórico dele iria junto para o produto novo no envio)
+    def add_product(self, name, description, price, stock):
+        try:
+            with self.transaction():
+                row = self._fetch(self.statements.sql('replica.min_id'), one=True)
+                last = self._fetch(self.statements.sql('replica.meta_get'), ('id_provisorio',), one=True)
+                temp_id = min(row['menor'] or 0, int(last['valor']) if last else 0, 0) - 1
+                self.execute_write(self.statements.sql('replica.meta_set'), ('id_provisorio', str(temp_id)))
+                self.execute_write(self.statements.sql('replica.insert_local'),
+                                   (temp_id, name, price, stock, self._catalog_version()))
+                self.record_movements([(temp_id, stock, 'cadastro')], apply=False)
+                self._enqueue('insert', temp_id, None, {'nome': name, 'preco': price, 'estoque': stock})
+        except DB_ERRORS as e:
+            if self.in_transaction():
+                raise
+            print(f"❌ Erro ao adicionar produto: {e}")
+            return False
+        print(f"✅ Produto {name} adicionado (envio ao servidor pendente)")
+        row = {'id': temp_id, 'nome': name, 'preco': price, 'estoque': stock}
+        self.top_stock.upsert(row)
+        self.request_sync()
+        return row
+
+    # Nome/preço vão com a versão em que foram editados; o estoque vai como delta
+    def update_product(self, product_id, name, description, price, stock):
+        try:
+            with self.transaction():
+                current = self._fetch(self.statements.sql('products.lock_stock'), (product_id,), one=True)
+                if current is None:
+                    return False
+                row = super().update_product(product_id, name, description, price, stock)
+                self._enqueue('update', product_id, current['versao'], {'nome': name, 'preco': price})
+                delta = stock - (current['estoque'] or 0)
+                if delta:
+                    self._enqueue('stock', product_id, None, {'delta': delta, 'motivo': 'ajuste'})
+        except (*DB_ERRORS, ValueError) as e:
+            if self.in_transaction():
+                raise
+            print(f"❌ Erro ao atualizar produto: {e}")
+            return False
+        self.request_sync()
+        return row
+
+    def delete_product(self, product_id):
+        try:
+            with self.transaction():
+                current = self._fetch(self.statements.sql('products.lock_stock'), (product_id,), one=True)
+                if current is None:
+                    return False
+                row = super().delete_product(product_id)
+                self._enqueue('delete', product_id, current['versao'], {})
+        except DB_ERRORS as e:
+            if self.in_transaction():
+                raise
+            print(f"❌ Erro ao deletar produto: {e}")
+            return False
+        self.request_sync()
+        return row
+
+    def adjust_stock(self, product_id, delta, reason='ajuste'):
+        try:
+            with self.transaction():
+                row = super().adjust_stock(product_id, delta, reason)
+                if row:
+                    self._enqueue('stock', product_id, None, {'delta': int(delta), 'motivo': reason})
+        except (*DB_ERRORS, ValueError) as e:
+            if self.in_transaction():
+                raise
+            print(f"❌ Movimento de estoque recusado: {e}")
+            return False
+        self.request_sync()
+        return row
+
+    # Importação e cadastro de usuário vão direto ao servidor (precisam dele no ar);
+    # o resultado chega à réplica na próxima leitura completa
+    def bulk_upsert_products(self, rows):
+        if not self.online:
+            print("❌ Importação indisponível sem conexão com o servidor")
+            return False
+        result = self.remote.bulk_upsert_products(rows)
+        if result:
+            self.request_sync(pull=True)
+        return result
+
+    def add_user(self, email, username, password):
+        if not self.online:
+            print("❌ Cadastro de usuário indisponível sem conexão com o servidor")
+            return False
+        result = self.remote.add_user(email, username, password)
+        if result:
+            self.request_sync(pull=True)
+        return result
+
+    # Vendas baixam o estoque que vale para todos os terminais: com o servidor no ar vão direto a
+    # ele, e as linhas devolvidas já entram na réplica (menos as que ainda têm itens na fila).
+    # Sem conexão, a venda é registrada na réplica e vai para a fila, para ser repetida no servidor
+    def checkout(self, items, user_id=None, sold_at=None):
+        if not self.online:
+            return self._checkout_offline(items, user_id, sold_at)
+        sale = self.remote.checkout(items, user_id, sold_at)
+        if not sale:
+            return sale
+        try:
+            with self.transaction():
+                pending = self._pending_ids()
+                rows = [row for product_id, row in sale['produtos'].items() if product_id not in pending]
+                self._store_remote(rows, [])
+            for row in rows:
+                self.top_stock.upsert(row)
+        except DB_ERRORS as e:
+            logger.warning(f"Venda {sale['id']} registrada, mas a réplica não foi atualizada: {e}")
+            self.request_sync(pull=True)
+        return sale
+
+    # Venda local (estoque, histórico, itens e resumo na réplica) e a venda inteira num item da
+    # fila, com a hora em que foi feita. O servidor confere o estoque de novo ao receber
+    def _checkout_offline(self, items, user_id, sold_at):
+        sold_at = sold_at or datetime.now().replace(microsecond=0)
+        try:
+            with self.transaction():
+                sale = super().checkout(items, user_id, sold_at)
+                if not sale:
+                    return False
+                self._enqueue('sale', 0, None, {
+                    'itens': [[item['produto_id'], item['quantidade']] for item in sale['itens']],
+                    'usuario_id': user_id,
+                    'criada_em': sold_at.isoformat(),
+                })
+        except ValueError as e:
+            if self.in_transaction():
+                raise
+            print(f"❌ Venda recusada: {e}")
+            return False
+        except DB_ERRORS as e:
+            if self.in_transaction():
+                raise
+            print(f"❌ Erro ao registrar venda: {e}")
+            return False
+        print("✅ Venda registrada (envio ao servidor pendente)")
+        self.request_sync()
+        return sale
+
+    # Produtos com itens na fila; os de uma venda estão nos dados dela
+    def _pending_ids(self):
+        pending = {row['produto_id'] for row in self._fetch(self.statements.sql('replica.pending_ids'))}
+        for row in self._fetch(self.statements.sql('replica.pending_sales')):
+            pending.update(product_id for product_id, _ in json.loads(row['dados'])['itens'])
+        return pending
+
+    # O histórico de vendas de todos os terminais fica no servidor
+    def get_top_sellers(self, days=30, limit=None):
+        if not self.online:
+            return []
+        return self.remote.get_top_sellers(days, limit or self.top_n)
+
+    # Thread de sincronização
+
+    def _run(self):
+        next_pull = 0
+        retry = self.push_interval
+        while not self._stop.is_set():
+            try:
+                if not self._remote_ready:
+                    if self.remote.pool is None and not self.remote.connect():
+                        raise ConnectionError("servidor indisponível")
+                    if not self.remote.create_tables():
+                        raise ConnectionError("esquema do servidor não pôde ser atualizado")
+                    self._remote_ready = True
+                while self.push() and not self._stop.is_set():
+                    pass
+                if self._pull_requested.is_set() or time.monotonic() >= next_pull:
+                    self._pull_requested.clear()
+                    self.pull()
+                    next_pull = time.monotonic() + self.pull_interval
+                self.online = True
+                self.last_error = None
+                self.last_sync = time.time()
+                retry = self.push_interval
+            except (*DB_ERRORS, OSError, ConnectionError) as e:
+                if self.online or self.last_error is None:
+                    logger.warning(f"Réplica sem conexão com o servidor: {e}")
+                self.online = False
+                self.last_error = str(e)
+                # Servidor fora do ar: tenta de novo com espera crescente (até 1 minuto)
+                retry = min(retry * 2, 60.0)
+            self._wake.wait(self.push_interval if self.online else retry)
+            self._wake.clear()
+
+    # Envia um lote da fila numa transação do servidor. Devolve quantos itens foram enviados
+    def push(self):
+        entries = self._fetch(self.statements.sql('replica.pending'), (self.batch_size,))
+        if not entries:
+            return 0
+        remote = self.remote
+        id_map = {}
+        conflicts = set()
+        with remote.transaction():
+            applied = remote._fetch(remote.statements.sql('replica.applied'), (self.origin,), one=True)
+            applied = applied['ultimo_id'] if applied else 0
+            for entry in entries:
+                # Já aplicado antes de uma queda entre o commit no servidor e a limpeza local;
+                # produto criado offline: recupera o id definitivo para trocar o provisório
+                if entry['id'] <= applied:
+                    if entry['operacao'] == 'insert':
+                        mapped = remote._fetch(remote.statements.sql('replica.mapped_id'),
+                                               (self.origin, entry['produto_id']), one=True)
+                        if mapped:
+                            id_map[entry['produto_id']] = mapped['id_definitivo']
+                    continue
+                product_id = id_map.get(entry['produto_id'], entry['produto_id'])
+                if not self._apply_remote(entry, product_id, id_map):
+                    conflicts.update(self._entry_products(entry, product_id, id_map))
+            remote.execute_write(remote.statements.sql('replica.mark_applied'),
+                                 (self.origin, entries[-1]['id']))
+
+        with self.transaction():
+            for temp_id, real_id in id_map.items():
+                for table, column in PRODUCT_REFERENCES:
+                    self.execute_write(f"UPDATE {table} SET {column} = %s WHERE {column} = %s", (real_id, temp_id))
+                # Para a interface o id provisório sumiu e o definitivo é uma linha nova
+                self.execute_write(self.statements.sql('replica.restamp'), (self._catalog_version(), real_id))
+            if id_map:
+                self._mark_removed(list(id_map))
+            self.execute_write(self.statements.sql('replica.dequeue'), (entries[-1]['id'],))
+        if id_map:
+            self.top_stock.invalidate()
+            self.remote_changes += 1
+
+        if conflicts:
+            self.conflicts += len(conflicts)
+            logger.warning(f"Conflito na sincronização dos produtos {sorted(conflicts)}: mantida a versão do servidor")
+            rows = self.remote._products_by_ids(list(conflicts))
+            found = {row['id'] for row in rows}
+            with self.transaction():
+                self._store_remote(rows, [product_id for product_id in conflicts if product_id not in found])
+            self.remote_changes += 1
+        return len(entries)
+
+    # Aplica um item da fila no servidor; False se houve conflito de versão
+    def _apply_remote(self, entry, product_id, id_map):
+        remote = self.remote
+        data = json.loads(entry['dados'])
+        operation = entry['operacao']
+        if operation == 'insert':
+            row = remote.add_product(data['nome'], '', data['preco'], data['estoque'])
+            remote.execute_write(remote.statements.sql('replica.map_id'), (self.origin, entry['produto_id'], row['id']))
+            id_map[entry['produto_id']] = row['id']
+            return True
+        if operation == 'update':
+            result = remote.execute_write(
+                remote.statements.sql('replica.update_versioned'),
+                (data['nome'], data['preco'], remote._catalog_version(), product_id, entry['versao_base'])
+            )
+            return result[0] > 0
+        if operation == 'stock':
+            try:
+                return bool(remote.record_movements([(product_id, data['delta'], data['motivo'])]))
+            except ValueError:
+                return False
+        if operation == 'sale':
+            items = self._entry_products(entry, product_id, id_map)
+            quantities = [quantity for _, quantity in data['itens']]
+            try:
+                sale = remote.checkout(list(zip(items, quantities)), data['usuario_id'],
+                                       datetime.fromisoformat(data['criada_em']))
+            except ValueError as e:
+                logger.warning(f"Venda feita sem conexão recusada pelo servidor: {e}")
+                return False
+            return bool(sale)
+        if operation == 'delete':
+            current = remote._fetch(remote.statements.sql('products.lock_stock'), (product_id,), one=True)
+            if current is None or current['versao'] != entry['versao_base']:
+                return False
+            return bool(remote.delete_product(product_id))
+        logger.warning(f"Operação desconhecida na fila da réplica: {operation}")
+        return True
+
+    # Ids no servidor dos produtos de um item da fila. Uma venda cita vários produtos, e um
+    # produto criado offline pode ter recebido o id definitivo num envio anterior
+    def _entry_products(self, entry, product_id, id_map):
+        if entry['operacao'] != 'sale':
+            return [product_id]
+        ids = []
+        for item_id, _ in json.loads(entry['dados'])['itens']:
+            if item_id in id_map:
+                item_id = id_map[item_id]
+            elif item_id < 0:
+                mapped = self.remote._fetch(self.remote.statements.sql('replica.mapped_id'),
+                                            (self.origin, item_id), one=True)
+                item_id = mapped['id_definitivo'] if mapped else item_id
+            ids.append(item_id)
+        return ids
+
+    # Grava linhas vindas do servidor e apaga as removidas lá (numa transação local aberta)
+    def _store_remote(self, rows, removed_ids):
+        if not rows and not removed_ids:
+            return
+        version = self._catalog_version()
+        if rows:
+            self.execute_many(self.statements.sql('replica.pull_product'),
+                              [(r['id'], r['nome'], r['preco'], r['estoque'], r['versao'], version) for r in rows])
+        if removed_ids:
+            self.execute_many(self.statements.sql('products.delete'), [(product_id,) for product_id in removed_ids])
+            self._mark_removed(removed_ids)
+
+    # Traz as mudanças do servidor desde a última leitura (pela versão do catálogo de lá);
+    # na primeira vez, ou com mudanças demais, lê o catálogo inteiro e compara versões de linha.
+    # Produtos com itens ainda na fila ficam como estão: o envio deles gera uma versão nova
+    # no servidor, que volta na leitura seguinte
+    def pull(self):
+        remote = self.remote
+        version = remote.get_catalog_version()
+        if version is None:
+            raise ConnectionError("versão do catálogo do servidor indisponível")
+        row = self._fetch(self.statements.sql('replica.meta_get'), ('versao_servidor',), one=True)
+        since = int(row['valor']) if row else None
+
+        full = since is None
+        if not full and since != version:
+            changes = remote.get_changes_since(since, limit=5000)
+            if changes is None:
+                raise ConnectionError("mudanças do servidor indisponíveis")
+            full = changes[1] is None
+        if full:
+            # _fetch propaga erros: uma leitura que falhou nunca é tomada por catálogo vazio
+            remote_rows = remote._fetch(remote.statements.sql('products.all'))
+        users = remote._fetch(remote.statements.sql('users.all'))
+
+        with self.transaction():
+            pending = self._pending_ids()
+            if full:
+                # versao só muda com nome/preço; o estoque é comparado à parte
+                local = {row['id']: (row['versao'], row['estoque'])
+                         for row in self._fetch(self.statements.sql('replica.local_versions'))}
+                seen = {r['id'] for r in remote_rows}
+                changed = [r for r in remote_rows
+                           if r['id'] not in pending and local.get(r['id']) != (r['versao'], r['estoque'])]
+                removed = [product_id for product_id in local if product_id not in seen and product_id not in pending]
+            elif since != version:
+                changed = [r for r in changes[1] if r['id'] not in pending]
+                removed = [product_id for product_id in changes[2] if product_id not in pending]
+            else:
+                changed, removed = [], []
+            self._store_remote(changed, removed)
+            if users:
+                self.execute_many(self.statements.sql('replica.pull_user'),
+                                  [(u['id'], u['nome'], u['email'], u['senha']) for u in users],
+                                  ranking_changed=False)
+            self.execute_write(self.statements.sql('replica.meta_set'), ('versao_servidor', str(version)))
+        if changed or removed:
+            self.remote_changes += 1
+        return len(changed) + len(removed)
@@ -0,0 +1,64 @@
+import sys
+import time
+
+# Marca de tempo do início do processo (o mais cedo possível: este módulo é importado primeiro em main.py)
+PROCESS_START = time.perf_counter()
+
+
+# Cronômetro das fases da inicialização
+class StartupTimer:
+    def __init__(self, start=PROCESS_START):
+        self.start = start
+        self.marks = []
+
+    def mark(self, phase):
+        self.marks.append((phase, time.perf_counter() - self.start))
+
+    def as_dict(self):
+        return {phase: round(elapsed * 1000, 1) for phase, elapsed in self.marks}
+
+    def report(self):
+        lines = ["⏱️ Tempo de inicialização (ms desde o início do processo):"]
+        for phase, elapsed in self.marks:
+            lines.append(f"  {elapsed * 1000:8.1f}  {phase}")
+        return "\n".join(lines)
+
+
+IMPORTTIME_LINE = r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)"
+
+
+# Roda "python -X importtime" no módulo e resume os imports mais caros
+def import_time_report(module='main', top=15):
+    # Imports locais: este módulo fica no caminho crítico da inicialização do main.py
+    import re
+    import subprocess
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True, text=True
+    )
+    imports = []
+    for line in result.stderr.splitlines():
+        match = re.match(IMPORTTIME_LINE, line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            imports.append({
+                'module': name,
+                'self_ms': int(self_us) / 1000,
+                'cumulative_ms': int(cumulative_us) / 1000,
+                'top_level': len(indent) <= 1,
+            })
+    total = sum(i['cumulative_ms'] for i in imports if i['top_level'])
+    slowest = sorted(imports, key=lambda i: i['cumulative_ms'], reverse=True)[:top]
+    return {'module': module, 'total_ms': round(total, 1), 'slowest': slowest}
+
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    report = import_time_report(args[0] if args else 'main')
+    if '--json' in sys.argv:
+        import json
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"Imports de '{report['module']}': {report['total_ms']:.1f} ms")
+        for item in report['slowest']:
+            print(f"  {item['cumulative_ms']:8.1f} ms  {item['module']}")
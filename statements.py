@@ -0,0 +1,231 @@
+import threading
+
+from migrations import statement_for
+
+# Comandos do DatabaseManager, definidos uma única vez. Como nas migrações, um comando pode ser
+# texto (igual em todos os backends) ou um dict por dialeto
+STATEMENTS = {
+    'products.all': "SELECT * FROM produtos ORDER BY id",
+    'products.get': "SELECT * FROM produtos WHERE id = %s",
+    # Catálogo para o ProductTable: preço já em centavos e sem NULLs, uma tupla por linha
+    'products.columns': {
+        'mysql': """
+            SELECT id, nome, CAST(ROUND(COALESCE(preco, 0) * 100) AS SIGNED), COALESCE(estoque, 0)
+            FROM produtos ORDER BY id
+        """,
+        'sqlite': """
+            SELECT id, nome, CAST(ROUND(COALESCE(preco, 0) * 100) AS INTEGER), COALESCE(estoque, 0)
+            FROM produtos ORDER BY id
+        """,
+    },
+    # O último parâmetro das escritas em produtos é a versão do catálogo da transação
+    'products.insert': "INSERT INTO produtos (nome, preco, estoque, alterado_em_versao) VALUES (%s, %s, %s, %s)",
+    'products.update_details': """
+        UPDATE produtos SET nome = %s, preco = %s, versao = versao + 1, alterado_em_versao = %s WHERE id = %s
+    """,
+    # Leitura do estoque atual travando a linha até o fim da transação (no SQLite o BEGIN IMMEDIATE
+    # já reserva a escrita)
+    'products.lock_stock': {
+        'mysql': "SELECT estoque, versao FROM produtos WHERE id = %s FOR UPDATE",
+        'sqlite': "SELECT estoque, versao FROM produtos WHERE id = %s",
+    },
+    'products.delete': "DELETE FROM produtos WHERE id = %s",
+    'products.upsert': {
+        'mysql': """
+            INSERT INTO produtos (id, nome, preco, estoque, alterado_em_versao) VALUES (%s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE nome = VALUES(nome), preco = VALUES(preco), estoque = VALUES(estoque),
+                versao = versao + 1, alterado_em_versao = VALUES(alterado_em_versao)
+        """,
+        'sqlite': """
+            INSERT INTO produtos (id, nome, preco, estoque, alterado_em_versao) VALUES (%s, %s, %s, %s, %s)
+            ON CONFLICT(id) DO UPDATE SET nome = excluded.nome, preco = excluded.preco, estoque = excluded.estoque,
+                versao = versao + 1, alterado_em_versao = excluded.alterado_em_versao
+        """,
+    },
+    'products.tombstone': {
+        'mysql': """
+            INSERT INTO produtos_removidos (produto_id, versao) VALUES (%s, %s)
+            ON DUPLICATE KEY UPDATE versao = VALUES(versao)
+        """,
+        'sqlite': """
+            INSERT INTO produtos_removidos (produto_id, versao) VALUES (%s, %s)
+            ON CONFLICT(produto_id) DO UPDATE SET versao = excluded.versao
+        """,
+    },
+    'catalog.bump': "UPDATE catalogo_versao SET versao = versao + 1 WHERE id = 1",
+    'catalog.version': "SELECT versao FROM catalogo_versao WHERE id = 1",
+    'catalog.changed': """
+        SELECT * FROM produtos WHERE alterado_em_versao > %s ORDER BY alterado_em_versao, id LIMIT %s
+    """,
+    # Linhas gravadas numa versão do catálogo (a da transação em andamento)
+    'catalog.stamped': "SELECT id, estoque FROM produtos WHERE alterado_em_versao = %s",
+    'catalog.removed': """
+        SELECT produto_id, versao FROM produtos_removidos WHERE versao > %s ORDER BY versao LIMIT %s
+    """,
+    'products.top_stock': "SELECT id, nome, COALESCE(estoque, 0) AS estoque FROM produtos ORDER BY produtos.estoque DESC, id LIMIT %s",
+    'movements.insert': "INSERT INTO movimentos_estoque (produto_id, delta, motivo, criado_em) VALUES (%s, %s, %s, %s)",
+    'movements.product_totals': {
+        'mysql': """
+            INSERT INTO estoque_resumo_produto (produto_id, entradas, saidas, movimentos, ultimo_movimento)
+            VALUES (%s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE entradas = entradas + VALUES(entradas), saidas = saidas + VALUES(saidas),
+                movimentos = movimentos + VALUES(movimentos), ultimo_movimento = VALUES(ultimo_movimento)
+        """,
+        'sqlite': """
+            INSERT INTO estoque_resumo_produto (produto_id, entradas, saidas, movimentos, ultimo_movimento)
+            VALUES (%s, %s, %s, %s, %s)
+            ON CONFLICT(produto_id) DO UPDATE SET entradas = entradas + excluded.entradas,
+                saidas = saidas + excluded.saidas, movimentos = movimentos + excluded.movimentos,
+                ultimo_movimento = excluded.ultimo_movimento
+        """,
+    },
+    'movements.daily_totals': {
+        'mysql': """
+            INSERT INTO estoque_resumo_diario (dia, produto_id, entradas, saidas, movimentos)
+            VALUES (%s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE entradas = entradas + VALUES(entradas), saidas = saidas + VALUES(saidas),
+                movimentos = movimentos + VALUES(movimentos)
+        """,
+        'sqlite': """
+            INSERT INTO estoque_resumo_diario (dia, produto_id, entradas, saidas, movimentos)
+            VALUES (%s, %s, %s, %s, %s)
+            ON CONFLICT(dia, produto_id) DO UPDATE SET entradas = entradas + excluded.entradas,
+                saidas = saidas + excluded.saidas, movimentos = movimentos + excluded.movimentos
+        """,
+    },
+    'movements.product_summary': "SELECT * FROM estoque_resumo_produto WHERE produto_id = %s",
+    'movements.daily_summary': """
+        SELECT dia, SUM(entradas) AS entradas, SUM(saidas) AS saidas, SUM(movimentos) AS movimentos
+        FROM estoque_resumo_diario WHERE dia >= %s GROUP BY dia ORDER BY dia
+    """,
+    'sales.insert': "INSERT INTO vendas (criada_em, total, itens, usuario_id) VALUES (%s, %s, %s, %s)",
+    'sales.insert_items': """
+        INSERT INTO itens_venda (venda_id, produto_id, quantidade, preco_unitario) VALUES (%s, %s, %s, %s)
+    """,
+    'sales.daily_totals': {
+        'mysql': """
+            INSERT INTO vendas_resumo_diario (dia, produto_id, quantidade, receita, vendas) VALUES (%s, %s, %s, %s, 1)
+            ON DUPLICATE KEY UPDATE quantidade = quantidade + VALUES(quantidade), receita = receita + VALUES(receita),
+                vendas = vendas + 1
+        """,
+        'sqlite': """
+            INSERT INTO vendas_resumo_diario (dia, produto_id, quantidade, receita, vendas) VALUES (%s, %s, %s, %s, 1)
+            ON CONFLICT(dia, produto_id) DO UPDATE SET quantidade = quantidade + excluded.quantidade,
+                receita = receita + excluded.receita, vendas = vendas + 1
+        """,
+    },
+    'sales.get': "SELECT * FROM vendas WHERE id = %s",
+    'sales.items': "SELECT * FROM itens_venda WHERE venda_id = %s ORDER BY produto_id",
+    # Mais vendidos desde um dia, a partir do resumo diário (nunca das tabelas de vendas).
+    # Produto já apagado continua no ranking, sem nome
+    'sales.top_sellers': """
+        SELECT r.produto_id AS id, p.nome, p.estoque, SUM(r.quantidade) AS vendidos, SUM(r.receita) AS receita
+        FROM vendas_resumo_diario r LEFT JOIN produtos p ON p.id = r.produto_id
+        WHERE r.dia >= %s GROUP BY r.produto_id, p.nome, p.estoque ORDER BY vendidos DESC, r.produto_id LIMIT %s
+    """,
+    'users.credentials': "SELECT id, senha FROM usuarios WHERE nome = %s",
+    'users.insert': "INSERT INTO usuarios (email, nome, senha) VALUES (%s, %s, %s)",
+    'users.rehash': "UPDATE usuarios SET senha = %s WHERE id = %s AND senha = %s",
+    'users.all': "SELECT id, nome, email, senha FROM usuarios",
+
+    # Réplica local (replica.py): fila de saída no SQLite e envio com checagem de versão no servidor
+    'replica.meta_get': "SELECT valor FROM replica_meta WHERE chave = %s",
+    'replica.meta_set': {'sqlite': "INSERT OR REPLACE INTO replica_meta (chave, valor) VALUES (%s, %s)"},
+    'replica.min_id': "SELECT MIN(id) AS menor FROM produtos",
+    'replica.insert_local': """
+        INSERT INTO produtos (id, nome, preco, estoque, versao, alterado_em_versao) VALUES (%s, %s, %s, %s, 1, %s)
+    """,
+    'replica.enqueue': "INSERT INTO replica_saida (operacao, produto_id, versao_base, dados) VALUES (%s, %s, %s, %s)",
+    'replica.pending': "SELECT * FROM replica_saida ORDER BY id LIMIT %s",
+    'replica.pending_count': "SELECT COUNT(*) AS total FROM replica_saida",
+    'replica.pending_ids': "SELECT DISTINCT produto_id FROM replica_saida WHERE operacao <> 'sale'",
+    'replica.pending_sales': "SELECT dados FROM replica_saida WHERE operacao = 'sale'",
+    'replica.dequeue': "DELETE FROM replica_saida WHERE id <= %s",
+    'replica.local_versions': "SELECT id, versao, estoque FROM produtos",
+    'replica.pull_product': {'sqlite': """
+        INSERT INTO produtos (id, nome, preco, estoque, versao, alterado_em_versao) VALUES (%s, %s, %s, %s, %s, %s)
+        ON CONFLICT(id) DO UPDATE SET nome = excluded.nome, preco = excluded.preco,
+            estoque = excluded.estoque, versao = excluded.versao, alterado_em_versao = excluded.alterado_em_versao
+    """},
+    'replica.restamp': "UPDATE produtos SET alterado_em_versao = %s WHERE id = %s",
+    'replica.pull_user': {'sqlite': """
+        INSERT INTO usuarios (id, nome, email, senha) VALUES (%s, %s, %s, %s)
+        ON CONFLICT(id) DO UPDATE SET nome = excluded.nome, email = excluded.email, senha = excluded.senha
+    """},
+    'replica.applied': "SELECT ultimo_id FROM replica_aplicados WHERE origem = %s",
+    # Id definitivo de cada produto criado numa réplica, gravado junto com o envio
+    'replica.map_id': {
+        'mysql': """
+            INSERT INTO replica_ids (origem, id_provisorio, id_definitivo) VALUES (%s, %s, %s)
+            ON DUPLICATE KEY UPDATE id_definitivo = VALUES(id_definitivo)
+        """,
+        'sqlite': """
+            INSERT INTO replica_ids (origem, id_provisorio, id_definitivo) VALUES (%s, %s, %s)
+            ON CONFLICT(origem, id_provisorio) DO UPDATE SET id_definitivo = excluded.id_definitivo
+        """,
+    },
+    'replica.mapped_id': "SELECT id_definitivo FROM replica_ids WHERE origem = %s AND id_provisorio = %s",
+    'replica.mark_applied': {
+        'mysql': """
+            INSERT INTO replica_aplicados (origem, ultimo_id) VALUES (%s, %s)
+            ON DUPLICATE KEY UPDATE ultimo_id = VALUES(ultimo_id)
+        """,
+        'sqlite': """
+            INSERT INTO replica_aplicados (origem, ultimo_id) VALUES (%s, %s)
+            ON CONFLICT(origem) DO UPDATE SET ultimo_id = excluded.ultimo_id
+        """,
+    },
+    'replica.update_versioned': """
+        UPDATE produtos SET nome = %s, preco = %s, versao = versao + 1, alterado_em_versao = %s
+        WHERE id = %s AND versao = %s
+    """,
+}
+
+
+# Texto em uma linha só: menos bytes por envio e a mesma chave em todo lugar que usa o texto
+def compact(sql):
+    return " ".join(sql.split())
+
+
+# Textos prontos para o dialeto do backend, montados uma vez por DatabaseManager.
+# O texto de cada comando é sempre o mesmo objeto: no SQLite ele acerta o cache de comandos
+# compilados da conexão (cached_statements); no MySQL o pymysql só interpola os parâmetros.
+# Conta quantas vezes cada comando foi usado
+class StatementRegistry:
+    def __init__(self, dialect, statements=None):
+        self.dialect = dialect
+        self._sql = {}
+        for name, statement in (statements or STATEMENTS).items():
+            sql = statement_for(statement, dialect)
+            if sql is not None:
+                self._sql[name] = compact(sql)
+        self._counts = dict.fromkeys(self._sql, 0)
+        self._lock = threading.Lock()
+
+    # Texto de um comando registrado (KeyError para nomes desconhecidos)
+    def sql(self, name):
+        text = self._sql[name]
+        with self._lock:
+            self._counts[name] += 1
+        return text
+
+    # Comandos montados em tempo de execução (busca/ordenação da lista): cada formato distinto
+    # (key) é montado uma vez e reaproveitado, contado junto com o nome
+    def variant(self, name, key, build):
+        full_name = (name, key)
+        with self._lock:
+            text = self._sql.get(full_name)
+            if text is None:
+                text = self._sql[full_name] = compact(build())
+            self._counts[name] = self._counts.get(name, 0) + 1
+        return text
+
+    # Execuções por comando, do mais usado para o menos usado
+    def counts(self):
+        with self._lock:
+            items = [(name, count) for name, count in self._counts.items() if count]
+        return dict(sorted(items, key=lambda item: item[1], reverse=True))
+
+    def reset(self):
+        with self._lock:
+            self._counts = dict.fromkeys(self._counts, 0)
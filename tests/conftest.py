@@ -0,0 +1,59 @@
+import os
+import sys
+
+import pytest
+
+# Os módulos do projeto ficam na raiz do repositório
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backends import SQLiteBackend  # noqa: E402
+from database import DatabaseManager  # noqa: E402
+from replica import ReplicaDatabaseManager  # noqa: E402
+
+
+# Bancos SQLite em arquivos temporários, com o esquema criado; fechados ao fim do teste
+@pytest.fixture
+def make_db(tmp_path):
+    managers = []
+
+    def make(name='loja', **options):
+        db = DatabaseManager(backend=SQLiteBackend(str(tmp_path / f'{name}.db')), **options)
+        db.connect()
+        db.create_tables()
+        managers.append(db)
+        return db
+
+    yield make
+    for db in managers:
+        db.disconnect()
+
+
+@pytest.fixture
+def db(make_db):
+    return make_db()
+
+
+# Servidor e réplicas em arquivos separados; a sincronização é chamada à mão (sem a thread)
+@pytest.fixture
+def server(make_db):
+    return make_db('servidor')
+
+
+@pytest.fixture
+def make_replica(tmp_path, server):
+    replicas = []
+
+    def make(name):
+        remote = DatabaseManager(backend=SQLiteBackend(server.backend.path))
+        remote.connect()
+        replica = ReplicaDatabaseManager(remote, path=str(tmp_path / f'{name}.db'))
+        replica.connect()
+        replica.create_tables()
+        replica.online = True
+        replica.pull()
+        replicas.append(replica)
+        return replica
+
+    yield make
+    for replica in replicas:
+        replica.disconnect()
@@ -0,0 +1,44 @@
+from bulk import import_products
+
+
+def test_jsonl_bad_lines_are_rejected_one_by_one(db, tmp_path):
+    path = tmp_path / 'produtos.jsonl'
+    path.write_text(
+        '{"nome": "Lisa", "preco": 10, "estoque": 3}\n'
+        '{bad\n'
+        '\n'
+        '{"nome": "Chanel", "preco": 20, "estoque": 2.5}\n'
+        '{"nome": "Franja", "preco": 30, "estoque": 4.0}\n'
+        '[1, 2]\n',
+        encoding='utf-8'
+    )
+
+    report = import_products(db, str(path))
+
+    assert report.imported == 2
+    assert [line for line, _ in report.errors] == [2, 4, 6]
+    assert sorted(row['nome'] for row in db.get_products()) == ["Franja", "Lisa"]
+
+
+def test_csv_reports_data_line_numbers(db, tmp_path):
+    path = tmp_path / 'produtos.csv'
+    path.write_text("nome;preco;estoque\nLisa;10,50;3\nChanel;abc;2\n", encoding='utf-8')
+
+    report = import_products(db, str(path))
+
+    assert report.imported == 1
+    assert report.errors == [(3, "Preço e estoque devem ser números válidos.")]
+
+
+def test_import_journals_the_stock_difference(db):
+    lisa = db.add_product("Lisa", "", 10, 5)
+
+    assert db.bulk_upsert_products([(lisa['id'], "Lisa", 10, 8), (None, "Chanel", 20, 4)])
+    assert db.bulk_upsert_products([(lisa['id'], "Lisa", 10, 2)])
+
+    chanel = db.fetch_one("SELECT id FROM produtos WHERE nome = 'Chanel'")
+    for product_id, stock in ((lisa['id'], 2), (chanel['id'], 4)):
+        summary = db.get_movement_summary(product_id)
+        assert summary['entradas'] - summary['saidas'] == stock == db.get_product(product_id)['estoque']
+    assert [m['delta'] for m in db.fetch_all(
+        "SELECT delta FROM movimentos_estoque WHERE produto_id = %s ORDER BY id", (lisa['id'],))] == [5, 3, -6]
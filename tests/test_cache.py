@@ -0,0 +1,21 @@
+from cache import QueryCache
+
+
+def test_callers_cannot_change_cached_rows():
+    cache = QueryCache()
+    rows = cache.get_or_load('k', lambda: [{'id': 1, 'estoque': 5}])
+    rows[0]['estoque'] = 0
+    rows.append({'id': 2})
+
+    again = cache.get_or_load('k', lambda: [])
+    again[0]['estoque'] = 1
+
+    assert cache.get_or_load('k', lambda: []) == [{'id': 1, 'estoque': 5}]
+    assert cache.stats()['hits'] == 2
+
+
+def test_zero_ttl_keeps_nothing():
+    cache = QueryCache(ttl=0)
+    cache.get_or_load('k', lambda: [{'id': 1}])
+
+    assert cache.stats()['entries'] == 0
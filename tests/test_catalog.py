@@ -0,0 +1,71 @@
+from decimal import Decimal
+
+
+def test_free_form_product_writes_force_a_reload(db):
+    db.add_product("Lisa", "", 10, 5)
+    version = db.get_catalog_version()
+
+    db.execute_query("UPDATE produtos SET estoque = 0")
+    assert db.get_changes_since(version) == (version + 1, None, None)
+
+    version = db.get_catalog_version()
+    with db.batch() as batch:
+        batch.execute("UPDATE produtos SET preco = %s", (12,))
+    assert db.get_changes_since(version) == (version + 1, None, None)
+
+
+def test_free_form_writes_elsewhere_keep_the_version(db):
+    version = db.get_catalog_version()
+
+    db.execute_query("DELETE FROM movimentos_estoque")
+
+    assert db.get_changes_since(version) is None
+
+
+def test_changes_since_bring_changed_rows_and_removed_ids(db):
+    a = db.add_product("Lisa", "", 10, 5)
+    b = db.add_product("Chanel", "", 20, 3)
+    version = db.get_catalog_version()
+    assert db.get_changes_since(version) is None
+
+    db.update_product(a['id'], "Lisa", "", 10, 7)
+    db.delete_product(b['id'])
+    current, rows, removed = db.get_changes_since(version)
+
+    assert current == db.get_catalog_version() > version
+    assert [(row['id'], row['estoque']) for row in rows] == [(a['id'], 7)]
+    assert removed == [b['id']]
+    assert db.get_changes_since(current) is None
+
+
+def test_too_many_changes_ask_for_a_reload(db):
+    version = db.get_catalog_version()
+    db.bulk_upsert_products([(None, f"Peruca {i}", 10, i) for i in range(5)])
+
+    assert db.get_changes_since(version, limit=4) == (db.get_catalog_version(), None, None)
+    assert len(db.get_changes_since(version, limit=5)[1]) == 5
+
+
+def test_product_table_reads_columns_from_the_cursor(db):
+    a = db.add_product("Lisa", "", Decimal('10.99'), 5)
+    b = db.add_product("Chanel", "", 20, 8)
+    c = db.add_product("Dior", "", Decimal('0.10'), 5)
+    db.execute_query("INSERT INTO produtos (nome, preco, estoque) VALUES (NULL, NULL, NULL)")
+
+    table = db.get_product_table(batch_size=2)
+
+    assert len(table) == 4
+    assert table[0].to_dict() == {'id': a['id'], 'nome': "Lisa", 'preco': Decimal('10.99'), 'estoque': 5}
+    assert [row['preco'] for row in table] == [Decimal('10.99'), Decimal('20.00'), Decimal('0.10'), Decimal('0.00')]
+    assert (table[-1]['nome'], table[-1]['estoque']) == ('', 0)
+    assert table.inventory_value() == Decimal('215.45')
+
+
+def test_product_table_top_stock_breaks_ties_by_id(db):
+    ids = [db.add_product(f"P{i}", "", 10, stock)['id'] for i, stock in enumerate([3, 8, 5, 8, 5, 1])]
+
+    table = db.get_product_table()
+
+    assert [row.id for row in table.top_stock(3)] == [ids[1], ids[3], ids[2]]
+    assert [row.id for row in table.top_stock(10)] == [ids[1], ids[3], ids[2], ids[4], ids[0], ids[5]]
+    assert [row.id for row in table.top_stock(3)] == [row['id'] for row in db.get_sales_data(limit=3)]
@@ -0,0 +1,7 @@
+from logger import levels_from_env
+
+
+def test_unknown_levels_are_ignored():
+    levels = levels_from_env("perucas.timing=info, perucas.database=VERBOSE,perucas.gui=")
+
+    assert levels == {'perucas.timing': 'INFO'}
@@ -0,0 +1,54 @@
+import pytest
+
+from database import ProductQuery
+from gui import ProductPages
+
+
+# Guarda as buscas pedidas; run() as entrega como o loop do Tk faria
+class QueuedLoader:
+    def __init__(self):
+        self.jobs = {}
+
+    def submit(self, key, func, on_done, on_error=None):
+        self.jobs[key] = (func, on_done)
+
+    def is_busy(self, key):
+        return key in self.jobs
+
+    def run(self):
+        jobs, self.jobs = self.jobs, {}
+        for func, on_done in jobs.values():
+            on_done(func())
+
+
+@pytest.fixture
+def db(db):
+    db.bulk_upsert_products([(None, f"Peruca {i:03d}", 10, i) for i in range(250)])
+    return db
+
+
+def test_missing_pages_load_in_background(db):
+    loader = QueuedLoader()
+    loaded = []
+    pages = ProductPages(db, loader, lambda: loaded.append(True), page_size=20)
+    pages.reset(db.count_products(), db.query_products(limit=20))
+
+    rows = pages.rows(195, 10)
+
+    assert rows[:5] == [ProductPages.LOADING_ROW] * 5
+    assert len(loader.jobs) == 2
+    loader.run()
+    assert loaded == [True, True]
+    assert [row['estoque'] for row in pages.rows(195, 10)] == list(range(195, 205))
+
+
+def test_loads_from_before_a_reset_are_dropped(db):
+    loader = QueuedLoader()
+    pages = ProductPages(db, loader, page_size=20)
+    pages.reset(db.count_products())
+    pages.rows(100, 10)
+
+    pages.reset(db.count_products(), query=ProductQuery(sort='estoque', descending=True))
+    loader.run()
+
+    assert pages.pages == {}
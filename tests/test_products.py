@@ -0,0 +1,40 @@
+import pytest
+
+from database import ProductQuery
+
+
+@pytest.mark.parametrize('sort', ['id', 'nome', 'estoque'])
+def test_key_at_counts_from_a_known_key(db, sort):
+    for i in range(30):
+        db.add_product(f"Peruca {i:02d}", "", 10, (i * 7) % 11)
+    query = ProductQuery(sort=sort)
+    rows = db.query_products(query, limit=30)
+
+    after = query.key(rows[9])
+
+    assert db.get_product_key_at(15, query) == query.key(rows[15])
+    assert db.get_product_key_at(5, query, after) == query.key(rows[15])
+    assert db.get_product_key_at(40, query, after) is None
+
+
+@pytest.mark.parametrize('descending', [False, True])
+@pytest.mark.parametrize('sort', ['nome', 'preco', 'estoque'])
+def test_pages_include_null_values(db, sort, descending):
+    db.execute_query("INSERT INTO produtos (nome, preco, estoque) VALUES (NULL, NULL, NULL)")
+    db.execute_query("INSERT INTO produtos (nome, preco, estoque) VALUES (NULL, NULL, NULL)")
+    db.add_product("Lisa", "", 10, 5)
+    db.add_product("Chanel", "", 20, 3)
+    query = ProductQuery(sort=sort, descending=descending)
+
+    seen, after = [], None
+    while True:
+        page = db.query_products(query, after, limit=1)
+        if not page:
+            break
+        seen.append(page[0]['id'])
+        after = query.key(page[0])
+
+    assert len(seen) == db.count_products(query) == 4
+    assert sorted(seen) == [1, 2, 3, 4]
+    assert [db.get_product_key_at(i, query) for i in range(4)] == \
+        [query.key(db.get_product(product_id)) for product_id in seen]
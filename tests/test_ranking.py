@@ -0,0 +1,50 @@
+import pytest
+
+
+# Ranking pequeno: poucos produtos já enchem o gráfico
+@pytest.fixture
+def db(make_db):
+    return make_db(top_n=2)
+
+
+def test_batch_write_refreshes_chart(db):
+    a = db.add_product("Lisa", "", 10, 5)
+    b = db.add_product("Chanel", "", 20, 3)
+    assert [row['id'] for row in db.get_sales_data()] == [a['id'], b['id']]
+
+    with db.batch() as batch:
+        batch.execute("UPDATE produtos SET estoque = %s WHERE id = %s", (50, b['id']))
+
+    assert [row['id'] for row in db.get_sales_data()] == [b['id'], a['id']]
+
+
+def test_ranking_reloaded_after_commit(db):
+    a = db.add_product("Lisa", "", 10, 5)
+    b = db.add_product("Chanel", "", 20, 3)
+
+    with db.transaction():
+        db.execute_many("UPDATE produtos SET estoque = %s WHERE id = %s", [(50, b['id']), (1, a['id'])])
+        # Carga do ranking antes do commit (como outra thread que ainda não vê a escrita)
+        db.top_stock.seed([{'id': a['id'], 'nome': "Lisa", 'estoque': 5},
+                           {'id': b['id'], 'nome': "Chanel", 'estoque': 3}])
+
+    assert [row['estoque'] for row in db.get_sales_data()] == [50, 1]
+
+
+def test_chart_can_ask_for_more_rows(db):
+    for i in range(4):
+        db.add_product(f"P{i}", "", 10, i)
+
+    assert [row['estoque'] for row in db.get_sales_data(limit=4)] == [3, 2, 1, 0]
+    assert db.top_stock.n == 4
+
+
+def test_null_stock_counts_as_zero(db):
+    db.execute_query("INSERT INTO produtos (nome, preco, estoque) VALUES ('Antiga', 10, NULL)")
+    a = db.add_product("Lisa", "", 10, 5)
+
+    assert [(row['id'], row['estoque']) for row in db.get_sales_data(limit=2)][0] == (a['id'], 5)
+    assert db.get_sales_data(limit=2)[1]['estoque'] == 0
+    db.update_product(a['id'], "Lisa", "", 10, 6)
+    db.top_stock.upsert({'id': 99, 'nome': "Outra", 'estoque': None})
+    assert db.get_sales_data(limit=2)[0]['estoque'] == 6
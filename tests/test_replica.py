@@ -0,0 +1,180 @@
+import sqlite3
+
+import pytest
+
+
+def sync(*replicas):
+    for replica in replicas:
+        while replica.push():
+            pass
+    for replica in replicas:
+        replica.pull()
+
+
+def test_push_and_pull_between_replicas(server, make_replica):
+    product = server.add_product("Lisa Loira", "", 100, 10)
+    a, b = make_replica('a'), make_replica('b')
+    assert a.get_product(product['id'])['estoque'] == 10
+
+    a.update_product(product['id'], "Lisa Loira Nova", "", 120, 10)
+    sync(a, b)
+
+    assert server.get_product(product['id'])['nome'] == "Lisa Loira Nova"
+    assert b.get_product(product['id'])['nome'] == "Lisa Loira Nova"
+    assert a.sync_status()['pending'] == 0
+
+
+def test_offline_product_gets_server_id(server, make_replica):
+    a, b = make_replica('a'), make_replica('b')
+    row = a.add_product("Cacheada Ruiva", "", 80, 5)
+    assert row['id'] < 0
+    a.adjust_stock(row['id'], 3, 'entrada')
+
+    sync(a, b)
+
+    remote = server.fetch_one("SELECT * FROM produtos WHERE nome = %s", ("Cacheada Ruiva",))
+    assert remote['estoque'] == 8
+    assert a.get_product(row['id']) is None
+    assert a.get_product(remote['id'])['estoque'] == 8
+    assert b.get_product(remote['id'])['estoque'] == 8
+    # O histórico local acompanha o id definitivo
+    assert a.fetch_all("SELECT * FROM movimentos_estoque WHERE produto_id < 0") == []
+    assert len(a.fetch_all("SELECT * FROM movimentos_estoque WHERE produto_id = %s", (remote['id'],))) == 2
+
+
+def test_stock_deltas_from_two_replicas_add_up(server, make_replica):
+    product = server.add_product("Chanel Preta", "", 150, 100)
+    a, b = make_replica('a'), make_replica('b')
+
+    a.adjust_stock(product['id'], -10, 'venda')
+    b.adjust_stock(product['id'], -5, 'venda')
+    sync(a, b)
+    a.pull()
+
+    assert server.get_product(product['id'])['estoque'] == 85
+    assert a.get_product(product['id'])['estoque'] == 85
+    assert b.get_product(product['id'])['estoque'] == 85
+    assert a.conflicts == 0 and b.conflicts == 0
+
+
+def test_detail_edit_does_not_conflict_with_stock_changes(server, make_replica):
+    product = server.add_product("Franja Rosa", "", 60, 20)
+    a = make_replica('a')
+
+    # Venda em outro terminal depois da última leitura da réplica
+    server.checkout([(product['id'], 2)])
+    server.adjust_stock(product['id'], 5, 'entrada')
+    a.update_product(product['id'], "Franja Rosa Clara", "", 65, 20)
+    sync(a)
+
+    remote = server.get_product(product['id'])
+    assert a.conflicts == 0
+    assert remote['nome'] == "Franja Rosa Clara"
+    assert float(remote['preco']) == 65
+    assert remote['estoque'] == 23
+    assert a.get_product(product['id'])['estoque'] == 23
+
+
+def test_conflicting_detail_edits_keep_server_version(server, make_replica):
+    product = server.add_product("Longa Azul", "", 200, 4)
+    a, b = make_replica('a'), make_replica('b')
+
+    b.update_product(product['id'], "Longa Azul B", "", 210, 4)
+    sync(b)
+    a.update_product(product['id'], "Longa Azul A", "", 220, 4)
+    sync(a)
+
+    assert a.conflicts == 1
+    assert server.get_product(product['id'])['nome'] == "Longa Azul B"
+    assert a.get_product(product['id'])['nome'] == "Longa Azul B"
+
+
+def test_push_recovers_ids_after_crash_before_local_remap(server, make_replica, monkeypatch):
+    a = make_replica('a')
+    row = a.add_product("Ondulada Lilás", "", 90, 7)
+
+    # Queda depois do commit no servidor, antes de trocar o id provisório na réplica
+    original = a.execute_write
+
+    def crash(query, params=None):
+        if query.startswith("UPDATE produtos SET id"):
+            raise sqlite3.OperationalError("queda simulada")
+        return original(query, params)
+
+    monkeypatch.setattr(a, 'execute_write', crash)
+    with pytest.raises(sqlite3.OperationalError):
+        a.push()
+    monkeypatch.setattr(a, 'execute_write', original)
+
+    sync(a)
+
+    remote = server.fetch_all("SELECT * FROM produtos WHERE nome = %s", ("Ondulada Lilás",))
+    assert len(remote) == 1
+    assert a.get_product(row['id']) is None
+    assert a.get_product(remote[0]['id'])['estoque'] == 7
+    assert a.fetch_all("SELECT * FROM movimentos_estoque WHERE produto_id < 0") == []
+    assert a.sync_status()['pending'] == 0
+
+
+def test_pull_applies_remote_deletes(server, make_replica):
+    product = server.add_product("Black Power Platinada", "", 300, 2)
+    a, b = make_replica('a'), make_replica('b')
+
+    b.delete_product(product['id'])
+    sync(b, a)
+
+    assert server.get_product(product['id']) is None
+    assert a.get_product(product['id']) is None
+
+
+def test_offline_ids_are_not_reused_after_delete(server, make_replica):
+    a = make_replica('a')
+    first = a.add_product("Lisa", "", 10, 5)
+    a.delete_product(first['id'])
+    second = a.add_product("Chanel", "", 20, 7)
+    assert second['id'] != first['id']
+
+    sync(a)
+
+    remote = server.fetch_one("SELECT * FROM produtos WHERE nome = %s", ("Chanel",))
+    summary = a.fetch_one("SELECT * FROM estoque_resumo_produto WHERE produto_id = %s", (remote['id'],))
+    assert (summary['entradas'], summary['saidas']) == (7, 0)
+    assert server.get_product(remote['id'])['estoque'] == 7
+
+
+def test_offline_sale_is_replayed_on_the_server(server, make_replica):
+    product = server.add_product("Lisa", "", 10, 5)
+    a = make_replica('a')
+    a.online = False
+    new = a.add_product("Chanel", "", 20, 4)
+
+    sale = a.checkout([(product['id'], 2), (new['id'], 1)])
+    assert sale and a.get_product(product['id'])['estoque'] == 3
+    # Uma leitura antes do envio não desfaz a baixa local
+    a.pull()
+    assert a.get_product(product['id'])['estoque'] == 3
+
+    a.online = True
+    sync(a)
+
+    remote_new = server.fetch_one("SELECT * FROM produtos WHERE nome = %s", ("Chanel",))
+    assert server.get_product(product['id'])['estoque'] == 3
+    assert server.get_product(remote_new['id'])['estoque'] == 3
+    sales = server.fetch_all("SELECT * FROM vendas")
+    assert len(sales) == 1 and float(sales[0]['total']) == 40
+    assert a.sync_status()['pending'] == 0
+
+
+def test_offline_sale_refused_by_server_keeps_server_stock(server, make_replica):
+    product = server.add_product("Lisa", "", 10, 5)
+    a = make_replica('a')
+    a.online = False
+    assert a.checkout([(product['id'], 4)])
+    server.checkout([(product['id'], 3)])
+
+    a.online = True
+    sync(a)
+
+    assert a.conflicts == 1
+    assert server.get_product(product['id'])['estoque'] == 2
+    assert a.get_product(product['id'])['estoque'] == 2
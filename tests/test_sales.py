@@ -0,0 +1,32 @@
+def test_checkout_is_all_or_nothing(db):
+    a = db.add_product("Lisa", "", 10, 5)
+    b = db.add_product("Chanel", "", 20, 1)
+
+    assert db.checkout([(a['id'], 2), (b['id'], 2)]) is False
+    assert db.get_product(a['id'])['estoque'] == 5
+    assert db.fetch_all("SELECT * FROM vendas") == []
+
+    sale = db.checkout([(a['id'], 2), (b['id'], 1)])
+    assert float(sale['total']) == 40
+    assert db.get_product(a['id'])['estoque'] == 3
+    assert db.get_product(b['id'])['estoque'] == 0
+
+
+def test_top_sellers_keep_deleted_products(db):
+    a = db.add_product("Lisa", "", 10, 10)
+    b = db.add_product("Chanel", "", 20, 10)
+    db.checkout([(a['id'], 3), (b['id'], 1)])
+    db.delete_product(a['id'])
+
+    top = db.get_top_sellers()
+
+    assert [(row['id'], row['vendidos']) for row in top] == [(a['id'], 3), (b['id'], 1)]
+    assert top[0]['nome'] == f"#{a['id']} (removido)"
+
+
+def test_refused_stock_change_returns_false(db):
+    a = db.add_product("Lisa", "", 10, 5)
+
+    assert db.update_product(a['id'], "Lisa", "", 11, -5) is False
+    assert db.get_product(a['id'])['estoque'] == 5
+    assert float(db.get_product(a['id'])['preco']) == 10
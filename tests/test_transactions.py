@@ -0,0 +1,26 @@
+import pytest
+
+
+def test_inner_rollback_keeps_the_outer_writes(db):
+    with db.transaction():
+        a = db.add_product("Lisa", "", 10, 5)
+        with pytest.raises(RuntimeError):
+            with db.transaction():
+                db.add_product("Chanel", "", 20, 3)
+                raise RuntimeError("desfaz só o bloco de dentro")
+        b = db.add_product("Dior", "", 30, 1)
+
+    assert [row['nome'] for row in db.get_products()] == ["Lisa", "Dior"]
+    assert [row['id'] for row in db.get_sales_data()] == [a['id'], b['id']]
+
+
+def test_error_in_the_outer_block_undoes_everything(db):
+    with pytest.raises(RuntimeError):
+        with db.transaction():
+            db.add_product("Lisa", "", 10, 5)
+            with db.transaction():
+                db.add_product("Chanel", "", 20, 3)
+            raise RuntimeError("desfaz tudo")
+
+    assert db.get_products() == []
+    assert db.get_sales_data() == []
@@ -0,0 +1,46 @@
+import sqlite3
+
+from migrations import CREATE_SCHEMA_TABLE, MIGRATIONS, RECORD_VERSION, statement_for
+from passwords import is_hashed
+
+
+# Banco antigo: só a migração 1 aplicada, sem o índice único em usuarios.nome
+def old_database(path, users):
+    conn = sqlite3.connect(path)
+    conn.execute(CREATE_SCHEMA_TABLE)
+    number, description, statements = MIGRATIONS[0]
+    for statement in statements:
+        conn.execute(statement_for(statement, 'sqlite'))
+    conn.execute(RECORD_VERSION['sqlite'].replace('%s', '?'), (number, description))
+    conn.executemany("INSERT INTO usuarios (email, nome, senha) VALUES (?, ?, ?)", users)
+    conn.commit()
+    conn.close()
+
+
+def test_repeated_usernames_are_renamed_before_the_unique_index(make_db, tmp_path):
+    old_database(str(tmp_path / 'antigo.db'), [
+        ('ana@a.com', 'ana', 'um'),
+        ('bia@a.com', 'bia', 'dois'),
+        ('ana@b.com', 'ana', 'tres'),
+    ])
+
+    db = make_db('antigo')
+
+    users = {row['nome']: row['email'] for row in db.fetch_all("SELECT nome, email FROM usuarios")}
+    assert users == {'ana': 'ana@a.com', 'bia': 'bia@a.com', 'ana#3': 'ana@b.com'}
+    assert db.check_user_credentials('ana', 'um')
+    assert db.check_user_credentials('ana#3', 'tres')
+
+
+def test_plaintext_password_is_rehashed_on_login(db):
+    db.execute_query("INSERT INTO usuarios (email, nome, senha) VALUES ('ana@a.com', 'ana', 'segredo')")
+
+    assert not db.check_user_credentials('ana', 'errada')
+    assert db.fetch_one("SELECT senha FROM usuarios WHERE nome = 'ana'")['senha'] == 'segredo'
+
+    assert db.check_user_credentials('ana', 'segredo')
+    stored = db.fetch_one("SELECT senha FROM usuarios WHERE nome = 'ana'")['senha']
+    assert is_hashed(stored)
+    db.sessions.discard('ana')
+    assert db.check_user_credentials('ana', 'segredo')
+    assert not db.check_user_credentials('ana', 'errada')